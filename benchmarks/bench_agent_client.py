@@ -0,0 +1,59 @@
+"""Per-call latency of bare ``requests`` calls versus the pooled ``AgentClient``.
+
+Runs against the in-process stand-in agent. ``--connect-delay`` emulates TCP/TLS setup cost across a
+firewall, which bare ``requests.get`` pays on every call and the pooled client pays once per connection.
+
+    python benchmarks/bench_agent_client.py --calls 200 --connect-delay 0.005
+"""
+
+import argparse
+import statistics
+import time
+
+import requests
+
+from bluesky_adaptive_ui.client import AgentClient
+from bluesky_adaptive_ui.tests.fake_agent import FakeAgent
+
+
+def _time_calls(func, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        response = func()
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return samples
+
+
+def _report(label, samples):
+    ms = [s * 1e3 for s in samples]
+    print(
+        f"{label:>16}: median {statistics.median(ms):7.3f} ms   "
+        f"p95 {sorted(ms)[int(0.95 * len(ms)) - 1]:7.3f} ms   total {sum(ms):8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200, help="Number of sequential calls per mode")
+    parser.add_argument("--connect-delay", type=float, default=0.0, help="Emulated connection setup (s)")
+    args = parser.parse_args()
+
+    with FakeAgent(connect_delay=args.connect_delay) as agent:
+        url = f"{agent.url}/api/variable/ask_on_tell"
+        bare = _time_calls(lambda: requests.get(url), args.calls)
+        bare_connections = agent.connections
+
+        # No read cache: every call must reach the agent, so this measures connection pooling alone.
+        with AgentClient(agent.address, agent.port, read_ttl=0) as client:
+            pooled = _time_calls(lambda: client.get_variable("ask_on_tell"), args.calls)
+        pooled_connections = agent.connections - bare_connections
+
+    _report("requests.get", bare)
+    _report("AgentClient", pooled)
+    print(f"connections opened: requests.get={bare_connections}, AgentClient={pooled_connections}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Fleet refresh time as the number of agents grows, sequential versus concurrent polling.
+
+Starts ``--agents`` in-process stand-in agents, each answering after ``--delay`` seconds, and times a full
+fleet refresh (four switchboard variables per agent) for growing subsets of them.
+
+    python benchmarks/bench_fleet_poll.py --agents 50 --delay 0.01 --concurrency 64
+"""
+
+import argparse
+import contextlib
+import statistics
+import time
+
+from bluesky_adaptive_ui.fleet import DEFAULT_FLEET_CONCURRENCY, Fleet
+from bluesky_adaptive_ui.tests.fake_agent import FakeAgent
+
+
+def _time_refresh(urls, concurrency, repeats):
+    fleet = Fleet(urls, max_concurrency=concurrency, read_ttl=0)
+    try:
+        fleet.poll()  # open connections
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            states = fleet.poll()
+            samples.append(time.perf_counter() - start)
+            assert all(state.reachable for state in states.values())
+    finally:
+        fleet.close()
+    return statistics.median(samples) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=50, help="Stand-in agents to start")
+    parser.add_argument("--delay", type=float, default=0.01, help="Per-request agent latency (s)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_FLEET_CONCURRENCY, help="Requests in flight")
+    parser.add_argument("--repeats", type=int, default=5, help="Refreshes timed per configuration")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        agents = [stack.enter_context(FakeAgent(delay=args.delay)) for _ in range(args.agents)]
+        urls = {f"agent{i}": agent.url for i, agent in enumerate(agents)}
+        print(f"{'agents':>8} {'sequential ms':>15} {f'concurrent({args.concurrency}) ms':>20}")
+        for n in sorted({1, 10, 25, args.agents} - {0}):
+            if n > args.agents:
+                continue
+            subset = dict(list(urls.items())[:n])
+            sequential = _time_refresh(subset, 1, args.repeats)
+            concurrent = _time_refresh(subset, args.concurrency, args.repeats)
+            print(f"{n:>8} {sequential:>15.1f} {concurrent:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""HUD payload size and server time as reports grow, with and without decimation.
+
+Builds synthetic clustering-style HUD figures (a marker trace of clustered points and a line trace of a
+per-report score) with ``N`` points each, and reports the JSON payload sent to the browser and the time to
+decimate and serialize it, against sending the figure as-is. With ``--raster`` it also reports rasterizing the
+marker trace instead.
+
+    python benchmarks/bench_hud_decimation.py --sizes 1000 10000 100000 500000 --max-points 5000 --raster
+"""
+
+import argparse
+import json
+import random
+import time
+
+from bluesky_adaptive_ui.decimate import DEFAULT_MAX_POINTS, DEFAULT_WEBGL_THRESHOLD, decimate_figure
+
+
+def synthetic_figure(n, seed=0):
+    rng = random.Random(seed)
+    centers = [(rng.uniform(-10, 10), rng.uniform(-10, 10)) for _ in range(5)]
+    labels = [rng.randrange(len(centers)) for _ in range(n)]
+    x = [centers[label][0] + rng.gauss(0, 1) for label in labels]
+    y = [centers[label][1] + rng.gauss(0, 1) for label in labels]
+    score = [1 / (1 + i) + rng.gauss(0, 0.01) for i in range(n)]
+    return {
+        "data": [
+            {"type": "scatter", "mode": "markers", "x": x, "y": y, "marker": {"color": labels}},
+            {"type": "scatter", "mode": "lines", "x": list(range(n)), "y": score, "xaxis": "x2", "yaxis": "y2"},
+        ],
+        "layout": {"title": {"text": f"{n} reports"}},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 500_000])
+    parser.add_argument("--max-points", type=int, default=DEFAULT_MAX_POINTS)
+    parser.add_argument("--webgl-threshold", type=int, default=DEFAULT_WEBGL_THRESHOLD)
+    parser.add_argument("--raster", action="store_true", help="Also time rasterizing the marker trace")
+    args = parser.parse_args()
+
+    header = f"{'points':>8} {'raw KB':>10} {'raw ms':>8} {'decimated KB':>13} {'decimated ms':>13} {'traces':>20}"
+    print(header + (f" {'raster KB':>10} {'raster ms':>10}" if args.raster else ""))
+    for n in args.sizes:
+        figure = synthetic_figure(n)
+        start = time.perf_counter()
+        raw = json.dumps(figure)
+        raw_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        decimated = decimate_figure(figure, args.max_points, args.webgl_threshold)
+        text = json.dumps(decimated)
+        decimated_ms = (time.perf_counter() - start) * 1e3
+        traces = ",".join(trace.get("type", "scatter") for trace in decimated["data"])
+        row = f"{n:>8} {len(raw) / 1e3:>10.0f} {raw_ms:>8.1f} {len(text) / 1e3:>13.0f} {decimated_ms:>13.1f}"
+        row += f" {traces:>20}"
+        if args.raster:
+            start = time.perf_counter()
+            text = json.dumps(decimate_figure(figure, args.max_points, args.webgl_threshold, raster_threshold=0))
+            row += f" {len(text) / 1e3:>10.0f} {(time.perf_counter() - start) * 1e3:>10.1f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
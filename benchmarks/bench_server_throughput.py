@@ -0,0 +1,143 @@
+"""Dashboard throughput under the Dash development server versus the production server mode.
+
+Starts the stand-in agent, then serves the default dashboard first with ``python app.py`` and then with
+``python -m bluesky_adaptive_ui.serve``, and for each drives the switchboard refresh callback (the request
+every open page sends on its refresh interval) from many concurrent clients.
+
+    python benchmarks/bench_server_throughput.py --clients 32 --seconds 10 --workers 4 --threads 8
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bluesky_adaptive_ui.tests.fake_agent import FakeAgent
+
+REFRESH_INPUT = "refresh-page.n_intervals"
+
+
+def _refresh_payload(base_url):
+    """The request body the browser sends for the callback driven by the refresh interval."""
+    for dependency in requests.get(f"{base_url}/_dash-dependencies", timeout=5).json():
+        inputs = [f"{i['id']}.{i['property']}" for i in dependency["inputs"]]
+        if inputs == [REFRESH_INPUT] and "switchboard-push" not in dependency["output"]:
+            break
+    else:
+        raise RuntimeError("switchboard refresh callback not found")
+    outputs = [part.rsplit(".", 1) for part in dependency["output"].strip(".").split("...")]
+    return {
+        "output": dependency["output"],
+        "outputs": [{"id": id_, "property": prop.split("@")[0]} for id_, prop in outputs],
+        "inputs": [{"id": "refresh-page", "property": "n_intervals", "value": 1}],
+        "changedPropIds": [REFRESH_INPUT],
+        "state": [],
+    }
+
+
+def _wait_until_up(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode}")
+        try:
+            requests.get(f"{base_url}/_dash-dependencies", timeout=1).raise_for_status()
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+def _hammer(base_url, clients, seconds):
+    payload = _refresh_payload(base_url)
+    stop = time.monotonic() + seconds
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def client():
+        with requests.Session() as session:
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                try:
+                    ok = session.post(f"{base_url}/_dash-update-component", json=payload, timeout=10).ok
+                except requests.RequestException:
+                    ok = False
+                with lock:
+                    if ok:
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        errors[0] += 1
+
+    with ThreadPoolExecutor(clients) as pool:
+        for _ in range(clients):
+            pool.submit(client)
+    return latencies, errors[0]
+
+
+def _run(label, command, base_url, clients, seconds):
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_until_up(base_url, process)
+        latencies, errors = _hammer(base_url, clients, seconds)
+    finally:
+        process.terminate()
+        process.wait()
+    ms = sorted(s * 1e3 for s in latencies)
+    p95 = ms[int(0.95 * len(ms)) - 1] if ms else float("nan")
+    median = statistics.median(ms) if ms else float("nan")
+    print(
+        f"{label:>28}: {len(ms) / seconds:8.1f} req/s   median {median:7.2f} ms"
+        f"   p95 {p95:7.2f} ms   errors {errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent simulated browsers")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each run")
+    parser.add_argument("--workers", type=int, default=4, help="Production worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="Threads per production worker")
+    parser.add_argument("--port", type=int, default=8060, help="Dashboard port")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    with FakeAgent() as agent:
+        app_args = ["--agent-address", agent.address, "--agent-port", str(agent.port)]
+        _run(
+            "dev server",
+            [
+                sys.executable,
+                "-m",
+                "bluesky_adaptive_ui.default_dash_app.app",
+                "--port",
+                str(args.port),
+                *app_args,
+            ],
+            base_url,
+            args.clients,
+            args.seconds,
+        )
+        serve = [sys.executable, "-m", "bluesky_adaptive_ui.serve", "default", "--bind", f"127.0.0.1:{args.port}"]
+        _run(
+            f"gunicorn {args.workers}x{args.threads}",
+            [*serve, "--workers", str(args.workers), "--threads", str(args.threads), *app_args],
+            base_url,
+            args.clients,
+            args.seconds,
+        )
+        _run(
+            f"uvicorn {args.workers} workers",
+            [*serve, "--server", "uvicorn", "--workers", str(args.workers), *app_args],
+            base_url,
+            args.clients,
+            args.seconds,
+        )
+
+
+if __name__ == "__main__":
+    main()
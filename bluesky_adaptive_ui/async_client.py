@@ -0,0 +1,116 @@
+"""Asyncio front end to :class:`~bluesky_adaptive_ui.client.AgentClient` for concurrent fan-out reads."""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class AsyncAgentClient:
+    """Awaitable agent API calls with bounded concurrency.
+
+    Calls are executed by a dedicated thread pool over the pooled session of ``client``, so they do not depend
+    on which event loop awaits them. The dashboards' callbacks are all synchronous and await these calls
+    through :func:`run_sync`; no ``async def`` callback uses them.
+
+    Parameters
+    ----------
+    client : AgentClient
+        Synchronous client whose connection pool is shared.
+    max_concurrency : int
+        Maximum number of agent requests in flight at once. Keep it no larger than ``client.pool_size``
+        to avoid waiting on the pool.
+    executor : concurrent.futures.Executor, optional
+        Run calls on an existing executor instead, e.g. one bounding the requests of many agents together.
+        ``max_concurrency`` then caps this client's share of it, and :meth:`close` leaves the executor running.
+    """
+
+    def __init__(self, client, *, max_concurrency=DEFAULT_MAX_CONCURRENCY, executor=None):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self._owns_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="agent-client")
+        self._executor = executor
+        self._semaphore = None
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        if self._owns_executor:
+            return await loop.run_in_executor(self._executor, call)
+        # Created here rather than in __init__ so that it belongs to the running loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await loop.run_in_executor(self._executor, call)
+
+    async def get_variable(self, name, *, timeout=None):
+        return await self._run(self.client.get_variable, name, timeout=timeout)
+
+    async def set_variable(self, name, value, *, timeout=None):
+        return await self._run(self.client.set_variable, name, value, timeout=timeout)
+
+    async def call_method(self, name, args=None, kwargs=None, *, timeout=None):
+        return await self._run(self.client.call_method, name, args, kwargs, timeout=timeout)
+
+    async def get_names(self, *, timeout=None):
+        return await self._run(self.client.get_names, timeout=timeout)
+
+    async def get_variables(self, names, *, timeout=None, return_exceptions=False):
+        """Read many variables concurrently.
+
+        Returns
+        -------
+        dict
+            Maps each name to its response, or to the raised exception if ``return_exceptions`` is set.
+        """
+        names = list(names)
+        responses = await asyncio.gather(
+            *(self.get_variable(name, timeout=timeout) for name in names), return_exceptions=return_exceptions
+        )
+        return dict(zip(names, responses))
+
+    def close(self):
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+
+class EventLoopThread:
+    """An asyncio event loop running forever on a daemon thread.
+
+    Lets synchronous code, such as regular Dash callbacks under a WSGI server, submit coroutines and block on
+    their results.
+    """
+
+    def __init__(self, name="bluesky-adaptive-ui-loop"):
+        self._name = name
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name=self._name, daemon=True)
+                    thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def run(self, coro, timeout=None):
+        """Run ``coro`` on the background loop and return its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+_default_loop_thread = EventLoopThread()
+
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine to completion from synchronous code, such as a Dash callback, on a shared background
+    loop. This is how every caller in the package awaits :class:`AsyncAgentClient`.
+    """
+    return _default_loop_thread.run(coro, timeout=timeout)
@@ -0,0 +1,49 @@
+"""Slow agent method calls as Dash background callbacks.
+
+``generate_report`` or ``add_suggestions_to_queue`` can run for minutes. Made from a regular callback, the
+POST holds a web server worker until the agent returns. As a Dash background callback the request returns at
+once, the call runs in a separate process managed by a ``dash.DiskcacheManager``, and the browser polls for
+progress and the result, with a running indicator and a cancel button. Cancelling terminates that process,
+which drops the connection to the agent; the agent may still finish the method.
+
+Requires the optional ``dash[diskcache]``; without it the calls stay regular callbacks.
+"""
+
+import importlib.util
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+DEFAULT_CALLBACK_CACHE = os.path.join(tempfile.gettempdir(), "bluesky-adaptive-ui-callbacks")
+PROGRESS_INTERVAL = 0.5
+REQUIRED_MODULES = ("diskcache", "multiprocess", "psutil")
+
+
+def background_callback_manager(directory=DEFAULT_CALLBACK_CACHE):
+    """A ``dash.DiskcacheManager`` storing results in ``directory``, or None if ``dash[diskcache]`` is missing.
+
+    Workers serving the same app must share ``directory``, since any of them may answer the browser's polls.
+    """
+    if any(importlib.util.find_spec(name) is None for name in REQUIRED_MODULES):
+        return None
+    import diskcache
+    from dash import DiskcacheManager
+
+    return DiskcacheManager(diskcache.Cache(directory))
+
+
+def call_with_progress(client, set_progress, method_name, args=None, kwargs=None, interval=PROGRESS_INTERVAL):
+    """Call an agent method, reporting the time elapsed through ``set_progress`` until it returns.
+
+    Returns the response; raises like :meth:`AgentClient.call_method`.
+    """
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(client.call_method, method_name, args, kwargs)
+        while True:
+            try:
+                return future.result(timeout=interval)
+            except FutureTimeoutError:
+                set_progress(f"{method_name} running for {time.monotonic() - start:.0f} s")
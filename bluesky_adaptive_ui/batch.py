@@ -0,0 +1,149 @@
+"""Batched agent method calls: many argument sets for one method, sent with bounded parallelism.
+
+Sweeping ``tell_agent_by_uid`` or a parameter over hundreds of entries one click at a time is slow.
+:func:`parse_batch` reads the argument sets from JSON lines and :func:`iter_batch` sends them concurrently,
+at most ``max_concurrency`` at a time, yielding each :class:`BatchResult` as its call completes so a table can
+be filled in while the batch runs.
+
+Each line of a batch is one call, in the method dashboard's ``[args, kwargs]`` form or shorter::
+
+    ["det1", 10]                 # positional arguments
+    {"det": "det1", "pos": 15}   # keyword arguments
+    [["det1"], {"pos": 15}]      # both
+    "a1b2c3"                     # a single argument, e.g. a uid
+
+A JSON array of such entries spread over several lines, as in an uploaded ``.json`` file, is accepted as well;
+on a single line it is one call. Blank lines and lines starting with ``#`` are skipped.
+"""
+
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+
+DEFAULT_BATCH_CONCURRENCY = 4
+MAX_BATCH_CONCURRENCY = 64
+BATCH_COLUMNS = ("index", "arguments", "ok", "status_code", "latency_ms", "error")
+
+
+def _as_call(entry):
+    """``(args, kwargs)`` of one batch entry."""
+    if isinstance(entry, dict):
+        return [], entry
+    if isinstance(entry, list):
+        if len(entry) == 2 and isinstance(entry[0], list) and isinstance(entry[1], dict):
+            return entry[0], entry[1]
+        return entry, {}
+    return [entry], {}
+
+
+def parse_batch(text):
+    """``[(args, kwargs), ...]`` from JSON lines or a JSON array, see the module docs.
+
+    Raises
+    ------
+    ValueError
+        Naming the first line that is not valid JSON.
+    """
+    text = text.strip()
+    if text.startswith("[") and "\n" in text:
+        try:
+            return [_as_call(entry) for entry in json.loads(text)]
+        except ValueError:
+            pass  # several lines, each a list
+    calls = []
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            calls.append(_as_call(json.loads(line)))
+        except ValueError as err:
+            raise ValueError(f"line {number}: {err}") from None
+    return calls
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    """Outcome of one call of a batch.
+
+    Attributes
+    ----------
+    index : int
+        Position of the call in the batch.
+    args, kwargs
+        Arguments it was sent with.
+    ok : bool
+        Whether the agent answered with HTTP 200.
+    status_code : int or None
+        None if no response was received.
+    latency : float
+        Seconds the request took, from being sent to its outcome.
+    error : str
+        Exception or response text when not ``ok``.
+    """
+
+    index: int
+    args: list
+    kwargs: dict
+    ok: bool
+    status_code: int = None
+    latency: float = 0.0
+    error: str = ""
+
+    def to_row(self):
+        row = asdict(self)
+        row["arguments"] = json.dumps([row.pop("args"), row.pop("kwargs")])
+        row["latency_ms"] = round(row.pop("latency") * 1e3, 1)
+        row["ok"] = "yes" if self.ok else "no"
+        return row
+
+
+def call_one(client, method_name, index, args, kwargs, timeout=None):
+    """Call ``method_name`` once, returning a :class:`BatchResult` instead of raising."""
+    start = time.perf_counter()
+    try:
+        response = client.call_method(method_name, args, kwargs, timeout=timeout)
+    except Exception as err:
+        return BatchResult(
+            index, args, kwargs, False, None, time.perf_counter() - start, f"{type(err).__name__}: {err}"
+        )
+    latency = time.perf_counter() - start
+    ok = response.status_code == 200
+    return BatchResult(index, args, kwargs, ok, response.status_code, latency, "" if ok else response.text[:200])
+
+
+def iter_batch(client, method_name, calls, max_concurrency=DEFAULT_BATCH_CONCURRENCY, *, timeout=None):
+    """Call ``method_name`` with every ``(args, kwargs)`` of ``calls``, at most ``max_concurrency`` at once.
+
+    Yields :class:`BatchResult` in order of completion. Calls are submitted only as earlier ones finish, so
+    closing the generator early leaves the rest of the batch unsent. ``client`` is an
+    :class:`~bluesky_adaptive_ui.client.AgentClient`; give it a ``pool_size`` of at least ``max_concurrency``.
+    """
+    max_concurrency = max(1, min(int(max_concurrency), MAX_BATCH_CONCURRENCY))
+    pending = iter(enumerate(calls))
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="batch") as executor:
+        running = set()
+        try:
+            while True:
+                for index, (args, kwargs) in pending:
+                    running.add(executor.submit(call_one, client, method_name, index, args, kwargs, timeout))
+                    if len(running) >= max_concurrency:
+                        break
+                if not running:
+                    return
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=lambda future: future.result().index):
+                    yield future.result()
+        finally:
+            for future in running:
+                future.cancel()
+
+
+def summarize(results, total):
+    """One line on the progress of a batch of ``total`` calls, given the results so far."""
+    failed = sum(not result.ok for result in results)
+    text = f"{len(results)} of {total} calls done, {failed} failed"
+    if results:
+        text += f", slowest {max(result.latency for result in results) * 1e3:.0f} ms"
+    return text
@@ -0,0 +1,265 @@
+"""Cache backends for agent state shared between the dashboard's worker processes.
+
+Under a multi-worker server (see :mod:`bluesky_adaptive_ui.serve`) every worker would otherwise poll the agent
+on its own. Routing those reads through a shared backend with :meth:`CacheBackend.get_or_fetch` lets one
+worker fetch while the others reuse its result, so N workers cost one upstream read per TTL.
+
+Three backends are provided, all storing JSON-serializable values:
+
+* :class:`InProcessCache`, the default, shared only by the threads of one process.
+* :class:`FileCache`, one file per key in a directory shared by the workers of a host. Point it at
+  ``/dev/shm`` to keep it in shared memory.
+* :class:`RedisCache`, for any Redis-compatible server, shared across hosts. Requires the optional ``redis``.
+
+:func:`cache_backend_from_url` picks one from a command line string.
+"""
+
+import abc
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+DEFAULT_SHARED_TTL = 1.0
+DEFAULT_LOCK_TIMEOUT = 10.0
+DEFAULT_WAIT_INTERVAL = 0.02
+DEFAULT_REDIS_PREFIX = "bluesky-adaptive-ui:"
+
+
+class CacheBackend(abc.ABC):
+    """Key-value store with per-key expiry.
+
+    Subclasses implement :meth:`get`, :meth:`set`, :meth:`add` and :meth:`delete`. Expiry uses wall-clock
+    time so that it is consistent across processes. A ``ttl`` of None never expires.
+    """
+
+    @abc.abstractmethod
+    def get(self, key):
+        """The value stored under ``key``, or None if missing or expired."""
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl=None):
+        """Store ``value`` under ``key`` for ``ttl`` seconds."""
+
+    @abc.abstractmethod
+    def add(self, key, value, ttl=None):
+        """Store ``value`` only if ``key`` is absent, returning whether it was stored. Must be atomic."""
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """Remove ``key`` if present."""
+
+    def get_or_fetch(self, key, fetch, ttl=DEFAULT_SHARED_TTL, *, lock_timeout=DEFAULT_LOCK_TIMEOUT):
+        """Return the cached value for ``key``, calling ``fetch()`` in at most one caller when it is missing.
+
+        The caller that wins a lock on ``key`` fetches and stores the result for ``ttl`` seconds. Others poll
+        the backend for it, and fall back to fetching themselves if the lock holder vanishes or
+        ``lock_timeout`` passes. A result is not stored if :meth:`invalidate` was called during the fetch.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        lock_key, token = f"{key}:lock", uuid.uuid4().hex
+        if self.add(lock_key, token, ttl=lock_timeout):
+            try:
+                value = fetch()
+                if self.get(lock_key) == token:
+                    self.set(key, value, ttl)
+                return value
+            finally:
+                if self.get(lock_key) == token:
+                    self.delete(lock_key)
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(DEFAULT_WAIT_INTERVAL)
+            value = self.get(key)
+            if value is not None:
+                return value
+            if self.get(lock_key) is None:
+                break
+        return fetch()
+
+    def invalidate(self, key):
+        """Drop ``key`` and abandon any fetch in progress for it, e.g. after a write to the agent."""
+        self.delete(key)
+        self.delete(f"{key}:lock")
+
+
+class InProcessCache(CacheBackend):
+    """Dictionary-backed cache, shared by the threads of one process only."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= time.time():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return None if entry is None else entry[1]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (None if ttl is None else time.time() + ttl, value)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._data[key] = (None if ttl is None else time.time() + ttl, value)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class FileCache(CacheBackend):
+    """One JSON file per key in ``directory``, shared by every process that can see it.
+
+    Writes go through a temporary file and ``os.replace``, so readers never see a partial value, and
+    :meth:`add` hard-links a complete temporary file into place, which fails if the key exists. Use a
+    directory on ``/dev/shm`` to avoid disk I/O.
+
+    Parameters
+    ----------
+    directory : str or path-like
+        Created if it does not exist.
+    """
+
+    def __init__(self, directory):
+        self.directory = os.fspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    @staticmethod
+    def _encode(value, ttl):
+        return json.dumps({"expires": None if ttl is None else time.time() + ttl, "value": value}).encode()
+
+    def _read(self, path):
+        try:
+            with open(path, "rb") as file:
+                entry = json.loads(file.read())
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry["expires"] is not None and entry["expires"] <= time.time():
+            return None
+        return entry
+
+    def get(self, key):
+        entry = self._read(self._path(key))
+        return None if entry is None else entry["value"]
+
+    def set(self, key, value, ttl=None):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(self._encode(value, ttl))
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _held(self, path, ttl):
+        """Whether the entry at ``path`` is live; an unreadable one younger than ``ttl`` is taken to be held."""
+        try:
+            with open(path, "rb") as file:
+                entry = json.loads(file.read())
+        except FileNotFoundError:
+            return False
+        except ValueError:
+            try:
+                age = time.time() - os.stat(path).st_mtime
+            except FileNotFoundError:
+                return False
+            return ttl is None or age < ttl
+        return entry["expires"] is None or entry["expires"] > time.time()
+
+    def add(self, key, value, ttl=None):
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(self._encode(value, ttl))
+            for _ in range(2):
+                try:
+                    # The entry appears complete or not at all: there is no empty file for others to misread.
+                    os.link(tmp, path)
+                    return True
+                except FileExistsError:
+                    if self._held(path, ttl):
+                        return False
+                    # Expired: remove it and try once more.
+                    self.delete(key)
+            return False
+        finally:
+            os.unlink(tmp)
+
+    def delete(self, key):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class RedisCache(CacheBackend):
+    """Cache on a Redis-compatible server, shared by workers on any host.
+
+    Parameters
+    ----------
+    client : redis.Redis
+        Any client with redis-py's ``get``, ``set(..., px=, nx=)`` and ``delete``, e.g. ``fakeredis`` in tests.
+    prefix : str
+        Prepended to every key.
+    """
+
+    def __init__(self, client, prefix=DEFAULT_REDIS_PREFIX):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, prefix=DEFAULT_REDIS_PREFIX):
+        """Connect with ``redis.Redis.from_url``; requires the optional ``redis``."""
+        import redis
+
+        return cls(redis.Redis.from_url(url), prefix)
+
+    @staticmethod
+    def _px(ttl):
+        return None if ttl is None else max(1, int(ttl * 1000))
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), px=self._px(ttl))
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(self.prefix + key, json.dumps(value), px=self._px(ttl), nx=True))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+def cache_backend_from_url(url):
+    """Build a backend from ``memory``, ``file:///some/dir`` (or a plain directory path) or ``redis://...``."""
+    if url in (None, "", "memory"):
+        return InProcessCache()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache.from_url(url)
+    if url.startswith("file://"):
+        url = url[len("file://") :]
+    return FileCache(url)
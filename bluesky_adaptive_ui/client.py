@@ -0,0 +1,272 @@
+"""HTTP client for the bluesky-adaptive agent API shared by the dashboards."""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .coalesce import DEFAULT_READ_TTL, ReadCoalescer
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_METHOD_TIMEOUT = 30.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 10.0
+
+
+def pooled_session(pool_size=DEFAULT_POOL_SIZE, hosts=1):
+    """A ``requests.Session`` keeping up to ``pool_size`` connections open to each of ``hosts`` hosts.
+
+    Callers beyond ``pool_size`` for one host block until a connection is returned instead of opening more.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=hosts, pool_maxsize=pool_size, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of contacting an agent that has recently failed repeatedly."""
+
+
+class CircuitBreaker:
+    """Fail fast after repeated errors talking to an agent.
+
+    The breaker opens after ``failure_threshold`` consecutive failures. While open, :meth:`allow` refuses
+    calls until ``reset_timeout`` seconds have passed, after which a single trial call is let through
+    (half-open). Its success closes the breaker, its failure opens it again.
+
+    Parameters
+    ----------
+    failure_threshold : int
+        Consecutive failures that open the breaker.
+    reset_timeout : float
+        Seconds to stay open before allowing a trial call.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """Whether a call may be attempted now."""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class AgentClient:
+    """Pooled, keep-alive client for a single agent's HTTP API.
+
+    One instance is meant to be shared by every Dash callback in a process. Requests go through a single
+    ``requests.Session`` whose connection pool is thread-safe, so concurrent Flask worker threads reuse
+    open TCP connections to the agent instead of paying connection setup on every click.
+
+    Every call has a timeout, so a stalled agent cannot hang a Flask worker thread, and every call goes
+    through a :class:`CircuitBreaker`, so once the agent is failing callers get a :class:`CircuitOpenError`
+    immediately instead of each waiting out its own timeout.
+
+    Identical concurrent GETs share one upstream request and successful results are reused for ``read_ttl``
+    seconds (see :class:`~bluesky_adaptive_ui.coalesce.ReadCoalescer`). Any POST through the client
+    invalidates those cached reads. :meth:`read_stats` reports how many reads never reached the agent.
+
+    Parameters
+    ----------
+    address : str
+        Agent host name or IP address.
+    port : int or str
+        Agent API port.
+    pool_size : int
+        Maximum number of kept-alive connections to the agent. Callers beyond this block until a connection
+        is returned to the pool.
+    timeout : float or tuple
+        Default ``requests`` timeout for variable reads and writes, either a single value or
+        ``(connect, read)``.
+    method_timeout : float or tuple
+        Default timeout for method calls, which run agent code and may take much longer than a variable read.
+    timeouts : dict, optional
+        Per-endpoint overrides keyed by variable or method name, e.g. ``{"generate_report": 120}``.
+        A ``timeout`` passed to an individual call takes precedence over all of these.
+    breaker : CircuitBreaker, optional
+        Defaults to a new breaker with default thresholds.
+    read_ttl : float
+        Seconds a successful GET response is reused. Zero disables caching but keeps coalescing.
+    session : requests.Session, optional
+        Share an existing session, e.g. one :func:`pooled_session` for many agents. It is not closed by
+        :meth:`close`. By default the client creates its own on first use.
+    """
+
+    def __init__(
+        self,
+        address="localhost",
+        port=60615,
+        *,
+        pool_size=DEFAULT_POOL_SIZE,
+        timeout=DEFAULT_TIMEOUT,
+        method_timeout=DEFAULT_METHOD_TIMEOUT,
+        timeouts=None,
+        breaker=None,
+        read_ttl=DEFAULT_READ_TTL,
+        session=None,
+    ):
+        self.address = address
+        self.port = port
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.method_timeout = method_timeout
+        self.timeouts = dict(timeouts or {})
+        self.breaker = CircuitBreaker() if breaker is None else breaker
+        self.reads = ReadCoalescer(read_ttl, cacheable=lambda response: response.status_code == 200)
+        self._session = session
+        self._owns_session = session is None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """Client for the agent at ``url``, e.g. ``http://beamline-agent:60615``."""
+        parsed = urlsplit(url if "//" in url else f"http://{url}")
+        return cls(parsed.hostname, parsed.port or 60615, **kwargs)
+
+    def copy(self, *, share_reads=False, **kwargs):
+        """A client for the same agent with the same settings, but its own session, breaker and read cache.
+
+        Use it in a forked process, which must not share the parent's pooled connections, and close it when
+        done. ``kwargs`` override settings. With ``share_reads`` the copy uses this client's read cache
+        instead, so that writes through either invalidate reads made through both; only within one process.
+        """
+        settings = {
+            "pool_size": self.pool_size,
+            "timeout": self.timeout,
+            "method_timeout": self.method_timeout,
+            "timeouts": self.timeouts,
+            "read_ttl": self.reads.ttl,
+        }
+        copy = type(self)(self.address, self.port, **{**settings, **kwargs})
+        if share_reads:
+            copy.reads = self.reads
+        return copy
+
+    @property
+    def base_url(self):
+        return f"http://{self.address}:{self.port}"
+
+    def variable_url(self, name):
+        return f"{self.base_url}/api/variable/{name}"
+
+    @property
+    def session(self):
+        """The shared session, created on first use."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = pooled_session(self.pool_size)
+        return self._session
+
+    def _timeout(self, name, timeout, default=None):
+        if timeout is not None:
+            return timeout
+        return self.timeouts.get(name, self.timeout if default is None else default)
+
+    def _request(self, method, path, timeout, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuit open for agent at {self.base_url}, not calling {path}")
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", timeout=timeout, **kwargs)
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def get(self, path, *, timeout=None, fresh=False):
+        """``GET path``, served from the read cache unless ``fresh``."""
+        timeout = self._timeout(path, timeout)
+        if fresh:
+            return self._request("GET", path, timeout)
+        return self.reads.get(path, lambda: self._request("GET", path, timeout))
+
+    def post(self, path, payload, *, timeout=None):
+        try:
+            return self._request("POST", path, self._timeout(path, timeout), json=payload)
+        finally:
+            self.reads.invalidate()
+
+    def read_stats(self):
+        """Read coalescing counters: ``hits``, ``misses`` (sent upstream) and ``coalesced``."""
+        return self.reads.stats
+
+    def get_variable(self, name, *, timeout=None, fresh=False):
+        """``GET /api/variable/{name}``, returning the response; ``fresh`` bypasses the read cache."""
+        return self.get(f"/api/variable/{name}", timeout=self._timeout(name, timeout), fresh=fresh)
+
+    def set_variable(self, name, value, *, timeout=None):
+        """``POST /api/variable/{name}`` with ``{"value": value}``, returning the response."""
+        return self.post(f"/api/variable/{name}", {"value": value}, timeout=self._timeout(name, timeout))
+
+    def call_method(self, name, args=None, kwargs=None, *, timeout=None):
+        """Call a registered agent method with positional and keyword arguments, returning the response."""
+        timeout = self._timeout(name, timeout, default=self.method_timeout)
+        return self.set_variable(name, [list(args or []), dict(kwargs or {})], timeout=timeout)
+
+    def get_names(self, *, timeout=None):
+        """``GET /api/variables/names``, returning the response."""
+        return self.get("/api/variables/names", timeout=timeout)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None and self._owns_session:
+                self._session.close()
+                self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.address!r}, {self.port!r}, pool_size={self.pool_size})"
@@ -0,0 +1,95 @@
+"""Single-flight coalescing and short-lived caching of identical agent reads."""
+
+import threading
+import time
+
+DEFAULT_READ_TTL = 1.0
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ReadCoalescer:
+    """Share one upstream request between concurrent identical reads.
+
+    The first caller for a key runs the request; callers arriving while it is in flight wait for and share
+    its outcome, including any exception. Results accepted by ``cacheable`` are then served from memory for
+    ``ttl`` seconds. :meth:`invalidate` drops the cache and detaches in-flight requests, so reads issued after
+    a write never see a value from before it.
+
+    Parameters
+    ----------
+    ttl : float
+        Seconds a result stays cached. Zero disables caching but keeps coalescing.
+    cacheable : callable, optional
+        Predicate deciding whether a result may be cached, e.g. only successful responses.
+    """
+
+    def __init__(self, ttl=DEFAULT_READ_TTL, cacheable=None):
+        self.ttl = ttl
+        self.cacheable = cacheable or (lambda result: True)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._cache = {}
+        self._inflight = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, func):
+        """Return ``func()``, shared with concurrent and recent callers using the same ``key``."""
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.ttl:
+                self.hits += 1
+                return cached[1]
+            call = self._inflight.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                call = self._inflight[key] = _Call()
+                generation = self._generation
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is call:
+                    del self._inflight[key]
+                if (
+                    call.error is None
+                    and self.ttl > 0
+                    and generation == self._generation
+                    and self.cacheable(call.result)
+                ):
+                    self._cache[key] = (time.monotonic(), call.result)
+            call.done.set()
+        return call.result
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+            self._inflight.clear()
+            self._generation += 1
+
+    @property
+    def stats(self):
+        """Counters of reads served from cache (hits), sent upstream (misses) and shared in flight (coalesced)."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
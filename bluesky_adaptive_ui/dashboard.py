@@ -0,0 +1,1741 @@
+"""Agent dashboard shared by the apps: layout, callbacks and runtime state for one agent.
+
+:func:`create_app` builds a Dash app for one agent from a list of features, and :func:`mount_agents` serves
+one such app per agent from a single Flask server under URL prefixes, so a beamline running many agents needs
+one Python process instead of one per agent.
+
+The runtime state of a dashboard (agent client, switchboard source, shared cache, document buffer, Tiled node)
+lives on an :class:`AgentDashboard`. Its callback methods read that state when they run, so it can be
+reconfigured after the app is built, e.g. by :meth:`AgentDashboard.configure` from command line options.
+"""
+
+import argparse
+import base64
+import contextlib
+import json
+import threading
+import time
+import weakref
+
+import dash
+import dash_daq as daq
+import plotly.graph_objects as go
+import requests
+from dash import dash_table, dcc, html
+from dash.dependencies import Input, Output, State
+from markupsafe import escape
+
+from .async_client import AsyncAgentClient, run_sync
+from .background import (
+    DEFAULT_CALLBACK_CACHE,
+    PROGRESS_INTERVAL,
+    background_callback_manager,
+    call_with_progress,
+)
+from .batch import (
+    BATCH_COLUMNS,
+    DEFAULT_BATCH_CONCURRENCY,
+    MAX_BATCH_CONCURRENCY,
+    iter_batch,
+    parse_batch,
+    summarize,
+)
+from .cache import DEFAULT_SHARED_TTL, InProcessCache, cache_backend_from_url
+from .client import DEFAULT_METHOD_TIMEOUT, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT, AgentClient, pooled_session
+from .coalesce import DEFAULT_READ_TTL
+from .decimate import DEFAULT_MAX_POINTS, DEFAULT_WEBGL_THRESHOLD, decimate_figure, zoom_ranges
+from .documents import (
+    DEFAULT_STREAMS,
+    DEFAULT_TOPIC,
+    AgentDocumentBuffer,
+    DocumentConsumerThread,
+    kafka_dispatcher,
+    summarize_event,
+)
+from .hud import (
+    DEFAULT_FIGURE_CACHE_BYTES,
+    DEFAULT_RENDERER,
+    FigureCache,
+    HudRenderers,
+    build_hud,
+    report_marker,
+)
+from .hud_pool import DEFAULT_HUD_WORKERS, HudProcessPool, HudSuperseded
+from .push import EVENT_SOURCE_JS, STREAM_ROUTE, register_switchboard_stream
+from .runs import iter_pages, parse_metadata, parse_time, query_key, run_conditions, search_runs, tell_query
+from .switchboard import (
+    DEFAULT_POLL_INTERVAL,
+    SwitchboardCache,
+    SwitchboardPoller,
+    SwitchboardState,
+    fetch_switchboard_state,
+)
+from .uids import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_TELL_CONCURRENCY,
+    UID_SAMPLE,
+    TellState,
+    check_uids,
+    dedupe,
+    list_key,
+    parse_uids,
+    tell_in_chunks,
+)
+from .warmup import HUD_MODULES, Warmup
+
+FEATURES = ("uids", "variables", "methods", "documents", "hud")
+DEFAULT_FEATURES = ("uids", "variables", "methods", "documents")
+DOCUMENT_ROWS = 10
+HUD_TTL = 5.0
+STATS_ROUTE = "/api/agent-client/stats"
+MAX_LISTED_FAILURES = 20
+BACKGROUND_POLL_INTERVAL = 500
+
+# Dashboards by key (routes prefix and agent URL), for background callbacks to find theirs.
+_DASHBOARDS = weakref.WeakValueDictionary()
+
+_FAILING = {"text-align": "center", "color": "red"}
+_SUCCESS = {"text-align": "center", "color": "green"}
+_HIDDEN = {"display": "none"}
+_SHOWN = {"display": "block", "text-align": "center"}
+_INDICATOR_COLUMN = {
+    "display": "flex",
+    "flex-direction": "column",
+    "align-items": "center",
+    "justify-content": "center",
+}
+_SWITCHBOARD_OUTPUTS = (
+    ("ask-on-tell-output", "children"),
+    ("indicator-ask-on-tell", "color"),
+    ("report-on-tell-output", "children"),
+    ("indicator-report-on-tell", "color"),
+    ("queue-front-output", "children"),
+    ("indicator-queue-front", "color"),
+    ("switchboard-header", "children"),
+)
+
+
+def _status(ok):
+    return html.Div(children=[html.P("Success" if ok else "FAILING")], style=_SUCCESS if ok else _FAILING)
+
+
+def _indicator(id_, label, button_id, output_id):
+    return html.Div(
+        style=_INDICATOR_COLUMN,
+        children=[
+            daq.Indicator(id=id_, label=label, labelPosition="top", width=20, height=20, color="black"),
+            html.Button("On/Off", id=button_id, n_clicks=0),
+            html.Div(id=output_id, style={"text-align": "center", "color": "red"}),
+        ],
+    )
+
+
+def _trigger(label, id_, output_id):
+    return html.Div(
+        children=[
+            html.Button(label, id=id_, n_clicks=0, style={"background-color": "darkgreen", "color": "white"}),
+            html.Div(id=output_id),
+            *_background_controls(id_),
+        ]
+    )
+
+
+def _pooled(client, concurrency):
+    """Context of ``client``, or of a copy with ``concurrency`` connections sharing its read cache if it has fewer.
+
+    The copy is closed on exit.
+    """
+    if client.pool_size >= concurrency:
+        return contextlib.nullcontext(client)
+    return client.copy(pool_size=concurrency, share_reads=True)
+
+
+def _background_controls(id_):
+    """Progress text, cancel button and completion stores of the background call started by button ``id_``."""
+    return [
+        html.Div(id=f"{id_}-progress", style=_HIDDEN),
+        html.Button("Cancel", id=f"{id_}-cancel", n_clicks=0, style=_HIDDEN),
+        dcc.Store(id=f"{id_}-done"),
+        dcc.Store(id=f"{id_}-refreshed"),
+    ]
+
+
+def _names_table(names):
+    return dash_table.DataTable(
+        data=[{"Names": name} for name in names],
+        columns=[{"name": "Names", "id": "Names"}],
+        style_data={"whiteSpace": "normal", "height": "auto"},
+        style_cell={"padding": "8px", "textAlign": "left"},
+        style_header={"fontWeight": "bold"},
+        fill_width=False,
+    )
+
+
+def _documents_table(events):
+    rows = [summarize_event(event) for event in events[-DOCUMENT_ROWS:]][::-1]
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    return dash_table.DataTable(
+        data=rows,
+        columns=[{"name": column, "id": column} for column in columns],
+        style_cell={"padding": "4px", "textAlign": "left"},
+        style_header={"fontWeight": "bold"},
+        fill_width=False,
+    )
+
+
+class AgentDashboard:
+    """Runtime state and callbacks of one agent's dashboard.
+
+    Parameters
+    ----------
+    client : AgentClient, optional
+        Defaults to an agent on ``localhost:60615``.
+    features : sequence of str
+        Optional sections from :data:`FEATURES` to show. The switchboard is always shown.
+    cache_backend : CacheBackend, optional
+        Where switchboard reads and HUD figures are shared with other workers, see
+        :mod:`bluesky_adaptive_ui.cache`. Defaults to an :class:`~bluesky_adaptive_ui.cache.InProcessCache`.
+    """
+
+    def __init__(self, client=None, features=DEFAULT_FEATURES, *, cache_backend=None):
+        unknown = set(features) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown dashboard features {sorted(unknown)}, expected some of {FEATURES}")
+        self.features = tuple(features)
+        self.key = "/"
+        self.routes_prefix = None
+        self.key_store = None
+        self.app = None
+        self.cache_backend = InProcessCache() if cache_backend is None else cache_backend
+        self.switchboard_ttl = DEFAULT_SHARED_TTL
+        self.document_buffer = None
+        self.document_consumer = None
+        self.tiled_profile = None
+        self._tiled_node = None
+        self._tiled_lock = threading.Lock()
+        self.hud_renderers = HudRenderers()
+        self.hud_figures = FigureCache()
+        self.hud_max_points = DEFAULT_MAX_POINTS
+        self.hud_webgl_threshold = DEFAULT_WEBGL_THRESHOLD
+        self.hud_raster_threshold = None
+        self.hud_pool = None
+        self.hud_workers = 0
+        self.warmup = None
+        self.documents_section = None
+        self.documents_interval = None
+        self.set_agent_client(AgentClient() if client is None else client)
+
+    # Runtime configuration
+
+    def set_agent_client(self, client):
+        previous = getattr(self, "async_agent_client", None)
+        self.agent_client = client
+        self.async_agent_client = AsyncAgentClient(client)
+        if previous is not None:
+            previous.close()
+        self.switchboard = SwitchboardCache(self._fetch_switchboard)
+        self._update_key()
+
+    def register(self, routes_prefix):
+        """Let background callbacks find this dashboard, served under ``routes_prefix``."""
+        self.routes_prefix = routes_prefix
+        self._update_key()
+
+    def _update_key(self):
+        # The key is a state of every background callback, so it also keeps the callback cache entries of
+        # dashboards for different agents apart when they share a cache directory.
+        if self.routes_prefix is None:
+            return
+        if _DASHBOARDS.get(self.key) is self:
+            del _DASHBOARDS[self.key]
+        self.key = f"{self.routes_prefix}{self.agent_client.base_url}"
+        _DASHBOARDS[self.key] = self
+        if self.key_store is not None:
+            self.key_store.data = self.key
+
+    def set_cache_backend(self, backend):
+        """Share switchboard reads with other workers through ``backend``, see :mod:`bluesky_adaptive_ui.cache`."""
+        self.cache_backend = backend
+
+    def _switchboard_key(self):
+        return f"switchboard:{self.agent_client.base_url}"
+
+    def _fetch_switchboard(self):
+        """Read the switchboard through :attr:`cache_backend`, so workers sharing a backend share one read."""
+        data = self.cache_backend.get_or_fetch(
+            self._switchboard_key(),
+            lambda: run_sync(fetch_switchboard_state(self.async_agent_client)).to_dict(),
+            self.switchboard_ttl,
+        )
+        return SwitchboardState.from_dict(data)
+
+    def invalidate_switchboard(self):
+        """Make the next switchboard read reach the agent, e.g. after a write."""
+        self.cache_backend.invalidate(self._switchboard_key())
+        self.switchboard.invalidate()
+
+    def enable_polling(self, interval=DEFAULT_POLL_INTERVAL):
+        """Serve the switchboard from a background poller instead of reading the agent per page load.
+
+        This also turns on server push: open pages receive each changed snapshot over server-sent events.
+        """
+        if self.poller is not None:
+            self.poller.stop()
+        self.switchboard_ttl = interval
+        self.switchboard = SwitchboardPoller(self._fetch_switchboard, interval).start()
+
+    @property
+    def poller(self):
+        """The active :class:`SwitchboardPoller`, or None when polling is disabled."""
+        return self.switchboard if isinstance(self.switchboard, SwitchboardPoller) else None
+
+    def enable_documents(self, dispatcher, maxlen=100, agent_name=None):
+        """Show live report/ask/tell panels fed by ``dispatcher``, e.g. :func:`kafka_dispatcher`.
+
+        With ``agent_name``, only documents of that agent's runs are shown.
+        """
+        self.document_buffer = AgentDocumentBuffer(maxlen=maxlen, agent_name=agent_name)
+        self.document_consumer = DocumentConsumerThread(dispatcher, self.document_buffer).start()
+        if self.documents_section is not None:
+            self.documents_section.style = {"width": "100%", "display": "inline-block", "vertical-align": "top"}
+            self.documents_interval.disabled = False
+
+    def init_tiled_node(self, profile):
+        """Connect to Tiled now. Prefer setting :attr:`tiled_profile` and letting the warm-up connect."""
+        from tiled.client import from_profile
+
+        self.tiled_node = from_profile(profile)
+
+    @property
+    def tiled_node(self):
+        """Tiled node with agent reports, connected from :attr:`tiled_profile` on first use."""
+        if self._tiled_node is None and self.tiled_profile is not None:
+            with self._tiled_lock:
+                if self._tiled_node is None:
+                    self.init_tiled_node(self.tiled_profile)
+        return self._tiled_node
+
+    @tiled_node.setter
+    def tiled_node(self, node):
+        self._tiled_node = node
+
+    def start_warmup(self):
+        """Import Tiled and the default HUD renderer and connect to Tiled on a background thread."""
+        tasks = [lambda: self.tiled_node]
+        if self.hud_renderers.default is not None:
+            tasks.append(lambda: self.hud_renderers.get(self.hud_renderers.default))
+        self.warmup = Warmup(HUD_MODULES, tasks=tasks).start()
+        return self.warmup
+
+    def configure(self, args):
+        """Apply options from :func:`build_parser` that must be in place before the app serves requests."""
+        self.set_cache_backend(cache_backend_from_url(args.cache_backend))
+        self.set_agent_client(
+            AgentClient(
+                args.agent_address,
+                args.agent_port,
+                pool_size=args.agent_pool_size,
+                timeout=args.agent_timeout,
+                method_timeout=args.agent_method_timeout,
+                read_ttl=args.agent_read_ttl,
+            )
+        )
+        if "hud" in self.features or "uids" in self.features:
+            self.tiled_profile = args.tiled_profile
+        if "hud" in self.features:
+            for spec in args.hud_renderer:
+                name, _, renderer = spec.partition("=")
+                self.hud_renderers.register(name, renderer)
+            self.hud_renderers.default = args.default_hud_renderer or None
+            self.hud_figures.max_bytes = int(args.hud_cache_mb * 2**20)
+            self.hud_max_points = args.hud_max_points
+            self.hud_webgl_threshold = args.hud_webgl_threshold
+            self.hud_raster_threshold = args.hud_raster_threshold
+            self.hud_workers = args.hud_workers
+        if args.callback_cache is not None and getattr(self.app, "_background_manager", None) is not None:
+            self.app._background_manager = background_callback_manager(args.callback_cache)
+
+    def start_services(self, args):
+        """Start background threads. Under a forking server this must run in each worker, after the fork."""
+        if args.poll_interval is not None:
+            self.enable_polling(args.poll_interval)
+        if "documents" in self.features and args.kafka_bootstrap_servers is not None:
+            self.enable_documents(
+                kafka_dispatcher(args.kafka_bootstrap_servers, args.kafka_topic, args.kafka_group_id),
+                agent_name=args.document_agent_name,
+            )
+        if "hud" in self.features:
+            self.start_warmup()
+            if self.hud_workers and self.tiled_profile is not None:
+                self.enable_hud_pool(self.hud_workers)
+
+    def _read_switchboard_variable(self, variable_name, fresh=False):
+        """Current value of a switchboard variable, or None if it cannot be read.
+
+        When polling is enabled this is served from the poller's snapshot without contacting the agent, unless
+        ``fresh``, which reads the agent, bypassing the read cache too, e.g. before writing a value based on it.
+        """
+        if self.poller is not None and not fresh:
+            state = self.poller.get()
+            if variable_name in state.variables:
+                return state.variables[variable_name]
+        try:
+            response = self.agent_client.get_variable(variable_name, fresh=fresh)
+        except requests.RequestException:
+            return None
+        if response.status_code != 200:
+            return None
+        return response.json().get(variable_name, "UNKNOWN")
+
+    # Layout
+
+    def layout(self):
+        self.key_store = dcc.Store(id="dashboard-key", data=self.key)
+        children = [self._switchboard_column()]
+        if "variables" in self.features:
+            children.append(self._variables_column())
+        if "methods" in self.features:
+            children.append(self._methods_column())
+        elif "hud" in self.features:
+            children.append(html.Div(className="dashboard-column", children=[self._hud_section()]))
+        if "documents" in self.features:
+            children.append(self._documents_column())
+        children += [
+            dcc.Interval(id="refresh-page", interval=0.1 * 1000, n_intervals=0, max_intervals=1, disabled=False),
+            dcc.Store(id="switchboard-store"),
+            dcc.Store(id="switchboard-push"),
+            self.key_store,
+        ]
+        return html.Div(children=children, className="dashboard-container")
+
+    def _switchboard_column(self):
+        children = [
+            html.H1(id="switchboard-header", children="Agent Switchboard", style={"text-align": "center"}),
+            html.Div(
+                style={"display": "flex", "justify-content": "space-evenly"},
+                children=[
+                    _indicator(
+                        "indicator-ask-on-tell", "Continuous Asking", "button-ask-on-tell", "ask-on-tell-output"
+                    ),
+                    _indicator(
+                        "indicator-report-on-tell",
+                        "Continuous Reporting",
+                        "button-report-on-tell",
+                        "report-on-tell-output",
+                    ),
+                    _indicator(
+                        "indicator-queue-front", "Add to Front", "button-queue-front", "queue-front-output"
+                    ),
+                    _trigger("Generate Report", "trigger-generate-report", "generate-report-output"),
+                    _trigger(
+                        "Generate Suggestion for Queue", "trigger-add-suggestion-queue", "add-to-queue-output"
+                    ),
+                ],
+            ),
+            html.Div(style={"margin-bottom": "30px"}),
+        ]
+        if "uids" in self.features:
+            children.append(
+                html.Div(
+                    style=_INDICATOR_COLUMN,
+                    children=[
+                        html.Button(
+                            "Tell Agent By UID",
+                            id="submit-uids-button",
+                            n_clicks=0,
+                            style={
+                                "background-color": "darkgreen",
+                                "color": "white",
+                                "margin": "auto",
+                                "display": "block",
+                                "width": "45%",
+                            },
+                        ),
+                        dcc.Textarea(
+                            id="submit-uids-input",
+                            placeholder="Enter list of UIDs to tell the agent about.\
+                                \nThis can be in a comma separated list, or with one UID per line.",
+                            style={"width": "80%", "height": "100px", "horizontal-align": "center"},
+                        ),
+                        html.Div(
+                            children=[
+                                html.Label("UIDs per request "),
+                                dcc.Input(
+                                    id="submit-uids-chunk-size", type="number", min=1, value=DEFAULT_CHUNK_SIZE
+                                ),
+                                html.Label(" Requests at a time "),
+                                dcc.Input(
+                                    id="submit-uids-concurrency",
+                                    type="number",
+                                    min=1,
+                                    max=MAX_BATCH_CONCURRENCY,
+                                    value=DEFAULT_TELL_CONCURRENCY,
+                                ),
+                                html.Button("Start over", id="submit-uids-reset", n_clicks=0),
+                            ]
+                        ),
+                        html.Button("Check UIDs", id="check-uids-button", n_clicks=0),
+                        html.Div(id="check-uids-output"),
+                        dcc.Store(id="submit-uids-check"),
+                        html.Progress(id="submit-uids-bar", value=0, max=1, style={"width": "80%"}),
+                        *_background_controls("submit-uids-button"),
+                        html.Div(id="submit-uids-output"),
+                        dcc.Store(id="submit-uids-state", storage_type="session"),
+                        dcc.Store(id="submit-uids-checkpoint"),
+                    ],
+                )
+            )
+            children.append(self._query_section())
+        children.append(html.Div(style={"margin-bottom": "15px"}))
+        return html.Div(
+            className="dashboard-column",
+            style={
+                "width": "100%",
+                "display": "inline-block",
+                "vertical-align": "top",
+                "horizontal-align": "center",
+                "border": "2px solid black",
+                "padding": "5",
+                "margin": "0px",
+            },
+            children=children,
+        )
+
+    def _query_section(self):
+        return html.Div(
+            style=_INDICATOR_COLUMN,
+            children=[
+                html.H3("Select Runs From the Catalog"),
+                dcc.Input(id="query-since", type="text", placeholder="Started from, e.g. 2024-05-01 08:00"),
+                dcc.Input(id="query-until", type="text", placeholder="Started until"),
+                dcc.Input(id="query-plan-name", type="text", placeholder="Plan name"),
+                dcc.Input(id="query-scan-id-min", type="number", placeholder="First scan_id"),
+                dcc.Input(id="query-scan-id-max", type="number", placeholder="Last scan_id"),
+                dcc.Textarea(
+                    id="query-metadata",
+                    placeholder="Start document metadata, one key=value per line, e.g.\nsample=LaB6",
+                    style={"width": "80%", "height": "50px"},
+                ),
+                html.Div(
+                    children=[
+                        html.Button("Count Runs", id="query-count-button", n_clicks=0),
+                        html.Button("Tell Agent About Matching Runs", id="query-tell-button", n_clicks=0),
+                        html.Button("Start over", id="query-tell-reset", n_clicks=0),
+                    ]
+                ),
+                html.Div(id="query-count-output"),
+                html.Progress(id="query-tell-bar", value=0, max=1, style={"width": "80%"}),
+                *_background_controls("query-tell-button"),
+                html.Div(id="query-tell-output"),
+                dcc.Store(id="query-tell-state", storage_type="session"),
+                dcc.Store(id="query-tell-checkpoint"),
+            ],
+        )
+
+    def _variables_column(self):
+        return html.Div(
+            className="dashboard-column",
+            style={"width": "50%", "display": "inline-block", "vertical-align": "top"},
+            children=[
+                html.H1("Variable Dashboard", style={"text-align": "center"}),
+                html.Div(
+                    id="variable-container",
+                    children=[
+                        dcc.Input(id="variable-name-input", type="text", placeholder="Enter variable name"),
+                        html.Button("Get Variable", id="get-variable-button", n_clicks=0),
+                        html.Div(id="variable-output"),
+                        dcc.Input(id="variable-name-update-input", type="text", placeholder="Enter variable name"),
+                        dcc.Input(id="new-value-input", type="text", placeholder="Enter new value"),
+                        html.Button("Update Variable", id="update-variable-button", n_clicks=0),
+                        html.Div(id="variable-input-success"),
+                    ],
+                ),
+                html.H1("Available Variables and Methods"),
+                html.Button("Refresh Available", id="get-names-button", n_clicks=0),
+                html.Div(id="names-output"),
+            ],
+        )
+
+    def _methods_column(self):
+        children = [
+            html.H1("Method Dashboard", style={"text-align": "center"}),
+            html.P(
+                "This is a little less user-friendly, but can be used to call an arbitrary method that has been "
+                "registered for your agent. You are responsible for knowing the expected arguments and keyword "
+                "arguments. A responsible use case would be a method that takes no arguments, like "
+                "enable_continuous_reporting."
+            ),
+            html.Div(
+                id="method-container",
+                children=[
+                    dcc.Input(id="method-name-input", type="text", placeholder="Enter method name"),
+                    dcc.Textarea(
+                        id="method-args-input",
+                        placeholder="Enter list of arguments, e.g., \n['det1', 10, 'det2', 15]",
+                        style={"width": "100%", "height": "50px"},
+                    ),
+                    dcc.Textarea(
+                        id="method-kwargs-input",
+                        placeholder='Enter dictionary of keyword arguments using double-quotes ("), e.g.,\n'
+                        '{"det": "det1", "pos", 15}',
+                        style={"width": "100%", "height": "50px"},
+                    ),
+                    html.Button("Call method", id="call-method-button", n_clicks=0),
+                    html.Div(id="call-method-success"),
+                    *_background_controls("call-method-button"),
+                ],
+            ),
+            self._batch_section(),
+        ]
+        if "hud" in self.features:
+            children.append(self._hud_section())
+        return html.Div(
+            className="dashboard-column",
+            style={"width": "50%", "display": "inline-block", "vertical-align": "top"},
+            children=children,
+        )
+
+    def _batch_section(self):
+        return html.Div(
+            id="batch-container",
+            children=[
+                html.H3("Batch"),
+                html.P(
+                    "Call the method above once per line, with up to the given number of calls at a time. Each "
+                    "line is a list of arguments, a dictionary of keyword arguments, [args, kwargs], or a single "
+                    "value such as a uid."
+                ),
+                dcc.Textarea(
+                    id="batch-calls-input",
+                    placeholder='["det1", 10]\n{"det": "det2", "pos": 15}\n"a1b2c3"',
+                    style={"width": "100%", "height": "100px"},
+                ),
+                dcc.Upload(
+                    id="batch-calls-upload",
+                    children=html.Div("Drop or select a file of JSON lines"),
+                    style={"width": "100%", "border": "1px dashed grey", "text-align": "center"},
+                ),
+                dcc.Input(
+                    id="batch-concurrency",
+                    type="number",
+                    min=1,
+                    max=MAX_BATCH_CONCURRENCY,
+                    value=DEFAULT_BATCH_CONCURRENCY,
+                ),
+                html.Button("Run batch", id="batch-call-button", n_clicks=0),
+                *_background_controls("batch-call-button"),
+                html.Div(id="batch-summary"),
+                dash_table.DataTable(
+                    id="batch-results",
+                    columns=[{"name": column, "id": column} for column in BATCH_COLUMNS],
+                    style_cell={"padding": "4px", "textAlign": "left"},
+                    style_header={"fontWeight": "bold"},
+                    style_data_conditional=[{"if": {"filter_query": '{ok} = "no"'}, "backgroundColor": "#f8d7da"}],
+                    page_size=20,
+                    fill_width=False,
+                ),
+            ],
+        )
+
+    def _hud_section(self):
+        return html.Div(
+            children=[
+                html.Button("Generate and Plot Report", id="trigger-generate-hud", n_clicks=0),
+                dcc.Graph(id="hud-plot", figure={}),
+                dcc.Store(id="hud-shown"),
+            ]
+        )
+
+    def _documents_column(self):
+        self.documents_interval = dcc.Interval(
+            id="documents-refresh", interval=1000, n_intervals=0, disabled=self.document_buffer is None
+        )
+        self.documents_section = html.Div(
+            className="dashboard-column",
+            style={"display": "none"},
+            children=[
+                html.H1("Live Agent Documents", style={"text-align": "center"}),
+                *(
+                    html.Div(children=[html.H2(stream.capitalize()), html.Div(id=f"documents-{stream}")])
+                    for stream in DEFAULT_STREAMS
+                ),
+                self.documents_interval,
+                dcc.Store(id="documents-version"),
+            ],
+        )
+        if self.document_buffer is not None:
+            self.documents_section.style = {"width": "100%", "display": "inline-block", "vertical-align": "top"}
+        return self.documents_section
+
+    # Callbacks
+
+    def _toggle(self, n_clicks, variable_name):
+        if n_clicks > 0:
+            current = self._read_switchboard_variable(variable_name, fresh=True)
+
+            if current is not None:
+                resp_str = str(current)
+                new_value = resp_str not in ["True", "true", "on"]
+                try:
+                    response = self.agent_client.set_variable(variable_name, new_value)
+                except requests.RequestException:
+                    return ("FAILING", "black")
+                self.invalidate_switchboard()
+                if response.status_code == 200:
+                    return ("", "green" if new_value else "gray")
+                else:
+                    return ("FAILING", "black")
+
+            else:
+                return (self.agent_client.variable_url(variable_name), "black")
+
+        return "", "black"
+
+    def toggle_ask_on_tell(self, n_clicks):
+        return self._toggle(n_clicks, "ask_on_tell")
+
+    def toggle_report_on_tell(self, n_clicks):
+        return self._toggle(n_clicks, "report_on_tell")
+
+    def toggle_queue_add_position(self, n_clicks):
+        variable_name = "queue_add_position"
+        if n_clicks > 0:
+            current = self._read_switchboard_variable(variable_name, fresh=True)
+
+            if current is not None:
+                resp_str = str(current)
+                new_value = "front" if resp_str != "front" else "back"
+                try:
+                    response = self.agent_client.set_variable(variable_name, new_value)
+                except requests.RequestException:
+                    return ["FAILING", "black"]
+                self.invalidate_switchboard()
+                if response.status_code == 200:
+                    return ["", "green" if new_value == "front" else "gray"]
+                else:
+                    return ["FAILING", "black"]
+
+            else:
+                return [self.agent_client.variable_url(variable_name), False]
+
+        return "", "black"
+
+    def _call(self, method_name, args=None):
+        try:
+            response = self.agent_client.call_method(method_name, args)
+        except requests.RequestException:
+            return _status(False)
+        self.invalidate_switchboard()
+        return _status(response.status_code == 200)
+
+    def trigger_add_to_queue(self, n_clicks):
+        if n_clicks:
+            return self._call("add_suggestions_to_queue", [1])
+
+    def trigger_generate_report(self, n_clicks):
+        if n_clicks:
+            return self._call("generate_report")
+
+    def check_uids(self, n_clicks, text, chunk_size=None):
+        """Count duplicates in the pasted uids and, with a Tiled catalog, those missing from it."""
+        uids = parse_uids(text)
+        if not n_clicks or not uids:
+            raise dash.exceptions.PreventUpdate
+        try:
+            check = check_uids(uids, self.tiled_node, chunk_size or DEFAULT_CHUNK_SIZE)
+        except Exception as err:
+            return html.P(f"Could not search the catalog: {err}", style={"color": "red"}), None
+        summary = html.P(check.describe(), style={"color": "orange" if check.missing else "green"})
+        return summary, {"key": check.key, "missing": check.missing}
+
+    def _tell_uids(
+        self, client, open_node, text, chunk_size, concurrency, previous=None, set_progress=None, check=None
+    ):
+        """``[summary, bar value, bar max, state]`` after telling the agent about the uids in ``text``.
+
+        Repeated uids are sent once, and uids missing from the catalog are not sent: those that ``check`` (from
+        :meth:`check_uids`) found missing if it is of the same list, otherwise those missing from
+        ``open_node()``, unless that is None. Resumes ``previous``, a
+        :class:`~bluesky_adaptive_ui.uids.TellState`, if it is of the same uids and chunk size. ``set_progress``
+        receives ``[bar value, bar max, text, state]`` as chunks complete.
+        """
+        uids, duplicates = dedupe(parse_uids(text))
+        if not uids:
+            raise dash.exceptions.PreventUpdate
+        missing, unchecked = set(), None
+        if check and check.get("key") == list_key(uids):
+            missing = set(check.get("missing") or ())
+        else:
+            try:
+                node = open_node()
+                if node is not None:
+                    missing = set(check_uids(uids, node, chunk_size or DEFAULT_CHUNK_SIZE).missing)
+            except Exception as err:
+                unchecked = err
+        skipped = [uid for uid in uids if uid in missing]
+        uids = [uid for uid in uids if uid not in missing]
+        chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        concurrency = concurrency or DEFAULT_TELL_CONCURRENCY
+        state = TellState.for_uids(uids, chunk_size, previous)
+        failures = []
+        reported = time.monotonic()
+        with _pooled(client, concurrency) as client:
+            for result in tell_in_chunks(client, uids, chunk_size, concurrency, state=state):
+                if not result.ok:
+                    failures.append(result)
+                if set_progress is not None and time.monotonic() - reported >= PROGRESS_INTERVAL:
+                    text = f"{len(state['done'])} of {state['total']} requests done, {len(failures)} failed"
+                    set_progress([len(state["done"]), state["total"], text, dict(state)])
+                    reported = time.monotonic()
+        summary = [
+            _status(state.complete),
+            html.P(f"{len(state['done'])} of {state['total']} requests of up to {chunk_size} uids accepted"),
+        ]
+        if duplicates or skipped:
+            summary.append(
+                html.P(f"Left out {len(duplicates)} repeated uids and {len(skipped)} not found in the catalog.")
+            )
+        if unchecked is not None:
+            summary.append(html.P(f"Could not search the catalog, all uids were sent: {unchecked}"))
+        if failures:
+            summary.append(html.P("Press the button again to retry the failed requests:"))
+            summary.append(
+                html.Ul(
+                    [html.Li(result.describe()) for result in sorted(failures, key=lambda result: result.index)]
+                )
+            )
+        return [html.Div(summary), len(state["done"]), state["total"], dict(state)]
+
+    def submit_uids(self, n_clicks, args=None, chunk_size=None, concurrency=None, state=None, check=None):
+        if not n_clicks:
+            raise dash.exceptions.PreventUpdate
+        try:
+            return self._tell_uids(
+                self.agent_client, lambda: self.tiled_node, args, chunk_size, concurrency, state, check=check
+            )
+        finally:
+            self.invalidate_switchboard()
+
+    def checkpoint_uids(self, checkpoint):
+        """Keep the progress of a telling in the page, where a cancelled run can be resumed from."""
+        if not checkpoint:
+            raise dash.exceptions.PreventUpdate
+        return checkpoint
+
+    def reset_uids(self, n_clicks):
+        return None, 0
+
+    def open_tiled_node(self):
+        """A new connection to the run catalog, e.g. for a forked process.
+
+        The shared node if it was set directly rather than from :attr:`tiled_profile`.
+        """
+        if self.tiled_profile is None:
+            return self.tiled_node
+        from tiled.client import from_profile
+
+        return from_profile(self.tiled_profile)
+
+    def _search_runs(self, node, since, until, plan_name, scan_id_min, scan_id_max, metadata):
+        """``(search results, conditions)`` for the query panel's fields; raises ValueError for invalid ones."""
+        if node is None:
+            raise ValueError("no Tiled catalog is configured, see --tiled-profile")
+        conditions = run_conditions(
+            parse_time(since), parse_time(until), plan_name, scan_id_min, scan_id_max, parse_metadata(metadata)
+        )
+        return search_runs(node, conditions), conditions
+
+    def count_runs(self, n_clicks, *query):
+        if not n_clicks:
+            raise dash.exceptions.PreventUpdate
+        try:
+            results, _ = self._search_runs(self.tiled_node, *query)
+            first = next(iter_pages(results, UID_SAMPLE), [])
+        except Exception as err:
+            return html.P(f"Could not search the catalog: {err}", style={"color": "red"})
+        return html.P(f"{len(results)} runs match" + (f", e.g. {', '.join(first)}" if first else ""))
+
+    def _tell_query(self, client, open_node, query, chunk_size, concurrency, previous=None, set_progress=None):
+        """``[summary, bar value, bar max, state]`` after telling the agent about the runs matching ``query``.
+
+        ``open_node()`` gives the catalog to search. Resumes ``previous`` if it is of the same query, retrying the
+        runs that failed first. ``set_progress`` receives ``[bar value, bar max, text, state]`` after each page.
+        """
+        try:
+            results, conditions = self._search_runs(open_node(), *query)
+            total = len(results)
+        except Exception as err:
+            return [html.P(f"Could not search the catalog: {err}", style={"color": "red"}), 0, 1, previous]
+        chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        concurrency = concurrency or DEFAULT_TELL_CONCURRENCY
+        key = query_key(conditions)
+        state = dict(previous) if previous and previous.get("key") == key else {"key": key}
+        failures = []
+        with _pooled(client, concurrency) as client:
+            for chunks in tell_query(client, results, state, chunk_size, concurrency):
+                failures.extend(chunk for chunk in chunks if not chunk.ok)
+                del failures[MAX_LISTED_FAILURES:]
+                if set_progress is not None:
+                    text = f"{state['offset']} of {total} runs sent, {state['failed']} failed"
+                    set_progress([state["offset"], total, text, dict(state)])
+        summary = [
+            _status(not state.get("failed")),
+            html.P(f"{state.get('told', 0)} of {total} matching runs told, {state.get('failed', 0)} failed"),
+        ]
+        if failures:
+            summary.append(html.P("Press the button again to retry the failed runs:"))
+            summary.append(html.Ul([html.Li(chunk.describe()) for chunk in failures]))
+        return [html.Div(summary), state.get("offset", 0), max(total, 1), state]
+
+    def tell_query_runs(self, n_clicks, *query_and_options):
+        if not n_clicks:
+            raise dash.exceptions.PreventUpdate
+        *query, chunk_size, concurrency, state = query_and_options
+        try:
+            return self._tell_query(
+                self.agent_client, lambda: self.tiled_node, query, chunk_size, concurrency, state
+            )
+        finally:
+            self.invalidate_switchboard()
+
+    def get_variable(self, n_clicks, n_submit, variable_name):
+        if n_clicks or n_submit:
+            try:
+                response = self.agent_client.get_variable(variable_name)
+            except requests.RequestException:
+                return self.agent_client.variable_url(variable_name)
+            if response.status_code == 200:
+                return str(response.json().get(variable_name, "UNKNOWN"))
+            else:
+                return self.agent_client.variable_url(variable_name)
+
+    def update_variable(self, n_clicks, n_submit, variable_name, new_value):
+        if n_clicks or n_submit:
+            try:
+                response = self.agent_client.set_variable(variable_name, new_value)
+            except requests.RequestException:
+                return "FAILING"
+            self.invalidate_switchboard()
+            if response.status_code == 200:
+                return response.json().get(variable_name, "UNKNOWN")
+
+    def call_method(self, n_clicks, method_name, args=None, kwargs=None):
+        if n_clicks:
+            args = json.loads(args) if args is not None else []
+            kwargs = json.loads(kwargs) if kwargs is not None else {}
+            payload = {"value": [args, kwargs]}
+            try:
+                response = self.agent_client.call_method(method_name, args, kwargs)
+            except requests.RequestException:
+                return html.Div(payload)
+            self.invalidate_switchboard()
+            if response.status_code == 200:
+                return "Success"
+            else:
+                html.Div(payload)
+
+    def load_batch_file(self, contents, filename):
+        """Text of an uploaded batch file, for the batch input box."""
+        if not contents:
+            raise dash.exceptions.PreventUpdate
+        return base64.b64decode(contents.partition(",")[2]).decode("utf-8", errors="replace")
+
+    def _run_batch(self, client, method_name, text, concurrency, set_progress=None):
+        """Rows and summary of the batch ``text``, reporting both through ``set_progress`` as calls complete."""
+        if not method_name:
+            return [], "Enter a method name."
+        try:
+            calls = parse_batch(text or "")
+        except ValueError as err:
+            return [], f"Invalid JSON on {err}"
+        concurrency = concurrency or DEFAULT_BATCH_CONCURRENCY
+        results = []
+        reported = time.monotonic()
+        with _pooled(client, concurrency) as client:
+            for result in iter_batch(client, method_name, calls, concurrency):
+                results.append(result)
+                if set_progress is not None and time.monotonic() - reported >= PROGRESS_INTERVAL:
+                    set_progress([[result.to_row() for result in results], summarize(results, len(calls))])
+                    reported = time.monotonic()
+        return [result.to_row() for result in results], summarize(results, len(calls))
+
+    def call_batch(self, n_clicks, method_name, text, concurrency):
+        if not n_clicks:
+            raise dash.exceptions.PreventUpdate
+        try:
+            return self._run_batch(self.agent_client, method_name, text, concurrency)
+        finally:
+            self.invalidate_switchboard()
+
+    # Background callbacks. Dash runs these in a forked process, so they use a fresh client, and identify the
+    # dashboard by the key stored in the page: mounted dashboards share callback ids and so one registration.
+
+    def _method_job(self, set_progress, key, method_name, args=None, kwargs=None):
+        dashboard = _DASHBOARDS.get(key)
+        if dashboard is None:
+            raise dash.exceptions.PreventUpdate
+        try:
+            with dashboard.agent_client.copy() as client:
+                return call_with_progress(client, set_progress, method_name, args, kwargs)
+        except requests.RequestException:
+            return None
+
+    def add_to_queue_job(self, set_progress, n_clicks, key):
+        if not n_clicks:
+            raise dash.exceptions.PreventUpdate
+        response = self._method_job(set_progress, key, "add_suggestions_to_queue", [1])
+        return _status(response is not None and response.status_code == 200), time.time()
+
+    def generate_report_job(self, set_progress, n_clicks, key):
+        if not n_clicks:
+            raise dash.exceptions.PreventUpdate
+        response = self._method_job(set_progress, key, "generate_report")
+        return _status(response is not None and response.status_code == 200), time.time()
+
+    def call_method_job(self, set_progress, n_clicks, key, method_name, args=None, kwargs=None):
+        if not n_clicks:
+            raise dash.exceptions.PreventUpdate
+        args = json.loads(args) if args is not None else []
+        kwargs = json.loads(kwargs) if kwargs is not None else {}
+        response = self._method_job(set_progress, key, method_name, args, kwargs)
+        if response is not None and response.status_code == 200:
+            return "Success", time.time()
+        return html.Div({"value": [args, kwargs]}), time.time()
+
+    def call_batch_job(self, set_progress, n_clicks, key, method_name, text, concurrency):
+        dashboard = _DASHBOARDS.get(key)
+        if not n_clicks or dashboard is None:
+            raise dash.exceptions.PreventUpdate
+        with dashboard.agent_client.copy() as client:
+            rows, summary = self._run_batch(client, method_name, text, concurrency, set_progress)
+        return rows, summary, time.time()
+
+    def submit_uids_job(self, set_progress, n_clicks, key, text, chunk_size, concurrency, state, check):
+        dashboard = _DASHBOARDS.get(key)
+        if not n_clicks or dashboard is None:
+            raise dash.exceptions.PreventUpdate
+        with dashboard.agent_client.copy() as client:
+            told = self._tell_uids(
+                client, dashboard.open_tiled_node, text, chunk_size, concurrency, state, set_progress, check
+            )
+        return [*told, time.time()]
+
+    def tell_query_runs_job(self, set_progress, n_clicks, key, *query_and_options):
+        dashboard = _DASHBOARDS.get(key)
+        if not n_clicks or dashboard is None:
+            raise dash.exceptions.PreventUpdate
+        *query, chunk_size, concurrency, state = query_and_options
+        with dashboard.agent_client.copy() as client:
+            told = self._tell_query(
+                client, dashboard.open_tiled_node, query, chunk_size, concurrency, state, set_progress
+            )
+        return [*told, time.time()]
+
+    def method_job_done(self, done):
+        """Runs in the server process once a background call has finished, which may have changed the agent."""
+        # The call went through a copy of the client in another process, which left our read cache as it was.
+        self.agent_client.reads.invalidate()
+        self.invalidate_switchboard()
+        return done
+
+    def get_names(self, n_clicks):
+        if n_clicks > 0:
+            if self.poller is not None:
+                names = self.poller.get().names
+                return _names_table(names) if names is not None else None
+            try:
+                response = self.agent_client.get_names()
+            except requests.RequestException:
+                return None
+            if response.status_code == 200:
+                return _names_table(response.json().get("names", []))
+
+    def _switchboard_outputs(self, state):
+        outputs = [
+            *state.bool_indicator("ask_on_tell"),
+            *state.bool_indicator("report_on_tell"),
+            *state.queue_indicator(),
+            state.header,
+        ]
+        if "variables" in self.features:
+            outputs.append(_names_table(state.names) if state.names is not None else None)
+        return tuple(outputs)
+
+    def refresh_switchboard(self, n_intervals):
+        """Fill every page-load output from one concurrent batch of agent reads, or from the cached snapshot."""
+        return self._switchboard_outputs(self.switchboard.get())
+
+    def render_pushed_switchboard(self, data):
+        """Redraw the switchboard from a snapshot pushed by the server, without contacting the agent."""
+        return self._switchboard_outputs(SwitchboardState.from_dict(data))
+
+    def _hud_figures(self, uid, node, marker, agent_name, full=False):
+        """``{"view": figure to send, "full_json": full-resolution figure, "points": ...}`` for run ``uid``.
+
+        ``points`` is as returned by :func:`~bluesky_adaptive_ui.hud.build_hud`. The figures are rebuilt only
+        when the agent has written a report since the last build: built figures are kept in :attr:`hud_figures`
+        by uid and report count. Workers building the same figure at once share one build through
+        :attr:`cache_backend`, which holds only the decimated view; the full-resolution figure stays in the
+        process that built it, so ``full_json`` may be None unless ``full``, which builds it here if needed.
+        """
+        figures = None if marker is None else self.hud_figures.get(uid, marker)
+        if figures is None or (full and figures["full_json"] is None):
+            built = {}
+
+            def build():
+                built.update(self._build_hud(uid, node, agent_name))
+                return {"view": built["view"], "points": built.get("points")}
+
+            shared = build() if full else self.cache_backend.get_or_fetch(f"hud:{uid}:{marker}", build, HUD_TTL)
+            figures = {
+                "full_json": built.get("full"),
+                "view": json.loads(shared["view"]),
+                "points": shared.get("points"),
+            }
+            if marker is not None:
+                self.hud_figures.put(uid, marker, figures, len(figures["full_json"] or "") + len(shared["view"]))
+        return figures
+
+    def _hud_options(self):
+        return {
+            "max_points": self.hud_max_points,
+            "webgl_threshold": self.hud_webgl_threshold,
+            "raster_threshold": self.hud_raster_threshold,
+        }
+
+    def _build_hud(self, uid, node, agent_name):
+        if self.hud_pool is not None:
+            return self.hud_pool.build(self.agent_client.base_url, uid, agent_name, **self._hud_options())
+        return build_hud(node, self.hud_renderers, agent_name, **self._hud_options())
+
+    def enable_hud_pool(self, workers=DEFAULT_HUD_WORKERS, **pool_kwargs):
+        """Build HUD figures in ``workers`` processes instead of the request thread, see :mod:`.hud_pool`."""
+        if "node_loader" not in pool_kwargs:
+            pool_kwargs["tiled_profile"] = self.tiled_profile
+        self.hud_pool = HudProcessPool(renderers=self.hud_renderers, workers=workers, **pool_kwargs)
+        return self.hud_pool
+
+    def _zoom_hud_view(self, figures, ranges):
+        """The axis ``ranges`` of the full-resolution figure in ``figures``, decimated in the HUD pool if any."""
+        if self.hud_pool is not None:
+            zoomed = self.hud_pool.zoom(
+                self.agent_client.base_url, figures["full_json"], ranges, **self._hud_options()
+            )
+            return json.loads(zoomed)
+        if "full" not in figures:
+            figures["full"] = json.loads(figures["full_json"])
+        return decimate_figure(figures["full"], ranges=ranges, **self._hud_options())
+
+    def zoom_hud(self, relayout_data, shown):
+        """Redraw the zoomed region of the HUD from the full-resolution figure, or the overview on reset."""
+        ranges = zoom_ranges(relayout_data)
+        if ranges is None or not shown or not shown.get("uid"):
+            return dash.no_update
+        uid, marker = shown["uid"], shown.get("reports")
+        full = bool(ranges)
+        try:
+            figures = self.hud_figures.get(uid, marker) if marker else None
+            if figures is None or (full and figures["full_json"] is None):
+                node = self.tiled_node[uid]
+                agent_name = self._read_switchboard_variable("Agent Name")
+                figures = self._hud_figures(uid, node, marker or report_marker(node), agent_name, full)
+            if not full:
+                return figures["view"]
+            return self._zoom_hud_view(figures, ranges)
+        except (HudSuperseded, LookupError):
+            return dash.no_update
+
+    def _hud_patch_limit(self):
+        """Most points a trace may reach by appending before it would have to be lightened."""
+        limits = [self.hud_max_points, self.hud_webgl_threshold, self.hud_raster_threshold]
+        return min(limit for limit in limits if limit is not None)
+
+    def hud_update(self, uid, rendered=0, agent_name=None, points=None):
+        """Bring a browser showing the first ``rendered`` reports of run ``uid`` up to date.
+
+        ``points`` is the most points in one trace of the browser's figure, or None if the figure was
+        decimated or rasterized.
+
+        Returns
+        -------
+        update, n_reports, points
+            ``dash.no_update`` if there is no new report; a ``dash.Patch`` appending only the new reports'
+            points, read as slices from Tiled, if the agent's renderer has ``hud_extend`` and the browser's
+            figure stays small enough to draw without lightening; otherwise the full figure. ``n_reports`` is
+            what the browser shows afterwards, or 0 if unknown, and ``points`` its most points in a trace.
+        """
+        node = self.tiled_node[uid]
+        marker = report_marker(node)
+        if marker is not None and 0 < rendered <= marker:
+            if marker == rendered:
+                return dash.no_update, rendered, points
+            extend = self.hud_renderers.extender(self.hud_renderers.match(node, agent_name))
+            if extend is not None and points is not None:
+                extension = extend(node, rendered, marker)
+                added = max(
+                    (len(values) for columns in extension.values() for values in columns.values()), default=0
+                )
+                if points + added <= self._hud_patch_limit():
+                    patch = dash.Patch()
+                    for index, columns in extension.items():
+                        for key, values in columns.items():
+                            patch["data"][index][key].extend(values)
+                    return patch, marker, points + added
+        figures = self._hud_figures(uid, node, marker, agent_name)
+        return figures["view"], marker or 0, figures["points"]
+
+    def generate_hud_plot(self, n_clicks, shown=None):
+        """Draw the agent's HUD, sending only what changed since ``shown``, the browser's ``hud-shown`` store."""
+        # Check if the button is clicked
+        if n_clicks is None or n_clicks == 0:
+            # If not clicked, return an empty figure
+            return go.Figure(), None
+        else:
+            try:
+                response = self.agent_client.get_variable("agent_uid")
+            except requests.RequestException:
+                return go.Figure(), None
+            if response.status_code == 200:
+                uid = str(response.json().get("agent_uid", "UNKNOWN"))
+                rendered, points = 0, None
+                if shown and shown.get("uid") == uid:
+                    rendered, points = shown["reports"], shown.get("points")
+                try:
+                    update, reports, points = self.hud_update(
+                        uid, rendered, self._read_switchboard_variable("Agent Name"), points
+                    )
+                except HudSuperseded:
+                    return dash.no_update, dash.no_update
+                except LookupError as err:
+                    return go.Figure(layout={"title": {"text": str(err)}}), None
+                return update, {"uid": uid, "reports": reports, "points": points}
+            else:
+                return self.agent_client.variable_url("agent_uid"), None
+
+    def refresh_documents(self, n_intervals, last_version):
+        """Redraw the document panels in one batch, only when new documents have arrived since the last redraw."""
+        if self.document_buffer is None:
+            return [dash.no_update] * (len(DEFAULT_STREAMS) + 1)
+        version, events = self.document_buffer.snapshot()
+        if version == last_version:
+            return [dash.no_update] * (len(DEFAULT_STREAMS) + 1)
+        return [*(_documents_table(events[stream]) for stream in DEFAULT_STREAMS), version]
+
+    def agent_client_stats(self):
+        return self.agent_client.read_stats()
+
+    def _register_background_call(self, app, button_id, outputs, job, states=(), progress=None):
+        """Run ``job`` as a background callback of ``button_id``, with progress, running state and cancel.
+
+        ``job`` returns ``outputs`` followed by the completion time. ``progress`` is a list of ``(Output,
+        default)``, by default the button's progress text.
+        """
+        if progress is None:
+            progress = [(Output(f"{button_id}-progress", "children"), "")]
+        app.callback(
+            [*outputs, Output(f"{button_id}-done", "data")],
+            Input(button_id, "n_clicks"),
+            [State("dashboard-key", "data"), *states],
+            background=True,
+            running=[
+                (Output(button_id, "disabled"), True, False),
+                (Output(f"{button_id}-cancel", "style"), _SHOWN, _HIDDEN),
+                (Output(f"{button_id}-progress", "style"), _SHOWN, _HIDDEN),
+            ],
+            progress=[output for output, _ in progress],
+            progress_default=[default for _, default in progress],
+            cancel=[Input(f"{button_id}-cancel", "n_clicks")],
+            interval=BACKGROUND_POLL_INTERVAL,
+            prevent_initial_call=True,
+        )(job)
+        app.callback(
+            Output(f"{button_id}-refreshed", "data"), Input(f"{button_id}-done", "data"), prevent_initial_call=True
+        )(self.method_job_done)
+
+    def _register_query_callbacks(self, app, background):
+        query_states = [
+            State("query-since", "value"),
+            State("query-until", "value"),
+            State("query-plan-name", "value"),
+            State("query-scan-id-min", "value"),
+            State("query-scan-id-max", "value"),
+            State("query-metadata", "value"),
+        ]
+        app.callback(
+            Output("query-count-output", "children"),
+            Input("query-count-button", "n_clicks"),
+            query_states,
+            prevent_initial_call=True,
+        )(self.count_runs)
+        outputs = [
+            Output("query-tell-output", "children"),
+            Output("query-tell-bar", "value"),
+            Output("query-tell-bar", "max"),
+            Output("query-tell-state", "data"),
+        ]
+        states = [
+            *query_states,
+            State("submit-uids-chunk-size", "value"),
+            State("submit-uids-concurrency", "value"),
+            State("query-tell-state", "data"),
+        ]
+        if background:
+            self._register_background_call(
+                app,
+                "query-tell-button",
+                outputs,
+                self.tell_query_runs_job,
+                states,
+                progress=[
+                    (Output("query-tell-bar", "value"), 0),
+                    (Output("query-tell-bar", "max"), 1),
+                    (Output("query-tell-button-progress", "children"), ""),
+                    (Output("query-tell-checkpoint", "data"), None),
+                ],
+            )
+            app.callback(
+                Output("query-tell-state", "data", allow_duplicate=True),
+                Input("query-tell-checkpoint", "data"),
+                prevent_initial_call=True,
+            )(self.checkpoint_uids)
+        else:
+            app.callback(outputs, Input("query-tell-button", "n_clicks"), states, prevent_initial_call=True)(
+                self.tell_query_runs
+            )
+        app.callback(
+            [
+                Output("query-tell-state", "data", allow_duplicate=True),
+                Output("query-tell-bar", "value", allow_duplicate=True),
+            ],
+            Input("query-tell-reset", "n_clicks"),
+            prevent_initial_call=True,
+        )(self.reset_uids)
+
+    def register_callbacks(self, app):
+        """Register this dashboard's callbacks and server routes on ``app``, built with :meth:`layout`."""
+        self.app = app
+        prefix = app.config.routes_pathname_prefix
+        app.server.add_url_rule(
+            prefix + STATS_ROUTE.lstrip("/"), f"{prefix}agent_client_stats", self.agent_client_stats
+        )
+        register_switchboard_stream(
+            app.server,
+            lambda: self.poller,
+            prefix + STREAM_ROUTE.lstrip("/"),
+            endpoint=f"{prefix}switchboard_stream",
+        )
+
+        app.callback(
+            [Output("ask-on-tell-output", "children"), Output("indicator-ask-on-tell", "color")],
+            Input("button-ask-on-tell", "n_clicks"),
+        )(self.toggle_ask_on_tell)
+        app.callback(
+            [Output("report-on-tell-output", "children"), Output("indicator-report-on-tell", "color")],
+            Input("button-report-on-tell", "n_clicks"),
+        )(self.toggle_report_on_tell)
+        app.callback(
+            [Output("queue-front-output", "children"), Output("indicator-queue-front", "color")],
+            Input("button-queue-front", "n_clicks"),
+        )(self.toggle_queue_add_position)
+        background = getattr(app, "_background_manager", None) is not None
+        if background:
+            self._register_background_call(
+                app,
+                "trigger-add-suggestion-queue",
+                [Output("add-to-queue-output", "children")],
+                self.add_to_queue_job,
+            )
+            self._register_background_call(
+                app,
+                "trigger-generate-report",
+                [Output("generate-report-output", "children")],
+                self.generate_report_job,
+            )
+        else:
+            app.callback(
+                Output("add-to-queue-output", "children"), Input("trigger-add-suggestion-queue", "n_clicks")
+            )(self.trigger_add_to_queue)
+            app.callback(
+                Output("generate-report-output", "children"), Input("trigger-generate-report", "n_clicks")
+            )(self.trigger_generate_report)
+
+        switchboard_outputs = list(_SWITCHBOARD_OUTPUTS)
+        if "variables" in self.features:
+            switchboard_outputs.append(("names-output", "children"))
+        app.callback(
+            [Output(id_, prop, allow_duplicate=True) for id_, prop in switchboard_outputs],
+            Input("refresh-page", "n_intervals"),
+            prevent_initial_call=True,
+        )(self.refresh_switchboard)
+        app.clientside_callback(
+            EVENT_SOURCE_JS, Output("switchboard-push", "data"), Input("refresh-page", "n_intervals")
+        )
+        app.callback(
+            [Output(id_, prop, allow_duplicate=True) for id_, prop in switchboard_outputs],
+            Input("switchboard-store", "data"),
+            prevent_initial_call=True,
+        )(self.render_pushed_switchboard)
+
+        if "uids" in self.features:
+            uids_outputs = [
+                Output("submit-uids-output", "children"),
+                Output("submit-uids-bar", "value"),
+                Output("submit-uids-bar", "max"),
+                Output("submit-uids-state", "data"),
+            ]
+            uids_states = [
+                State("submit-uids-input", "value"),
+                State("submit-uids-chunk-size", "value"),
+                State("submit-uids-concurrency", "value"),
+                State("submit-uids-state", "data"),
+                State("submit-uids-check", "data"),
+            ]
+            if background:
+                self._register_background_call(
+                    app,
+                    "submit-uids-button",
+                    uids_outputs,
+                    self.submit_uids_job,
+                    uids_states,
+                    progress=[
+                        (Output("submit-uids-bar", "value"), 0),
+                        (Output("submit-uids-bar", "max"), 1),
+                        (Output("submit-uids-button-progress", "children"), ""),
+                        (Output("submit-uids-checkpoint", "data"), None),
+                    ],
+                )
+                app.callback(
+                    Output("submit-uids-state", "data", allow_duplicate=True),
+                    Input("submit-uids-checkpoint", "data"),
+                    prevent_initial_call=True,
+                )(self.checkpoint_uids)
+            else:
+                app.callback(
+                    uids_outputs, Input("submit-uids-button", "n_clicks"), uids_states, prevent_initial_call=True
+                )(self.submit_uids)
+            self._register_query_callbacks(app, background)
+            app.callback(
+                [Output("check-uids-output", "children"), Output("submit-uids-check", "data")],
+                Input("check-uids-button", "n_clicks"),
+                [State("submit-uids-input", "value"), State("submit-uids-chunk-size", "value")],
+                prevent_initial_call=True,
+            )(self.check_uids)
+            app.callback(
+                [
+                    Output("submit-uids-state", "data", allow_duplicate=True),
+                    Output("submit-uids-bar", "value", allow_duplicate=True),
+                ],
+                Input("submit-uids-reset", "n_clicks"),
+                prevent_initial_call=True,
+            )(self.reset_uids)
+        if "variables" in self.features:
+            app.callback(
+                Output("variable-output", "children"),
+                [Input("get-variable-button", "n_clicks"), Input("variable-name-input", "n_submit")],
+                [State("variable-name-input", "value")],
+            )(self.get_variable)
+            app.callback(
+                Output("variable-input-success", "children"),
+                [Input("update-variable-button", "n_clicks"), Input("new-value-input", "n_submit")],
+                [State("variable-name-update-input", "value"), State("new-value-input", "value")],
+            )(self.update_variable)
+            app.callback(Output("names-output", "children"), Input("get-names-button", "n_clicks"))(self.get_names)
+        if "methods" in self.features and background:
+            self._register_background_call(
+                app,
+                "call-method-button",
+                [Output("call-method-success", "children")],
+                self.call_method_job,
+                [
+                    State("method-name-input", "value"),
+                    State("method-args-input", "value"),
+                    State("method-kwargs-input", "value"),
+                ],
+            )
+        elif "methods" in self.features:
+            app.callback(
+                Output("call-method-success", "children"),
+                Input("call-method-button", "n_clicks"),
+                [
+                    State("method-name-input", "value"),
+                    State("method-args-input", "value"),
+                    State("method-kwargs-input", "value"),
+                ],
+            )(self.call_method)
+        if "methods" in self.features:
+            app.callback(
+                Output("batch-calls-input", "value"),
+                Input("batch-calls-upload", "contents"),
+                State("batch-calls-upload", "filename"),
+                prevent_initial_call=True,
+            )(self.load_batch_file)
+            batch_outputs = [Output("batch-results", "data"), Output("batch-summary", "children")]
+            batch_states = [
+                State("method-name-input", "value"),
+                State("batch-calls-input", "value"),
+                State("batch-concurrency", "value"),
+            ]
+            if background:
+                self._register_background_call(
+                    app,
+                    "batch-call-button",
+                    batch_outputs,
+                    self.call_batch_job,
+                    batch_states,
+                    progress=[(batch_outputs[0], []), (batch_outputs[1], "")],
+                )
+            else:
+                app.callback(
+                    batch_outputs, Input("batch-call-button", "n_clicks"), batch_states, prevent_initial_call=True
+                )(self.call_batch)
+        if "hud" in self.features:
+            app.callback(
+                [Output("hud-plot", "figure"), Output("hud-shown", "data")],
+                Input("trigger-generate-hud", "n_clicks"),
+                State("hud-shown", "data"),
+            )(self.generate_hud_plot)
+            app.callback(
+                Output("hud-plot", "figure", allow_duplicate=True),
+                Input("hud-plot", "relayoutData"),
+                State("hud-shown", "data"),
+                prevent_initial_call=True,
+            )(self.zoom_hud)
+        if "documents" in self.features:
+            app.callback(
+                [
+                    *(Output(f"documents-{stream}", "children") for stream in DEFAULT_STREAMS),
+                    Output("documents-version", "data"),
+                ],
+                Input("documents-refresh", "n_intervals"),
+                State("documents-version", "data"),
+                prevent_initial_call=True,
+            )(self.refresh_documents)
+
+
+def create_app(
+    agent_url=None, features=DEFAULT_FEATURES, *, client=None, cache_backend=None, name=None, **dash_kwargs
+):
+    """Build a Dash app for one agent.
+
+    Parameters
+    ----------
+    agent_url : str, optional
+        Agent API address such as ``http://beamline-agent:60615``. Ignored if ``client`` is given.
+    features : sequence of str
+        Sections from :data:`FEATURES` to include besides the switchboard.
+    client : AgentClient, optional
+        Use an existing client, e.g. one sharing a session with other dashboards.
+    cache_backend : CacheBackend, optional
+        See :class:`AgentDashboard`.
+    name : str, optional
+        Passed to ``dash.Dash``; determines where assets are looked up.
+    **dash_kwargs
+        Passed to ``dash.Dash``, e.g. ``server`` and ``url_base_pathname`` to mount several apps on one server.
+
+    Returns
+    -------
+    dash.Dash
+        With the :class:`AgentDashboard` as its ``dashboard`` attribute.
+    """
+    if client is None:
+        client = AgentClient() if agent_url is None else AgentClient.from_url(agent_url)
+    dashboard = AgentDashboard(client, features, cache_backend=cache_backend)
+    if "background_callback_manager" not in dash_kwargs:
+        dash_kwargs["background_callback_manager"] = background_callback_manager()
+    app = dash.Dash(name or __name__, **dash_kwargs)
+    dashboard.register(app.config.routes_pathname_prefix)
+    app.layout = dashboard.layout()
+    dashboard.register_callbacks(app)
+    app.dashboard = dashboard
+    return app
+
+
+def mount_agents(
+    server,
+    agents,
+    features=DEFAULT_FEATURES,
+    *,
+    pool_size=DEFAULT_POOL_SIZE,
+    cache_backend=None,
+    index=True,
+    callback_cache=None,
+    **client_kwargs,
+):
+    """Serve one dashboard per agent from ``server``, each under ``/<prefix>/``.
+
+    All agents share one connection-pooled session, one cache backend, one event loop thread and one copy of
+    Dash in memory.
+
+    Parameters
+    ----------
+    server : flask.Flask
+    agents : dict
+        Maps URL prefix to agent URL, e.g. ``{"kmeans": "http://agents:60615", "gp": "http://agents:60616"}``.
+    features : sequence of str
+    pool_size : int
+        Kept-alive connections per agent.
+    cache_backend : CacheBackend, optional
+    index : bool
+        Serve a plain list of the mounted dashboards at ``/``, unless that route is already taken.
+    callback_cache : str, optional
+        Directory of the background callback manager shared by all dashboards, see
+        :func:`~bluesky_adaptive_ui.background.background_callback_manager`.
+    **client_kwargs
+        Passed to every :class:`AgentClient`, e.g. ``timeout``.
+
+    Returns
+    -------
+    dict
+        Maps each prefix to its ``dash.Dash`` app.
+    """
+    session = pooled_session(pool_size, hosts=len(agents))
+    cache_backend = InProcessCache() if cache_backend is None else cache_backend
+    manager = background_callback_manager(callback_cache or DEFAULT_CALLBACK_CACHE)
+    apps = {}
+    for prefix, agent_url in agents.items():
+        prefix = prefix.strip("/")
+        client = AgentClient.from_url(agent_url, pool_size=pool_size, session=session, **client_kwargs)
+        apps[prefix] = create_app(
+            features=features,
+            client=client,
+            cache_backend=cache_backend,
+            server=server,
+            url_base_pathname=f"/{prefix}/",
+            background_callback_manager=manager,
+        )
+
+    if index and not any(rule.rule == "/" for rule in server.url_map.iter_rules()):
+
+        def agents_index():
+            links = "".join(
+                f'<li><a href="{app.config.requests_pathname_prefix}">{escape(prefix)}</a> '
+                f"{escape(app.dashboard.agent_client.base_url)}</li>"
+                for prefix, app in apps.items()
+            )
+            return f"<h1>Agents</h1><ul>{links}</ul>"
+
+        server.add_url_rule("/", "agents_index", agents_index)
+    return apps
+
+
+def build_parser(features=DEFAULT_FEATURES):
+    """Command line options of a single-agent dashboard with ``features``."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=str, default="8050", help="Dash server port")
+    parser.add_argument("--debug", action="store_true", help="Run the Dash development server in debug mode")
+    parser.add_argument("--agent-address", type=str, default="localhost", help="Agent API address")
+    parser.add_argument("--agent-port", type=str, default="60615", help="Agent API address")
+    add_agent_client_arguments(parser)
+    if "hud" in features or "uids" in features:
+        parser.add_argument(
+            "--tiled-profile",
+            type=str,
+            default="pdf" if "hud" in features else None,
+            help="Tiled profile of the run catalog, used for the HUD and to check uids before telling the agent",
+        )
+    if "hud" in features:
+        parser.add_argument(
+            "--hud-renderer",
+            action="append",
+            default=[],
+            metavar="AGENT_CLASS=MODULE:ATTR",
+            help="Draw the HUD of agents of this class or name prefix with this renderer (repeatable)",
+        )
+        parser.add_argument(
+            "--default-hud-renderer",
+            type=str,
+            default=DEFAULT_RENDERER,
+            help="Renderer for agents matching no other, or empty for none",
+        )
+        parser.add_argument(
+            "--hud-cache-mb",
+            type=float,
+            default=DEFAULT_FIGURE_CACHE_BYTES / 2**20,
+            help="Memory for built HUD figures, reused until the agent writes a new report",
+        )
+        parser.add_argument(
+            "--hud-max-points",
+            type=int,
+            default=DEFAULT_MAX_POINTS,
+            help="Decimate HUD traces to about this many points; zooming in shows the region at full resolution",
+        )
+        parser.add_argument(
+            "--hud-webgl-threshold",
+            type=int,
+            default=DEFAULT_WEBGL_THRESHOLD,
+            help="Draw HUD traces with more points than this with WebGL",
+        )
+        parser.add_argument(
+            "--hud-raster-threshold",
+            type=int,
+            default=None,
+            help="Rasterize HUD scatters with more points than this into a server-side image (default: never)",
+        )
+        parser.add_argument(
+            "--hud-workers",
+            type=int,
+            default=0,
+            help="Build HUD figures in this many worker processes instead of the request thread",
+        )
+    if "documents" in features:
+        parser.add_argument(
+            "--kafka-bootstrap-servers",
+            type=str,
+            default=None,
+            help="Show live agent documents from Kafka (requires bluesky-kafka)",
+        )
+        parser.add_argument("--kafka-topic", type=str, default=DEFAULT_TOPIC, help="Agent document topic")
+        parser.add_argument(
+            "--kafka-group-id",
+            type=str,
+            default=None,
+            help="Kafka consumer group (default: a new group per process, so every process sees every document)",
+        )
+        parser.add_argument(
+            "--document-agent-name",
+            type=str,
+            default=None,
+            help="Only show documents of runs whose start document has this agent_name (default: all agents)",
+        )
+    return parser
+
+
+def add_agent_client_arguments(parser):
+    """Options shared by every app that talks to agents: pooling, timeouts, polling and caching."""
+    parser.add_argument(
+        "--callback-cache",
+        type=str,
+        default=None,
+        help=f"Directory shared by all workers for background method calls (default: {DEFAULT_CALLBACK_CACHE})",
+    )
+    parser.add_argument(
+        "--agent-pool-size", type=int, default=DEFAULT_POOL_SIZE, help="Kept-alive connections to the agent"
+    )
+    parser.add_argument(
+        "--agent-timeout", type=float, default=DEFAULT_TIMEOUT, help="Agent API request timeout in seconds"
+    )
+    parser.add_argument(
+        "--agent-method-timeout",
+        type=float,
+        default=DEFAULT_METHOD_TIMEOUT,
+        help="Agent method call timeout in seconds",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=None,
+        help="Poll the agent switchboard every this many seconds and serve all sessions from one snapshot",
+    )
+    parser.add_argument(
+        "--agent-read-ttl",
+        type=float,
+        default=DEFAULT_READ_TTL,
+        help="Seconds identical agent reads are served from cache",
+    )
+    parser.add_argument(
+        "--cache-backend",
+        type=str,
+        default="memory",
+        help="Where workers share agent reads: memory, a directory (e.g. under /dev/shm) or a redis:// URL",
+    )
+    return parser
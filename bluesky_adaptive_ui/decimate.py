@@ -0,0 +1,313 @@
+"""Keep large HUD figures light in the browser: WebGL traces and server-side decimation.
+
+A campaign's HUD can hold hundreds of thousands of points. Sent as-is they make a payload of tens of megabytes
+that SVG traces draw slowly. :func:`decimate_figure` rewrites a figure's scatter traces so that
+
+* traces with more than ``webgl_threshold`` points are drawn with ``scattergl``;
+* traces with more than ``max_points`` points are reduced to about ``max_points``: line traces by
+  largest-triangle-three-buckets (:func:`lttb`), which keeps the visual shape, and marker traces by
+  :func:`density_sample`, which thins dense regions and keeps isolated points.
+
+Given the axis ranges of a zoomed view, it first keeps only the points inside them, so zooming in re-fetches
+the region at full resolution once it holds fewer than ``max_points``. Each trace is restricted to the ranges of
+its own axes, so zooming one subplot leaves the others as they are. Every per-point array of a trace
+(``text``, ``customdata``, ``marker.color``, ...) is reduced along with ``x`` and ``y``.
+
+Optionally, marker traces above ``raster_threshold`` points are rasterized on the server instead, which keeps
+the payload constant however many points there are (:mod:`bluesky_adaptive_ui.rasterize`).
+
+With numpy installed (the ``fast`` extra), :func:`lttb` and :func:`density_sample` work on arrays rather than
+point by point, several times faster on traces of millions of points.
+"""
+
+import importlib.util
+import math
+import re
+from collections import defaultdict
+
+from .rasterize import DEFAULT_RASTER_SHAPE, rasterize_trace
+
+DEFAULT_MAX_POINTS = 5000
+DEFAULT_WEBGL_THRESHOLD = 2000
+SCATTER_TYPES = ("scatter", "scattergl")
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+RANGE_KEY = re.compile(r"^([xy]axis\d*)\.range(?:\[([01])\])?$")
+# Below this many points per bucket, lttb's per-bucket numpy calls cost more than its loop over points.
+NUMPY_LTTB_BUCKET = 64
+
+
+def _is_numeric(values):
+    return all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values)
+
+
+def lttb(x, y, n):
+    """Indices of ``n`` points of the line ``(x, y)`` chosen by largest-triangle-three-buckets.
+
+    The first and last points are always kept; from each of ``n - 2`` equal buckets in between, the point
+    forming the largest triangle with the previously kept point and the next bucket's mean. ``x`` must be
+    sorted.
+    """
+    size = len(y)
+    if n >= size:
+        return list(range(size))
+    if n < 3:
+        return [0, size - 1][:n]
+    bucket = (size - 2) / (n - 2)
+    if HAVE_NUMPY and bucket >= NUMPY_LTTB_BUCKET:
+        return _lttb_numpy(x, y, n)
+    indices = [0]
+    previous = 0
+    for i in range(n - 2):
+        start, end = int(i * bucket) + 1, int((i + 1) * bucket) + 1
+        next_end = min(int((i + 2) * bucket) + 1, size)
+        count = next_end - end
+        mean_x = sum(x[end:next_end]) / count
+        mean_y = sum(y[end:next_end]) / count
+        ax, ay = x[previous], y[previous]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - mean_x) * (y[j] - ay) - (ax - x[j]) * (mean_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        indices.append(best)
+        previous = best
+    indices.append(size - 1)
+    return indices
+
+
+def _lttb_numpy(x, y, n):
+    """:func:`lttb` with the points of each bucket compared as arrays."""
+    import numpy
+
+    x, y = numpy.asarray(x, dtype=float), numpy.asarray(y, dtype=float)
+    size = len(y)
+    bounds = (numpy.arange(n) * ((size - 2) / (n - 2))).astype(numpy.intp) + 1
+    bounds[-1] = size
+    # Means of each bucket, from cumulative sums, for the bucket after the one being chosen from.
+    sum_x = numpy.concatenate(([0.0], numpy.cumsum(x)))
+    sum_y = numpy.concatenate(([0.0], numpy.cumsum(y)))
+    counts = bounds[2:] - bounds[1:-1]
+    mean_x = (sum_x[bounds[2:]] - sum_x[bounds[1:-1]]) / counts
+    mean_y = (sum_y[bounds[2:]] - sum_y[bounds[1:-1]]) / counts
+    indices = [0]
+    previous = 0
+    for i in range(n - 2):
+        start, end = bounds[i], bounds[i + 1]
+        ax, ay = x[previous], y[previous]
+        area = numpy.abs((ax - mean_x[i]) * (y[start:end] - ay) - (ax - x[start:end]) * (mean_y[i] - ay))
+        previous = int(start + numpy.argmax(area))
+        indices.append(previous)
+    indices.append(size - 1)
+    return indices
+
+
+def density_sample(x, y, n):
+    """Indices of about ``n`` points of the scatter ``(x, y)``, preserving its density.
+
+    The plane is cut into a grid of about ``n / 2`` cells and every cell keeps the same fraction of its points,
+    but at least one, so sparse regions and outliers survive while dense clusters are thinned.
+    """
+    size = len(x)
+    if n >= size:
+        return list(range(size))
+    grid = max(1, int(math.sqrt(n / 2)))
+    if HAVE_NUMPY:
+        return _density_sample_numpy(x, y, n, grid)
+    x0, x1, y0, y1 = min(x), max(x), min(y), max(y)
+    x_scale = grid / (x1 - x0) if x1 > x0 else 0
+    y_scale = grid / (y1 - y0) if y1 > y0 else 0
+    cells = defaultdict(list)
+    for i in range(size):
+        cell = (min(int((x[i] - x0) * x_scale), grid - 1), min(int((y[i] - y0) * y_scale), grid - 1))
+        cells[cell].append(i)
+    ratio = n / size
+    keep = []
+    for members in cells.values():
+        k = max(1, round(len(members) * ratio))
+        step = len(members) / k
+        keep.extend(members[int(i * step)] for i in range(k))
+    return sorted(keep)
+
+
+def _density_sample_numpy(x, y, n, grid):
+    """:func:`density_sample` with the points grouped into cells by a stable sort."""
+    import numpy
+
+    x, y = numpy.asarray(x, dtype=float), numpy.asarray(y, dtype=float)
+    x0, x1, y0, y1 = x.min(), x.max(), y.min(), y.max()
+    x_scale = grid / (x1 - x0) if x1 > x0 else 0
+    y_scale = grid / (y1 - y0) if y1 > y0 else 0
+    column = numpy.minimum(((x - x0) * x_scale).astype(numpy.intp), grid - 1)
+    row = numpy.minimum(((y - y0) * y_scale).astype(numpy.intp), grid - 1)
+    order = numpy.argsort(column * grid + row, kind="stable")
+    sizes = numpy.bincount(column * grid + row)
+    sizes = sizes[sizes > 0]
+    starts = numpy.concatenate(([0], numpy.cumsum(sizes)[:-1]))
+    kept = numpy.maximum(1, numpy.round(sizes * (n / len(x)))).astype(numpy.intp)
+    # The i-th point kept from a cell is its int(i * size / kept)-th member, as in density_sample.
+    first = numpy.concatenate(([0], numpy.cumsum(kept)[:-1]))
+    i = numpy.arange(kept.sum()) - numpy.repeat(first, kept)
+    positions = numpy.repeat(starts, kept) + (i * numpy.repeat(sizes / kept, kept)).astype(numpy.intp)
+    return numpy.sort(order[positions]).tolist()
+
+
+def stride_sample(size, n):
+    """Indices of every ``ceil(size / n)``-th point, for values that cannot be compared numerically."""
+    return list(range(0, size, max(1, math.ceil(size / n))))
+
+
+def _in_range(values, bounds):
+    low, high = sorted(bounds)
+    return [low <= value <= high for value in values]
+
+
+def _visible(trace, is_line, x_range, y_range):
+    """Indices of the points of ``trace`` inside the view; lines keep one point beyond each edge."""
+    x, y = trace["x"], trace["y"]
+    inside = [True] * len(x)
+    for values, bounds in ((x, x_range), (y, y_range)):
+        if bounds is not None and _is_numeric(values) and _is_numeric(bounds):
+            inside = [a and b for a, b in zip(inside, _in_range(values, bounds))]
+    if is_line:
+        inside = [
+            flag or (i > 0 and inside[i - 1]) or (i + 1 < len(inside) and inside[i + 1])
+            for i, flag in enumerate(inside)
+        ]
+    return [i for i, flag in enumerate(inside) if flag]
+
+
+def _take(trace, indices, size):
+    """Copy of ``trace`` with every per-point array, at the top level or under ``marker``, reduced to
+    ``indices``."""
+
+    def reduce(container):
+        return {
+            key: [value[i] for i in indices] if isinstance(value, (list, tuple)) and len(value) == size else value
+            for key, value in container.items()
+        }
+
+    reduced = reduce(trace)
+    if isinstance(trace.get("marker"), dict):
+        reduced["marker"] = reduce(trace["marker"])
+    return reduced
+
+
+def decimate_trace(
+    trace, max_points=DEFAULT_MAX_POINTS, webgl_threshold=DEFAULT_WEBGL_THRESHOLD, x_range=None, y_range=None
+):
+    """Lighter copy of one scatter trace dict, or the trace itself if nothing needs to change."""
+    if trace.get("type", "scatter") not in SCATTER_TYPES or "x" not in trace or "y" not in trace:
+        return trace
+    x, y = list(trace["x"]), list(trace["y"])
+    size = len(x)
+    is_line = "lines" in trace.get("mode", "lines")
+    if x_range is not None or y_range is not None:
+        indices = _visible({"x": x, "y": y}, is_line, x_range, y_range)
+    else:
+        indices = list(range(size))
+    if len(indices) > max_points:
+        xs, ys = [x[i] for i in indices], [y[i] for i in indices]
+        if not _is_numeric(ys):
+            chosen = stride_sample(len(indices), max_points)
+        elif is_line:
+            chosen = lttb(xs if _is_numeric(xs) else list(range(len(xs))), ys, max_points)
+        elif _is_numeric(xs):
+            chosen = density_sample(xs, ys, max_points)
+        else:
+            chosen = stride_sample(len(indices), max_points)
+        indices = [indices[i] for i in chosen]
+    if len(indices) == size and size <= webgl_threshold:
+        return trace
+    reduced = _take({**trace, "x": x, "y": y}, indices, size) if len(indices) < size else dict(trace)
+    if len(indices) > webgl_threshold:
+        reduced["type"] = "scattergl"
+    return reduced
+
+
+def _rasterizable(trace, raster_threshold, x_range, y_range):
+    """Whether ``trace`` is a numeric marker trace with more than ``raster_threshold`` points in view."""
+    if (
+        raster_threshold is None
+        or trace.get("type", "scatter") not in SCATTER_TYPES
+        or "lines" in trace.get("mode", "lines")
+        or len(trace.get("x", ())) <= raster_threshold
+        or not _is_numeric(trace["x"])
+        or not _is_numeric(trace.get("y", ()))
+    ):
+        return False
+    if x_range is None and y_range is None:
+        return True
+    return len(_visible(trace, False, x_range, y_range)) > raster_threshold
+
+
+def _axis(ref, letter):
+    """Layout key of the axis a trace refers to as ``ref``: ``"x2"`` is ``"xaxis2"``, None the primary one."""
+    return f"{letter}axis{(ref or letter)[1:]}"
+
+
+def decimate_figure(
+    figure,
+    max_points=DEFAULT_MAX_POINTS,
+    webgl_threshold=DEFAULT_WEBGL_THRESHOLD,
+    x_range=None,
+    y_range=None,
+    *,
+    ranges=None,
+    raster_threshold=None,
+    raster_shape=DEFAULT_RASTER_SHAPE,
+):
+    """Copy of the figure dict ``figure`` with every large scatter trace made lighter, see the module docs.
+
+    ``ranges`` maps layout axes (``"xaxis"``, ``"yaxis2"``...) to the ``(low, high)`` of a zoomed view, as
+    :func:`zoom_ranges` gives them; ``x_range`` and ``y_range`` are those of the primary axes. Each trace is
+    restricted to the ranges of its own axes, which are then kept in the layout. Marker traces with more than
+    ``raster_threshold`` points are replaced by an image of ``raster_shape`` pixels, see
+    :mod:`bluesky_adaptive_ui.rasterize`.
+    """
+    ranges = dict(ranges or {})
+    for axis, bounds in (("xaxis", x_range), ("yaxis", y_range)):
+        if bounds is not None:
+            ranges[axis] = bounds
+    data, images = [], []
+    for trace in figure.get("data", []):
+        x_range = ranges.get(_axis(trace.get("xaxis"), "x"))
+        y_range = ranges.get(_axis(trace.get("yaxis"), "y"))
+        if _rasterizable(trace, raster_threshold, x_range, y_range):
+            placeholder, image = rasterize_trace(trace, x_range, y_range, raster_shape)
+            data.append(placeholder)
+            images.append(image)
+        else:
+            data.append(decimate_trace(trace, max_points, webgl_threshold, x_range, y_range))
+    decimated = {**figure, "data": data}
+    if images:
+        layout = dict(figure.get("layout") or {})
+        layout["images"] = [*(layout.get("images") or []), *images]
+        decimated["layout"] = layout
+    if ranges:
+        layout = dict(decimated.get("layout") or {})
+        for axis, bounds in ranges.items():
+            layout[axis] = {**(layout.get(axis) or {}), "range": list(bounds), "autorange": False}
+        decimated["layout"] = layout
+    return decimated
+
+
+def zoom_ranges(relayout_data):
+    """``{axis: (low, high)}`` of the zoomed axes (``"xaxis"``, ``"yaxis2"``...) from a graph's ``relayoutData``.
+
+    Returns None if the event is not a zoom or reset; a reset (autorange) gives ``{}``.
+    """
+    relayout_data = relayout_data or {}
+    if any(key.endswith(".autorange") and value for key, value in relayout_data.items()):
+        return {}
+    ends = {}
+    for key, value in relayout_data.items():
+        match = RANGE_KEY.match(key)
+        if match is None:
+            continue
+        axis, end = match.groups()
+        if end is None:
+            ends[axis] = dict(enumerate(value))
+        else:
+            ends.setdefault(axis, {})[int(end)] = value
+    ranges = {axis: (end[0], end[1]) for axis, end in ends.items() if 0 in end and 1 in end}
+    return ranges or None
@@ -0,0 +1,167 @@
+"""Live agent documents from Kafka, kept in bounded per-stream ring buffers for the dashboards.
+
+Agents built on ``bluesky_adaptive`` publish bluesky documents to Kafka (``mad.agent.documents`` by default),
+with one event stream per descriptor name: ``tell``, ``ask`` and ``report``. :class:`AgentDocumentBuffer`
+is a regular bluesky callback that keeps the most recent events of each stream, and
+:class:`DocumentConsumerThread` feeds it from a dispatcher on a background thread.
+
+Several agents may publish to the same topic, each with its own long-running run. The buffer follows every
+open run at once and, given an ``agent_name``, only those whose start document names that agent.
+"""
+
+import threading
+import uuid
+from collections import deque
+
+DEFAULT_TOPIC = "mad.agent.documents"
+DEFAULT_STREAMS = ("report", "ask", "tell")
+DEFAULT_MAXLEN = 100
+
+
+class AgentDocumentBuffer:
+    """Keep the latest events of each agent stream.
+
+    Call it with ``(name, doc)`` like any bluesky callback. Events are grouped by the name of their descriptor
+    and held in ring buffers of ``maxlen`` events, so memory stays bounded however long the agent runs.
+    :attr:`version` increments with every batch of accepted events, letting readers skip redraws when
+    nothing arrived.
+
+    Parameters
+    ----------
+    streams : sequence of str
+        Descriptor names to keep; events of other streams are dropped.
+    maxlen : int
+        Events kept per stream.
+    agent_name : str, optional
+        Only keep the runs whose start document has this ``agent_name``; by default keep every run.
+    """
+
+    def __init__(self, streams=DEFAULT_STREAMS, maxlen=DEFAULT_MAXLEN, agent_name=None):
+        self.streams = tuple(streams)
+        self.maxlen = maxlen
+        self.agent_name = agent_name
+        self.version = 0
+        self._events = {stream: deque(maxlen=maxlen) for stream in self.streams}
+        self._runs = set()
+        self._descriptors = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, name, doc):
+        handler = getattr(self, name, None)
+        if handler is not None and name in ("start", "descriptor", "event", "event_page", "stop"):
+            handler(doc)
+
+    def start(self, doc):
+        if self.agent_name is None or doc.get("agent_name") == self.agent_name:
+            with self._lock:
+                self._runs.add(doc["uid"])
+
+    def descriptor(self, doc):
+        run = doc.get("run_start")
+        with self._lock:
+            if self.agent_name is None or run in self._runs:
+                self._descriptors[doc["uid"]] = (run, doc.get("name", "primary"))
+
+    def stop(self, doc):
+        run = doc.get("run_start")
+        with self._lock:
+            self._runs.discard(run)
+            for uid in [uid for uid, (start, _) in self._descriptors.items() if start == run]:
+                del self._descriptors[uid]
+
+    def event(self, doc):
+        self._extend(doc["descriptor"], [doc])
+
+    def event_page(self, doc):
+        keys = list(doc["data"])
+        events = [
+            {
+                "time": doc["time"][i],
+                "seq_num": doc["seq_num"][i],
+                "data": {key: doc["data"][key][i] for key in keys},
+            }
+            for i in range(len(doc["seq_num"]))
+        ]
+        self._extend(doc["descriptor"], events)
+
+    def _extend(self, descriptor_uid, events):
+        with self._lock:
+            _, stream = self._descriptors.get(descriptor_uid, (None, None))
+            if stream not in self._events:
+                return
+            self._events[stream].extend(events)
+            self.version += 1
+
+    def snapshot(self):
+        """``(version, {stream: [event, ...]})`` with events oldest first."""
+        with self._lock:
+            return self.version, {stream: list(events) for stream, events in self._events.items()}
+
+
+class DocumentConsumerThread:
+    """Run a document dispatcher on a daemon thread, forwarding documents to ``callback``.
+
+    Parameters
+    ----------
+    dispatcher : object
+        Anything with ``subscribe(callback)`` and ``start(continue_polling)``, such as
+        ``bluesky_kafka.RemoteDispatcher`` (see :func:`kafka_dispatcher`).
+    callback : callable
+        Receives ``(name, doc)``, usually an :class:`AgentDocumentBuffer`.
+    """
+
+    def __init__(self, dispatcher, callback):
+        self.dispatcher = dispatcher
+        self.dispatcher.subscribe(callback)
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _continue_polling(self):
+        return not self._stopping.is_set()
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self.dispatcher.start,
+            kwargs={"continue_polling": self._continue_polling},
+            name="agent-documents",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def kafka_dispatcher(bootstrap_servers, topic=DEFAULT_TOPIC, group_id=None, consumer_config=None):
+    """A ``bluesky_kafka.RemoteDispatcher`` reading agent documents; requires the optional ``bluesky-kafka``.
+
+    The consumer group defaults to one of its own, so every dashboard process receives every document rather
+    than sharing them with the other dashboards.
+    """
+    from bluesky_kafka import RemoteDispatcher
+
+    return RemoteDispatcher(
+        topics=[topic],
+        bootstrap_servers=bootstrap_servers,
+        group_id=group_id or f"bluesky-adaptive-ui-{uuid.uuid4()}",
+        consumer_config={"auto.offset.reset": "latest", **(consumer_config or {})},
+    )
+
+
+def summarize_event(event, max_chars=40):
+    """Flatten an event into short strings for a table row, describing arrays by shape instead of content."""
+    row = {"time": event.get("time"), "seq_num": event.get("seq_num")}
+    for key, value in event.get("data", {}).items():
+        if hasattr(value, "shape"):
+            text = f"array{tuple(value.shape)}"
+        elif isinstance(value, (list, tuple)):
+            text = f"list[{len(value)}]"
+        else:
+            text = str(value)
+        row[key] = text if len(text) <= max_chars else text[: max_chars - 3] + "..."
+    return row
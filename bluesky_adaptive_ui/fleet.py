@@ -0,0 +1,326 @@
+"""Fleet view: the switchboard of many agents at a glance, polled concurrently.
+
+:class:`Fleet` reads the switchboard variables of every agent in one concurrent batch. All requests run on a
+single thread pool of ``max_concurrency`` threads over one shared connection-pooled session, so a refresh
+takes about ``ceil(requests / max_concurrency)`` round trips instead of one per request, while the load on
+the UI host stays bounded however many agents are listed. :func:`create_fleet_app` shows the result as a table.
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+import dash
+from dash import dash_table, dcc, html
+from dash.dependencies import Input, Output, State
+
+from .async_client import AsyncAgentClient, run_sync
+from .client import AgentClient, pooled_session
+from .coalesce import ReadCoalescer
+from .switchboard import DEFAULT_POLL_INTERVAL, TRUTHY, fetch_switchboard_state
+
+DEFAULT_FLEET_CONCURRENCY = 32
+DEFAULT_FLEET_POOL_SIZE = 4
+FLEET_VARIABLES = ("Agent Name", "ask_on_tell", "report_on_tell", "queue_add_position")
+FLEET_COLUMNS = ("agent", "address", "reachable", *FLEET_VARIABLES)
+BROADCAST_COLUMNS = ("agent", "ok", "status_code", "latency_ms", "error")
+
+
+@dataclass(frozen=True)
+class BroadcastResult:
+    """Outcome of one agent's part in a fleet-wide write.
+
+    Attributes
+    ----------
+    agent : str
+    ok : bool
+        Whether the agent answered with HTTP 200.
+    status_code : int or None
+        None if no response was received.
+    latency : float
+        Seconds from queueing the request to its outcome, including any wait for a free thread.
+    error : str
+        Exception or response text when not ``ok``.
+    """
+
+    agent: str
+    ok: bool
+    status_code: int = None
+    latency: float = 0.0
+    error: str = ""
+
+    def to_row(self):
+        row = asdict(self)
+        row["latency_ms"] = round(row.pop("latency") * 1e3, 1)
+        row["ok"] = "yes" if self.ok else "no"
+        return row
+
+
+class Fleet:
+    """Switchboard state of many agents, read concurrently with bounded parallelism.
+
+    Parameters
+    ----------
+    agents : dict
+        Maps a short agent name to its URL, e.g. ``{"kmeans": "http://agents:60615"}``, or to an
+        :class:`~bluesky_adaptive_ui.client.AgentClient`.
+    max_concurrency : int
+        Requests in flight at once, across all agents.
+    max_per_agent : int
+        Requests in flight at once to any single agent, so a fleet-wide operation cannot pile onto one agent.
+    pool_size : int
+        Kept-alive connections per agent for clients created from URLs.
+    ttl : float
+        Seconds a fleet snapshot from :meth:`snapshot` is shared between callers.
+    timeout : float, optional
+        Per-request timeout, defaulting to each client's.
+    **client_kwargs
+        Passed to clients created from URLs.
+    """
+
+    def __init__(
+        self,
+        agents,
+        *,
+        max_concurrency=DEFAULT_FLEET_CONCURRENCY,
+        max_per_agent=DEFAULT_FLEET_POOL_SIZE,
+        pool_size=DEFAULT_FLEET_POOL_SIZE,
+        ttl=DEFAULT_POLL_INTERVAL,
+        timeout=None,
+        **client_kwargs,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_per_agent = max_per_agent
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="fleet")
+        self._session = None
+        self.clients = {}
+        for name, agent in agents.items():
+            if not isinstance(agent, AgentClient):
+                if self._session is None:
+                    self._session = pooled_session(pool_size, hosts=len(agents))
+                agent = AgentClient.from_url(agent, pool_size=pool_size, session=self._session, **client_kwargs)
+            self.clients[name] = agent
+        self._async_clients = {
+            name: AsyncAgentClient(client, max_concurrency=max_per_agent, executor=self._executor)
+            for name, client in self.clients.items()
+        }
+        self._reads = ReadCoalescer(ttl)
+        self.last_duration = None
+
+    async def fetch(self):
+        """``{name: SwitchboardState}`` for every agent, read in one concurrent batch."""
+        states = await asyncio.gather(
+            *(
+                fetch_switchboard_state(client, FLEET_VARIABLES, timeout=self.timeout, with_names=False)
+                for client in self._async_clients.values()
+            )
+        )
+        return dict(zip(self._async_clients, states))
+
+    def poll(self):
+        """Read every agent now, recording how long it took in :attr:`last_duration`."""
+        start = time.perf_counter()
+        states = run_sync(self.fetch())
+        self.last_duration = time.perf_counter() - start
+        return states
+
+    def snapshot(self):
+        """Like :meth:`poll`, but shared by all callers within ``ttl`` seconds of each other."""
+        return self._reads.get("fleet", self.poll)
+
+    def rows(self, states=None):
+        """One table row per agent, with variables rendered as text and unreachable agents flagged."""
+        states = self.snapshot() if states is None else states
+        rows = []
+        for name, state in states.items():
+            row = {
+                "agent": name,
+                "address": self.clients[name].base_url,
+                "reachable": "yes" if state.reachable else "no",
+            }
+            for variable in FLEET_VARIABLES:
+                value = state.variables.get(variable)
+                if value is None:
+                    row[variable] = ""
+                elif variable in ("ask_on_tell", "report_on_tell"):
+                    row[variable] = "on" if str(value) in TRUTHY else "off"
+                else:
+                    row[variable] = str(value)
+            rows.append(row)
+        return rows
+
+    async def _send(self, name, call):
+        start = time.perf_counter()
+        try:
+            response = await call(self._async_clients[name])
+        except Exception as err:
+            return BroadcastResult(name, False, None, time.perf_counter() - start, f"{type(err).__name__}: {err}")
+        latency = time.perf_counter() - start
+        ok = response.status_code == 200
+        return BroadcastResult(name, ok, response.status_code, latency, "" if ok else response.text[:200])
+
+    async def broadcast(self, call, agents=None):
+        """Run ``call(async_client)`` against ``agents`` (default: all) in parallel.
+
+        Returns
+        -------
+        list of BroadcastResult
+            In the order of ``agents``.
+        """
+        agents = list(self.clients if agents is None else agents)
+        try:
+            return await asyncio.gather(*(self._send(name, call) for name in agents))
+        finally:
+            self._reads.invalidate()
+
+    def set_variable(self, name, value, agents=None):
+        """``POST /api/variable/{name}`` with the same value to every agent in ``agents``."""
+        return run_sync(
+            self.broadcast(lambda client: client.set_variable(name, value, timeout=self.timeout), agents)
+        )
+
+    def call_method(self, name, args=None, kwargs=None, agents=None):
+        """Call the same agent method on every agent in ``agents``."""
+        return run_sync(
+            self.broadcast(lambda client: client.call_method(name, args, kwargs, timeout=self.timeout), agents)
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        if self._session is not None:
+            self._session.close()
+
+
+def create_fleet_app(fleet, *, interval=DEFAULT_POLL_INTERVAL, links=None, name=None, **dash_kwargs):
+    """Dash app showing one row per agent of ``fleet``, refreshed every ``interval`` seconds.
+
+    Parameters
+    ----------
+    fleet : Fleet
+    interval : float
+        Seconds between table refreshes in the browser.
+    links : dict, optional
+        Maps agent names to the URL of their own dashboard, shown as links in the table.
+    **dash_kwargs
+        Passed to ``dash.Dash``, e.g. ``server`` and ``url_base_pathname``.
+    """
+    links = links or {}
+    app = dash.Dash(name or __name__, **dash_kwargs)
+    app.layout = html.Div(
+        children=[
+            html.H1("Agent Fleet", style={"text-align": "center"}),
+            dash_table.DataTable(
+                id="fleet-table",
+                columns=[
+                    {"name": column, "id": column, "presentation": "markdown" if column == "agent" else "input"}
+                    for column in FLEET_COLUMNS
+                ],
+                style_cell={"padding": "8px", "textAlign": "left"},
+                style_header={"fontWeight": "bold"},
+                style_data_conditional=[
+                    {"if": {"filter_query": '{reachable} = "no"'}, "backgroundColor": "#f8d7da"},
+                ],
+                row_selectable="multi",
+                selected_rows=[],
+                fill_width=False,
+            ),
+            html.Div(id="fleet-refresh-time", style={"text-align": "right", "color": "grey"}),
+            dcc.Interval(id="fleet-refresh", interval=interval * 1000, n_intervals=0),
+            html.H2("Send to Selected Agents"),
+            html.Div(
+                children=[
+                    dcc.RadioItems(
+                        id="broadcast-kind",
+                        options=[
+                            {"label": "Set variable", "value": "variable"},
+                            {"label": "Call method", "value": "method"},
+                        ],
+                        value="variable",
+                        inline=True,
+                    ),
+                    dcc.Input(id="broadcast-name", type="text", placeholder="Variable or method name"),
+                    dcc.Input(
+                        id="broadcast-value",
+                        type="text",
+                        placeholder="Value, or list of method arguments, as JSON",
+                    ),
+                    dcc.Input(id="broadcast-kwargs", type="text", placeholder="Method keyword arguments as JSON"),
+                    html.Button("Send", id="broadcast-button", n_clicks=0),
+                    html.Div(id="broadcast-summary"),
+                    dash_table.DataTable(
+                        id="broadcast-results",
+                        columns=[{"name": column, "id": column} for column in BROADCAST_COLUMNS],
+                        style_cell={"padding": "4px", "textAlign": "left"},
+                        style_header={"fontWeight": "bold"},
+                        style_data_conditional=[
+                            {"if": {"filter_query": '{ok} = "no"'}, "backgroundColor": "#f8d7da"},
+                        ],
+                        fill_width=False,
+                    ),
+                ]
+            ),
+        ],
+        className="dashboard-container",
+    )
+
+    @app.callback(
+        [Output("fleet-table", "data"), Output("fleet-refresh-time", "children")],
+        Input("fleet-refresh", "n_intervals"),
+    )
+    def refresh_fleet(n_intervals):
+        rows = fleet.rows()
+        for row in rows:
+            if row["agent"] in links:
+                row["agent"] = f"[{row['agent']}]({links[row['agent']]})"
+        unreachable = sum(row["reachable"] == "no" for row in rows)
+        return rows, (
+            f"{len(rows)} agents, {unreachable} unreachable, read in {(fleet.last_duration or 0) * 1e3:.0f} ms"
+        )
+
+    @app.callback(
+        [Output("broadcast-results", "data"), Output("broadcast-summary", "children")],
+        Input("broadcast-button", "n_clicks"),
+        [
+            State("fleet-table", "selected_rows"),
+            State("broadcast-kind", "value"),
+            State("broadcast-name", "value"),
+            State("broadcast-value", "value"),
+            State("broadcast-kwargs", "value"),
+        ],
+        prevent_initial_call=True,
+    )
+    def send_to_selected(n_clicks, selected_rows, kind, name, value, kwargs):
+        names = list(fleet.clients)
+        agents = [names[i] for i in selected_rows or [] if i < len(names)]
+        if not agents or not name:
+            return [], "Select agents in the table and enter a name."
+        try:
+            if kind == "method":
+                results = fleet.call_method(name, _parse(value, []), _parse(kwargs, {}), agents=agents)
+            else:
+                results = fleet.set_variable(name, _parse(value, None), agents=agents)
+        except ValueError as err:
+            return [], f"Invalid JSON: {err}"
+        failed = sum(not result.ok for result in results)
+        slowest = max(result.latency for result in results)
+        return [result.to_row() for result in results], (
+            f"{len(results) - failed} of {len(results)} succeeded, slowest {slowest * 1e3:.0f} ms"
+        )
+
+    app.fleet = fleet
+    return app
+
+
+def _parse(text, default):
+    """JSON from an input box; plain text that is not JSON is taken as a string, empty input as ``default``."""
+    if not text:
+        return default
+    try:
+        return json.loads(text)
+    except ValueError:
+        if default is None:
+            return text
+        raise
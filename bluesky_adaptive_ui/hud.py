@@ -0,0 +1,344 @@
+"""HUD renderers: turn an agent's Tiled report node into a Plotly figure, chosen by agent type.
+
+Each kind of agent knows how to draw its own reports, e.g. ``PassiveKmeansAgent.hud_from_report``. A
+:class:`HudRenderers` registry maps agent class names to those renderers, so one dashboard can show the HUD of
+any agent type. Renderers are named by ``"module:attribute"`` strings and only imported when an agent of that
+type is first shown, then cached, so agent libraries are never imported at startup.
+
+Other packages add renderers through the ``bluesky_adaptive_ui.hud_renderers`` entry point group, named after
+the agent class they draw::
+
+    entry_points={"bluesky_adaptive_ui.hud_renderers": ["GPAgent = my_agents.plots:gp_hud"]}
+
+A renderer is a callable taking the report node and returning a figure (or its dict/JSON form), or an object
+with a ``hud_from_report(report, plotly=True)`` method such as an agent class. A renderer that can also draw
+reports incrementally has a ``hud_extend(report, start, stop)`` method returning the points that reports
+``start:stop`` add to each trace, as ``{trace index: {"x": [...], "y": [...]}}``; a browser already showing
+the figure is then sent only those points. :class:`ReportSeries` is such a renderer.
+
+Building a figure reads every report from Tiled, so built figures are kept in a :class:`FigureCache` keyed by
+the agent's uid and :func:`report_marker`, the number of reports written so far: asking again before the agent
+writes a new report costs one metadata read.
+"""
+
+import importlib
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+from importlib import metadata
+
+from .decimate import decimate_figure
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "bluesky_adaptive_ui.hud_renderers"
+BUILTIN_RENDERERS = {"PassiveKmeansAgent": "pdf_agents.sklearn:PassiveKmeansAgent"}
+DEFAULT_RENDERER = "PassiveKmeansAgent"
+METADATA_KEYS = ("agent_class", "agent_name")
+REPORT_STREAM = "report"
+DEFAULT_FIGURE_CACHE_BYTES = 64 * 2**20
+
+
+def load_object(spec):
+    """Import ``"package.module:attribute.path"``."""
+    module_name, _, attribute = spec.partition(":")
+    obj = importlib.import_module(module_name)
+    for part in filter(None, attribute.split(".")):
+        obj = getattr(obj, part)
+    return obj
+
+
+def as_renderer(obj):
+    """Adapt an agent class with ``hud_from_report`` to the ``renderer(report)`` call signature."""
+    if hasattr(obj, "hud_from_report"):
+        return lambda report: obj.hud_from_report(report, plotly=True)
+    if callable(obj):
+        return obj
+    raise TypeError(f"{obj!r} is neither callable nor has a hud_from_report method")
+
+
+def figure_json(figure):
+    """JSON text of a renderer's result, whether a Plotly figure, its dict form or JSON already."""
+    if isinstance(figure, str):
+        return figure
+    if hasattr(figure, "to_json"):
+        return figure.to_json()
+    from plotly.utils import PlotlyJSONEncoder
+
+    return json.dumps(figure, cls=PlotlyJSONEncoder)
+
+
+def discover_entry_points(group=ENTRY_POINT_GROUP):
+    """``{name: entry point}`` installed in ``group``, without loading any of them."""
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        found = entry_points.select(group=group)
+    else:  # Python < 3.10
+        found = entry_points.get(group, ())
+    return {entry_point.name: entry_point for entry_point in found}
+
+
+def agent_type_names(report=None, agent_name=None):
+    """Names that may identify the agent behind ``report``, most specific first.
+
+    Looks for ``agent_class``/``agent_name`` in the report's metadata (and its start document), then falls back
+    to the switchboard's ``Agent Name``. Class reprs such as ``"<class 'pkg.mod.Agent'>"`` and dotted paths also
+    give ``"Agent"``.
+    """
+    candidates = []
+    report_metadata = getattr(report, "metadata", None) or {}
+    for source in (report_metadata, report_metadata.get("start") or {}):
+        for key in METADATA_KEYS:
+            value = source.get(key)
+            if value:
+                candidates.append(str(value))
+    if agent_name:
+        candidates.append(str(agent_name))
+    names = []
+    for candidate in candidates:
+        match = re.fullmatch(r"(?:<class ')?[\w.]*\.(\w+)'?>?", candidate)
+        for name in (candidate, match.group(1) if match else None):
+            if name and name not in names:
+                names.append(name)
+    return names
+
+
+class HudRenderers:
+    """Registry of HUD renderers by agent class name, loaded on first use and cached.
+
+    Parameters
+    ----------
+    renderers : dict, optional
+        ``{name: renderer}``, where a renderer is a callable, an object with ``hud_from_report``, or a
+        ``"module:attribute"`` string to import when first needed. Defaults to :data:`BUILTIN_RENDERERS`.
+    default : str, optional
+        Renderer used when no registered name matches the agent. None makes unknown agents an error.
+    entry_point_group : str, optional
+        Entry point group searched for more renderers, on first lookup. None disables discovery.
+    """
+
+    def __init__(self, renderers=None, default=DEFAULT_RENDERER, entry_point_group=ENTRY_POINT_GROUP):
+        self.default = default
+        self.entry_point_group = entry_point_group
+        self._specs = dict(BUILTIN_RENDERERS if renderers is None else renderers)
+        self._loaded = {}
+        self._objects = {}
+        self._discovered = entry_point_group is None
+        self._lock = threading.Lock()
+
+    def register(self, name, renderer):
+        """Add or replace the renderer for agents named or of class ``name``."""
+        with self._lock:
+            self._specs[name] = renderer
+            self._loaded.pop(name, None)
+            self._objects.pop(name, None)
+
+    def _discover(self):
+        if self._discovered:
+            return
+        with self._lock:
+            if self._discovered:
+                return
+            try:
+                entry_points = discover_entry_points(self.entry_point_group)
+            except Exception as err:
+                logger.warning("Could not list %s entry points: %s", self.entry_point_group, err)
+                entry_points = {}
+            for name, entry_point in entry_points.items():
+                self._specs.setdefault(name, entry_point)
+            self._discovered = True
+
+    @property
+    def specs(self):
+        """``{name: renderer}`` as registered, before loading; picklable if the renderers are."""
+        self._discover()
+        return dict(self._specs)
+
+    def names(self):
+        self._discover()
+        return sorted(self._specs)
+
+    def get(self, name):
+        """The renderer registered as ``name``, importing it on first use."""
+        self._discover()
+        renderer = self._loaded.get(name)
+        if renderer is not None:
+            return renderer
+        with self._lock:
+            if name not in self._loaded:
+                if name not in self._specs:
+                    raise LookupError(f"No HUD renderer named {name!r}, known: {sorted(self._specs)}")
+                spec = self._specs[name]
+                if isinstance(spec, str):
+                    obj = load_object(spec)
+                elif isinstance(spec, metadata.EntryPoint):
+                    obj = spec.load()
+                else:
+                    obj = spec
+                self._loaded[name] = as_renderer(obj)
+                self._objects[name] = obj
+            return self._loaded[name]
+
+    def extender(self, name):
+        """The ``hud_extend(report, start, stop)`` method of renderer ``name``, or None if it has none."""
+        self.get(name)
+        return getattr(self._objects[name], "hud_extend", None)
+
+    def match(self, report=None, agent_name=None):
+        """Name of the renderer for the agent behind ``report``.
+
+        A registered name matches an agent class or name equal to it or starting with it, so ``"KMeans"`` also
+        covers an agent named ``"KMeans-3f2a"``. The longest match wins; with none, :attr:`default` is used.
+        """
+        known = self.names()
+        for candidate in agent_type_names(report, agent_name):
+            matches = [name for name in known if candidate == name or candidate.startswith(name)]
+            if matches:
+                return max(matches, key=len)
+        if self.default is None:
+            raise LookupError(f"No HUD renderer for agent {agent_name!r}, known: {known}")
+        return self.default
+
+    def render(self, report, agent_name=None):
+        """Figure for ``report`` from the renderer matching its agent."""
+        return self.get(self.match(report, agent_name))(report)
+
+
+def report_marker(node, stream=REPORT_STREAM):
+    """Number of reports the agent run ``node`` holds, read from array metadata without fetching data.
+
+    Changes whenever the agent writes a report, so it keys cached figures. None if it cannot be determined,
+    e.g. for a run without a ``stream`` stream, in which case nothing should be cached by it.
+    """
+    try:
+        return int(node[stream]["data"]["time"].shape[0])
+    except Exception:
+        return None
+
+
+class FigureCache:
+    """Least-recently-used cache of HUD figures, bounded by the size of their JSON.
+
+    Keys are ``(agent uid, report marker)``. Storing a figure for a new marker drops the agent's older figures,
+    which can no longer be requested.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Total JSON size kept. A single figure larger than this is not cached.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_FIGURE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, uid, marker):
+        """The figure stored for ``uid`` at ``marker``, or None."""
+        with self._lock:
+            entry = self._entries.get((uid, marker))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((uid, marker))
+            self.hits += 1
+            return entry[0]
+
+    def put(self, uid, marker, figure, nbytes):
+        """Store ``figure``, whose JSON is ``nbytes`` long, evicting the least recently used to make room."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == uid]:
+                self.nbytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[(uid, marker)] = (figure, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                self.nbytes -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self.nbytes, "hits": self.hits, "misses": self.misses}
+
+
+def build_hud(report, renderers, agent_name=None, **decimate_options):
+    """Render ``report`` and lighten it for the browser, the CPU-heavy part of showing a HUD.
+
+    Returns
+    -------
+    dict
+        ``{"full": full-resolution figure JSON, "view": JSON of the figure to send, "points": int or None}``,
+        where the view is made by :func:`~bluesky_adaptive_ui.decimate.decimate_figure` with
+        ``decimate_options`` and ``points`` is the most points in one of its traces, or None if any trace was
+        lightened, so that new points cannot simply be appended to it.
+    """
+    full = figure_json(renderers.render(report, agent_name))
+    figure = json.loads(full)
+    view = decimate_figure(figure, **decimate_options)
+    # decimate_figure returns the traces it leaves alone as they are.
+    exact = all(shown is trace for shown, trace in zip(view.get("data", []), figure.get("data", [])))
+    points = max((len(trace.get("x") or ()) for trace in view.get("data", [])), default=0) if exact else None
+    return {"full": full, "view": json.dumps(view), "points": points}
+
+
+def _tolist(values):
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+class ReportSeries:
+    """HUD plotting report fields against report time, one line per field, drawn incrementally.
+
+    Register it for agents whose reports hold scalar fields worth following over a campaign, e.g.
+    ``renderers.register("GPAgent", ReportSeries(["max_uncertainty"]))``. New reports are read as slices
+    of the Tiled arrays, so extending the plot costs only the new rows.
+
+    Parameters
+    ----------
+    fields : sequence of str
+        Report fields to plot.
+    stream : str
+        Stream holding the reports.
+    x : str
+        Field used for the horizontal axis.
+    """
+
+    def __init__(self, fields, stream=REPORT_STREAM, x="time"):
+        self.fields = tuple(fields)
+        self.stream = stream
+        self.x = x
+
+    def _columns(self, report, start=None, stop=None):
+        data = report[self.stream]["data"]
+        return {field: _tolist(data[field][start:stop]) for field in (self.x, *self.fields)}
+
+    def hud_from_report(self, report, plotly=True):
+        columns = self._columns(report)
+        return {
+            "data": [
+                {
+                    "type": "scatter",
+                    "mode": "lines+markers",
+                    "name": field,
+                    "x": columns[self.x],
+                    "y": columns[field],
+                }
+                for field in self.fields
+            ],
+            "layout": {"xaxis": {"title": {"text": self.x}}, "uirevision": "hud"},
+        }
+
+    def hud_extend(self, report, start, stop):
+        columns = self._columns(report, start, stop)
+        return {index: {"x": columns[self.x], "y": columns[field]} for index, field in enumerate(self.fields)}
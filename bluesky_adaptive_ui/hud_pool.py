@@ -0,0 +1,136 @@
+"""Build HUD figures in worker processes, off the web server's request threads.
+
+Rendering a HUD (k-means summaries, figure assembly, decimation) is CPU-bound Python. In a request thread it
+holds the GIL, so one operator's HUD slows every other callback of that worker. :class:`HudProcessPool` runs
+:func:`~bluesky_adaptive_ui.hud.build_hud` in a pool of processes instead. Each process opens its own Tiled
+connection and renderer registry once, receives only the run uid and returns the figures as JSON text.
+Redrawing a zoomed region from the full-resolution figure (:meth:`HudProcessPool.zoom`) runs there too.
+
+At most one build per worker is handed to the pool; the rest wait their turn. A request for an agent
+supersedes any earlier one for the same agent still waiting: that one is cancelled without using a worker,
+and its caller gets :class:`HudSuperseded`. A build already running in a worker is left to finish.
+"""
+
+import json
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from .decimate import decimate_figure
+from .hud import HudRenderers, build_hud
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HUD_WORKERS = 2
+
+_worker = {}
+
+
+class HudSuperseded(Exception):
+    """A HUD build was cancelled because a newer one for the same agent was requested."""
+
+
+def _init_worker(tiled_profile, node_loader, renderer_specs, default):
+    _worker.update(tiled_profile=tiled_profile, node_loader=node_loader)
+    _worker["renderers"] = HudRenderers(renderer_specs, default=default, entry_point_group=None)
+    if default is not None:
+        try:
+            _worker["renderers"].get(default)
+        except Exception as err:
+            logger.warning("HUD worker could not load the default renderer %s: %s", default, err)
+
+
+def _node(uid):
+    if _worker["node_loader"] is not None:
+        return _worker["node_loader"](uid)
+    if "tiled_node" not in _worker:
+        from tiled.client import from_profile
+
+        _worker["tiled_node"] = from_profile(_worker["tiled_profile"])
+    return _worker["tiled_node"][uid]
+
+
+def _build(uid, agent_name, decimate_options):
+    return build_hud(_node(uid), _worker["renderers"], agent_name, **decimate_options)
+
+
+def _zoom(full_json, ranges, decimate_options):
+    figure = decimate_figure(json.loads(full_json), ranges=ranges, **decimate_options)
+    return json.dumps(figure)
+
+
+class HudProcessPool:
+    """Process pool building HUD figures, with newer requests for an agent superseding queued older ones.
+
+    Parameters
+    ----------
+    tiled_profile : str, optional
+        Tiled profile each worker opens to look up runs.
+    renderers : HudRenderers, optional
+        Registry whose renderers the workers use; its entries must be picklable, e.g. ``"module:attr"``
+        strings or module-level functions.
+    workers : int
+        Worker processes.
+    node_loader : callable, optional
+        Picklable ``node_loader(uid)`` returning a run, used instead of ``tiled_profile``.
+    mp_context : str
+        Start method. ``"spawn"`` is safe to use from a threaded web server.
+    """
+
+    def __init__(
+        self,
+        tiled_profile=None,
+        renderers=None,
+        workers=DEFAULT_HUD_WORKERS,
+        *,
+        node_loader=None,
+        mp_context="spawn",
+    ):
+        if tiled_profile is None and node_loader is None:
+            raise ValueError("HudProcessPool needs a tiled_profile or a node_loader")
+        renderers = HudRenderers() if renderers is None else renderers
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(mp_context),
+            initializer=_init_worker,
+            initargs=(tiled_profile, node_loader, renderers.specs, renderers.default),
+        )
+        self._generation = {}
+        self._running = 0
+        self._free = threading.Condition()
+
+    def build(self, key, uid, agent_name=None, **decimate_options):
+        """Build the HUD of run ``uid`` in a worker and wait for it.
+
+        ``key`` identifies the agent. Builds wait here, not in the executor's queue, until a worker is free, so
+        a newer build with the same ``key`` cancels this one while it waits, raising :class:`HudSuperseded`.
+        """
+        return self._run(key, f"HUD build of {uid}", _build, uid, agent_name, decimate_options)
+
+    def zoom(self, key, full_json, ranges=None, **decimate_options):
+        """JSON text of the axis ``ranges`` of the figure ``full_json``, decimated in a worker.
+
+        Like :meth:`build`, a newer zoom for the same agent ``key`` supersedes one still waiting.
+        """
+        return self._run((key, "zoom"), "HUD zoom", _zoom, full_json, ranges, decimate_options)
+
+    def _run(self, key, description, function, *args):
+        with self._free:
+            self._generation[key] = generation = self._generation.get(key, 0) + 1
+            self._free.notify_all()
+            while self._running >= self.workers and self._generation[key] == generation:
+                self._free.wait()
+            if self._generation[key] != generation:
+                raise HudSuperseded(f"{description} for {key} superseded by a newer request")
+            self._running += 1
+        try:
+            return self._executor.submit(function, *args).result()
+        finally:
+            with self._free:
+                self._running -= 1
+                self._free.notify_all()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,101 @@
+import argparse
+
+import flask
+
+from bluesky_adaptive_ui.cache import cache_backend_from_url
+from bluesky_adaptive_ui.dashboard import DEFAULT_FEATURES, FEATURES, add_agent_client_arguments, mount_agents
+from bluesky_adaptive_ui.fleet import DEFAULT_FLEET_CONCURRENCY, Fleet, create_fleet_app
+from bluesky_adaptive_ui.switchboard import DEFAULT_POLL_INTERVAL
+
+server = flask.Flask(__name__)
+apps = {}
+fleet_app = None
+
+
+def _agent(text):
+    prefix, sep, url = text.partition("=")
+    if not sep or not prefix or not url:
+        raise argparse.ArgumentTypeError(f"expected NAME=HOST:PORT, got {text!r}")
+    return prefix, url
+
+
+def _features(text):
+    features = tuple(feature for feature in text.split(",") if feature)
+    unknown = set(features) - set(FEATURES)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown features {sorted(unknown)}, expected some of {FEATURES}")
+    return features
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Serve a dashboard for each of several agents from one process")
+    parser.add_argument("--port", type=str, default="8050", help="Dash server port")
+    parser.add_argument("--debug", action="store_true", help="Run the Flask development server in debug mode")
+    parser.add_argument(
+        "--agent",
+        type=_agent,
+        action="append",
+        default=[],
+        metavar="NAME=HOST:PORT",
+        help="An agent to serve under /NAME/; repeat for each agent",
+    )
+    parser.add_argument(
+        "--features",
+        type=_features,
+        default=DEFAULT_FEATURES,
+        help=f"Comma separated dashboard sections, from {','.join(FEATURES)}",
+    )
+    parser.add_argument(
+        "--fleet-concurrency",
+        type=int,
+        default=DEFAULT_FLEET_CONCURRENCY,
+        help="Agent requests in flight at once when refreshing the fleet overview",
+    )
+    add_agent_client_arguments(parser)
+    return parser
+
+
+def configure(args):
+    """Mount one dashboard per ``--agent`` on :data:`server`, and the fleet overview of all of them at ``/``."""
+    global fleet_app
+    apps.update(
+        mount_agents(
+            server,
+            dict(args.agent),
+            args.features,
+            pool_size=args.agent_pool_size,
+            cache_backend=cache_backend_from_url(args.cache_backend),
+            timeout=args.agent_timeout,
+            method_timeout=args.agent_method_timeout,
+            read_ttl=args.agent_read_ttl,
+            index=False,
+            callback_cache=args.callback_cache,
+        )
+    )
+    fleet = Fleet(
+        {name: app.dashboard.agent_client for name, app in apps.items()},
+        max_concurrency=args.fleet_concurrency,
+        ttl=args.poll_interval or DEFAULT_POLL_INTERVAL,
+    )
+    fleet_app = create_fleet_app(
+        fleet,
+        interval=args.poll_interval or DEFAULT_POLL_INTERVAL,
+        links={name: app.config.requests_pathname_prefix for name, app in apps.items()},
+        server=server,
+        url_base_pathname="/",
+    )
+
+
+def start_services(args):
+    """Start background threads. Under a forking server this must run in each worker, after the fork."""
+    if args.poll_interval is not None:
+        for app in apps.values():
+            app.dashboard.enable_polling(args.poll_interval)
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    configure(args)
+    start_services(args)
+
+    server.run(debug=args.debug, port=args.port, host="0.0.0.0")
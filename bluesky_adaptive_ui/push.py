@@ -0,0 +1,156 @@
+"""Server-sent events pushing switchboard snapshots from one upstream poller to every open browser.
+
+An open stream holds a server thread for as long as the page is open: under gunicorn's threaded workers, one
+thread per open tab. :func:`register_switchboard_stream` therefore caps the streams of each process; pages
+turned away poll ``?snapshot=1`` of the same route every :data:`FALLBACK_POLL_INTERVAL` seconds instead, which
+holds a thread only for the request.
+"""
+
+import json
+import os
+import threading
+
+from flask import Response, request
+
+STREAM_ROUTE = "/api/switchboard/stream"
+KEEPALIVE_INTERVAL = 15.0
+FALLBACK_POLL_INTERVAL = 2.0
+# Read by :func:`register_switchboard_stream` when not given ``max_streams``; set by ``serve`` from --threads.
+MAX_STREAMS_ENV = "BLUESKY_ADAPTIVE_UI_MAX_STREAMS"
+
+# Clientside callback body: open one EventSource per page and write each pushed snapshot into the
+# ``switchboard-store`` dcc.Store. The stream answers 204 if push is disabled and 503 if the process has no
+# stream to spare; EventSource then closes for good, and the page polls snapshots instead until one answers
+# 204. The stream URL is STREAM_ROUTE relative to the Dash pathname prefix.
+EVENT_SOURCE_JS = """
+function(n_intervals) {
+    if (window._switchboardEvents) {
+        return window.dash_clientside.no_update;
+    }
+    var config = JSON.parse(document.getElementById("_dash-config").textContent);
+    var prefix = config.requests_pathname_prefix || "/";
+    var url = prefix + "api/switchboard/stream";
+    var show = function(data) {
+        window.dash_clientside.set_props("switchboard-store", {data: data});
+    };
+    var source = new EventSource(url);
+    source.onmessage = function(event) {
+        show(JSON.parse(event.data));
+    };
+    source.onerror = function() {
+        if (source.readyState !== EventSource.CLOSED || window._switchboardPolling) {
+            return;
+        }
+        window._switchboardPolling = setInterval(function() {
+            fetch(url + "?snapshot=1").then(function(response) {
+                if (response.status === 204) {
+                    clearInterval(window._switchboardPolling);
+                }
+                return response.status === 200 ? response.json() : null;
+            }).then(function(data) {
+                if (data) {
+                    show(data);
+                }
+            });
+        }, %d);
+    };
+    window._switchboardEvents = source;
+    return true;
+}
+"""
+EVENT_SOURCE_JS = EVENT_SOURCE_JS % (1000 * FALLBACK_POLL_INTERVAL)
+
+
+def _event(state):
+    return f"data: {json.dumps(state.to_dict())}\n\n"
+
+
+def switchboard_events(poller, keepalive=KEEPALIVE_INTERVAL):
+    """Yield an SSE message with the current snapshot, then one per change seen by ``poller``.
+
+    A comment line is sent every ``keepalive`` seconds without changes so proxies keep the stream open. The
+    stream ends once the poller is stopped.
+    """
+    poller.get()
+    version, state = poller.current()
+    yield _event(state)
+    while not poller.stopping:
+        new_version, state = poller.wait_for_change(version, timeout=keepalive)
+        if poller.stopping:
+            return
+        if new_version == version or state is None:
+            yield ": keep-alive\n\n"
+            continue
+        version = new_version
+        yield _event(state)
+
+
+class _Stream:
+    """WSGI body of one event stream, giving back its slot when the server closes it."""
+
+    def __init__(self, events, slots):
+        self._events = events
+        self._slots = slots
+        self._closed = False
+
+    def __iter__(self):
+        return self._events
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._events.close()
+            self._slots.release()
+
+
+def register_switchboard_stream(
+    server,
+    get_poller,
+    route=STREAM_ROUTE,
+    keepalive=KEEPALIVE_INTERVAL,
+    endpoint="switchboard_stream",
+    max_streams=None,
+):
+    """Serve :func:`switchboard_events` from a Flask server.
+
+    Parameters
+    ----------
+    server : flask.Flask
+        Usually ``app.server`` of a Dash app.
+    get_poller : callable
+        Returns the active :class:`~bluesky_adaptive_ui.switchboard.SwitchboardPoller`, or None when push
+        is disabled, in which case the route answers 204 and browsers do not reconnect.
+    route : str
+        Must be ``api/switchboard/stream`` under the Dash app's ``routes_pathname_prefix``.
+    endpoint : str
+        Flask endpoint name, unique per server when several dashboards share it.
+    max_streams : int, optional
+        Most streams open at once on ``server`` in this process, default :data:`MAX_STREAMS_ENV` or unlimited.
+        Beyond it the route answers 503 and pages poll ``?snapshot=1``, which answers the current snapshot as
+        JSON.
+    """
+    if max_streams is None and os.environ.get(MAX_STREAMS_ENV):
+        max_streams = int(os.environ[MAX_STREAMS_ENV])
+    slots = None
+    if max_streams is not None:
+        # Shared by the stream routes of every dashboard on the server, since they draw on the same threads.
+        slots = server.extensions.setdefault("switchboard_stream_slots", threading.BoundedSemaphore(max_streams))
+
+    def switchboard_stream():
+        poller = get_poller()
+        if poller is None:
+            return Response(status=204)
+        if request.args.get("snapshot"):
+            return Response(json.dumps(poller.get().to_dict()), mimetype="application/json")
+        events = switchboard_events(poller, keepalive)
+        if slots is not None:
+            if not slots.acquire(blocking=False):
+                return Response(status=503, headers={"Retry-After": str(round(FALLBACK_POLL_INTERVAL))})
+            events = _Stream(events, slots)
+        return Response(
+            events,
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    server.add_url_rule(route, endpoint, switchboard_stream)
@@ -0,0 +1,285 @@
+"""Server-side rasterization of very large HUD scatters, in the manner of datashader.
+
+Above a few million points even WebGL traces are slow, and decimation must drop most points. Instead,
+:func:`rasterize_trace` aggregates a marker trace into a fixed-size image on the server: points are counted
+per pixel and per color category, each pixel takes the count-weighted mix of its categories' colors and an
+opacity that grows with the log of its count. Numeric ``marker.color`` values are binned into
+:data:`MAX_CATEGORIES` ranges colored through ``marker.colorscale``, as plotly would color the markers; other
+values are categories, and a trace with more than :data:`MAX_CATEGORIES` of them is drawn in one color, since
+the counts take a buffer per category. The browser receives one PNG of constant size, shown as a
+layout image on the trace's axes, whatever the number of points. Zooming re-rasterizes the visible region
+(see :func:`bluesky_adaptive_ui.decimate.decimate_figure`).
+
+Only the standard library is required. With numpy installed (the ``fast`` extra) the points are binned and the
+pixels mixed with array operations instead of a loop per point, which matters above about 100,000 points.
+"""
+
+import base64
+import importlib.util
+import math
+import struct
+import zlib
+
+DEFAULT_RASTER_SHAPE = (600, 400)
+PALETTE = (
+    "#636efa",
+    "#EF553B",
+    "#00cc96",
+    "#ab63fa",
+    "#FFA15A",
+    "#19d3f3",
+    "#FF6692",
+    "#B6E880",
+    "#FF97FF",
+    "#FECB52",
+)
+# Plotly's default sequential colorscale (Plasma), used when ``marker.colorscale`` is not given.
+DEFAULT_COLORSCALE = (
+    "#0d0887",
+    "#46039f",
+    "#7201a8",
+    "#9c179e",
+    "#bd3786",
+    "#d8576b",
+    "#ed7953",
+    "#fb9f3a",
+    "#fdca26",
+    "#f0f921",
+)
+MAX_CATEGORIES = 10
+MIN_ALPHA = 60
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+def _rgb(color):
+    """``(r, g, b)`` of a ``#rrggbb`` or ``rgb(r, g, b)`` color, or None for anything else."""
+    if not isinstance(color, str):
+        return None
+    try:
+        if len(color) == 7 and color.startswith("#"):
+            return tuple(int(color[i : i + 2], 16) for i in (1, 3, 5))
+        if color.startswith("rgb(") and color.endswith(")"):
+            rgb = tuple(round(float(channel)) for channel in color[4:-1].split(","))
+            return rgb if len(rgb) == 3 else None
+    except ValueError:
+        return None
+    return None
+
+
+def png_data_uri(width, height, pixels):
+    """``data:`` URI of an RGBA PNG; ``pixels`` is ``width * height * 4`` bytes, top row first."""
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    stride = width * 4
+    raw = b"".join(b"\x00" + bytes(pixels[row * stride : (row + 1) * stride]) for row in range(height))
+    png = b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)),
+            chunk(b"IDAT", zlib.compress(raw, 6)),
+            chunk(b"IEND", b""),
+        ]
+    )
+    return "data:image/png;base64," + base64.b64encode(png).decode()
+
+
+def _categories(trace, size):
+    """Per-point category indices (None for one category) and their RGB colors, from ``marker.color``."""
+    marker = trace.get("marker") or {}
+    color = marker.get("color")
+    if isinstance(color, str) or not hasattr(color, "__len__") or len(color) != size:
+        return None, [_rgb(color) or _rgb(PALETTE[0])]
+    values = _numeric(color)
+    if values is not None:
+        return _bin_colors(values, marker)
+    index = {}
+    codes = []
+    for value in color:
+        codes.append(index.setdefault(value, len(index)))
+        if len(index) > MAX_CATEGORIES:
+            return None, [_rgb(PALETTE[0])]
+    colors = [_rgb(value) if _rgb(value) else _rgb(PALETTE[i % len(PALETTE)]) for value, i in index.items()]
+    return codes, colors
+
+
+def _numeric(color):
+    """``color`` as floats if all its values are numbers, else None."""
+    if HAVE_NUMPY:
+        import numpy
+
+        values = numpy.asarray(color)
+        return values.astype(float) if values.dtype.kind in "iuf" else None
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in color):
+        return [float(value) for value in color]
+    return None
+
+
+def _bin_colors(values, marker):
+    """Indices of the :data:`MAX_CATEGORIES` equal ranges of ``values`` between ``marker.cmin`` and
+    ``marker.cmax`` (default: their extent) and the ``marker.colorscale`` color of the middle of each range.
+    """
+    bins = MAX_CATEGORIES
+    if HAVE_NUMPY:
+        import numpy
+
+        finite = values[numpy.isfinite(values)]
+    else:
+        finite = [value for value in values if math.isfinite(value)]
+    if not len(finite):
+        return None, [_rgb(PALETTE[0])]
+    cmin, cmax = marker.get("cmin"), marker.get("cmax")
+    low, high = _extent(finite, None if cmin is None or cmax is None else (cmin, cmax))
+    scale = bins / (high - low)
+    # Values that are not finite take the first color.
+    if HAVE_NUMPY:
+        scaled = numpy.where(numpy.isfinite(values), (values - low) * scale, 0.0)
+        codes = numpy.clip(scaled, 0, bins - 1).astype(numpy.intp)
+    else:
+        codes = [
+            min(max(int((value - low) * scale), 0), bins - 1) if math.isfinite(value) else 0 for value in values
+        ]
+    stops = _colorscale(marker)
+    return codes, [_sample(stops, (i + 0.5) / bins) for i in range(bins)]
+
+
+def _colorscale(marker):
+    """``[(position, (r, g, b)), ...]`` of ``marker.colorscale``, a named plotly colorscale or stop list."""
+    colorscale = marker.get("colorscale")
+    if isinstance(colorscale, str):
+        from plotly.colors import get_colorscale
+
+        try:
+            colorscale = get_colorscale(colorscale)
+        except Exception:
+            colorscale = None
+    if not colorscale:
+        colorscale = [(i / (len(DEFAULT_COLORSCALE) - 1), c) for i, c in enumerate(DEFAULT_COLORSCALE)]
+    stops = [(float(position), _rgb(color)) for position, color in colorscale if _rgb(color)]
+    if marker.get("reversescale"):
+        stops = [(1 - position, rgb) for position, rgb in reversed(stops)]
+    return stops or [(0.0, _rgb(PALETTE[0]))]
+
+
+def _sample(stops, t):
+    """RGB color at ``t`` in ``[0, 1]`` of the colorscale ``stops``, interpolating linearly."""
+    for (p0, c0), (p1, c1) in zip(stops, stops[1:]):
+        if t <= p1:
+            f = 0.0 if p1 <= p0 else min(max((t - p0) / (p1 - p0), 0.0), 1.0)
+            return tuple(round(a + (b - a) * f) for a, b in zip(c0, c1))
+    return stops[-1][1]
+
+
+def _extent(values, bounds):
+    if bounds is not None:
+        low, high = sorted(bounds)
+    elif hasattr(values, "min"):
+        low, high = float(values.min()), float(values.max())
+    else:
+        low, high = min(values), max(values)
+    if high <= low:
+        low, high = low - 0.5, high + 0.5
+    return low, high
+
+
+def _render(x, y, codes, colors, extent, shape):
+    """RGBA bytes of the points ``(x, y)`` of categories ``codes`` (None for one) over ``extent``."""
+    width, height = shape
+    x0, x1, y0, y1 = extent
+    n_colors = len(colors)
+    counts = [0] * (width * height * n_colors)
+    x_scale, y_scale = width / (x1 - x0), height / (y1 - y0)
+    for i in range(len(x)):
+        if x0 <= x[i] <= x1 and y0 <= y[i] <= y1:
+            col = min(int((x[i] - x0) * x_scale), width - 1)
+            row = min(int((y1 - y[i]) * y_scale), height - 1)
+            counts[(row * width + col) * n_colors + (0 if codes is None else codes[i])] += 1
+
+    totals = [sum(counts[p * n_colors : (p + 1) * n_colors]) for p in range(width * height)]
+    scale = math.log1p(max(totals) or 1)
+    pixels = bytearray(width * height * 4)
+    for p, total in enumerate(totals):
+        if not total:
+            continue
+        pixel = counts[p * n_colors : (p + 1) * n_colors]
+        for channel in range(3):
+            pixels[4 * p + channel] = round(sum(n * rgb[channel] for n, rgb in zip(pixel, colors)) / total)
+        pixels[4 * p + 3] = MIN_ALPHA + round((255 - MIN_ALPHA) * math.log1p(total) / scale)
+    return pixels
+
+
+def _render_numpy(x, y, codes, colors, extent, shape):
+    """:func:`_render` with numpy arrays ``x`` and ``y``."""
+    import numpy
+
+    width, height = shape
+    x0, x1, y0, y1 = extent
+    n_colors = len(colors)
+    inside = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+    col = numpy.minimum(((x[inside] - x0) * (width / (x1 - x0))).astype(numpy.intp), width - 1)
+    row = numpy.minimum(((y1 - y[inside]) * (height / (y1 - y0))).astype(numpy.intp), height - 1)
+    bins = (row * width + col) * n_colors
+    if codes is not None:
+        bins += numpy.asarray(codes, dtype=numpy.intp)[inside]
+    counts = numpy.bincount(bins, minlength=width * height * n_colors).reshape(width * height, n_colors)
+
+    totals = counts.sum(axis=1)
+    scale = math.log1p(int(totals.max()) or 1)
+    shown = totals > 0
+    pixels = numpy.zeros((width * height, 4), dtype=numpy.uint8)
+    mixed = counts[shown] @ numpy.asarray(colors, dtype=numpy.int64)
+    pixels[shown, :3] = numpy.round(mixed / totals[shown, None])
+    pixels[shown, 3] = MIN_ALPHA + numpy.round((255 - MIN_ALPHA) * numpy.log1p(totals[shown]) / scale)
+    return pixels.tobytes()
+
+
+def rasterize_trace(trace, x_range=None, y_range=None, shape=DEFAULT_RASTER_SHAPE):
+    """Image of the numeric marker trace ``trace`` over ``x_range`` by ``y_range`` (default: its extent).
+
+    Returns
+    -------
+    placeholder, image
+        An invisible two-point trace spanning the rasterized region, which keeps the trace's axes, name and
+        autorange, and a ``layout.images`` entry drawing the raster on those axes.
+    """
+    x, y = trace["x"], trace["y"]
+    if HAVE_NUMPY:
+        import numpy
+
+        x, y = numpy.asarray(x, dtype=float), numpy.asarray(y, dtype=float)
+    size = len(x)
+    width, height = shape
+    x0, x1 = _extent(x, x_range)
+    y0, y1 = _extent(y, y_range)
+    codes, colors = _categories(trace, size)
+    render = _render_numpy if HAVE_NUMPY else _render
+    pixels = render(x, y, codes, colors, (x0, x1, y0, y1), shape)
+
+    xref = trace.get("xaxis", "x")
+    yref = trace.get("yaxis", "y")
+    placeholder = {
+        "type": "scatter",
+        "mode": "markers",
+        "x": [x0, x1],
+        "y": [y0, y1],
+        "marker": {"opacity": 0},
+        "hoverinfo": "skip",
+        "name": trace.get("name", ""),
+        "meta": {"rasterized": size},
+    }
+    for key in ("xaxis", "yaxis", "showlegend", "legendgroup"):
+        if key in trace:
+            placeholder[key] = trace[key]
+    image = {
+        "source": png_data_uri(width, height, pixels),
+        "xref": xref,
+        "yref": yref,
+        "x": x0,
+        "y": y1,
+        "sizex": x1 - x0,
+        "sizey": y1 - y0,
+        "sizing": "stretch",
+        "layer": "below",
+    }
+    return placeholder, image
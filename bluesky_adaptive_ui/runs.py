@@ -0,0 +1,160 @@
+"""Selecting runs from the Tiled catalog and telling the agent about all of them.
+
+Instead of pasting uids, an operator describes the runs: a time range, a plan name, a ``scan_id`` range and
+start-document metadata such as the sample. :func:`run_conditions` turns those into conditions that
+:func:`search_runs` applies as a server-side Tiled search. :func:`tell_query` then walks the matching uids page by
+page, telling the agent about each page in chunks (see :func:`bluesky_adaptive_ui.uids.tell_in_chunks`) before
+fetching the next, so a campaign of tens of thousands of runs is never held in memory at once, let alone sent
+to the browser.
+
+Conditions are ``(operator, key, value)`` tuples, with operators ``"eq"``, ``"ge"`` and ``"le"`` on dotted keys of
+the run metadata such as ``"start.plan_name"``.
+"""
+
+import json
+from datetime import datetime
+
+from .uids import DEFAULT_CHUNK_SIZE, DEFAULT_TELL_CONCURRENCY, list_key, tell_in_chunks
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def parse_time(text):
+    """Unix time of an ISO 8601 date or date and time, local time unless it has an offset; None if empty."""
+    if not text or not text.strip():
+        return None
+    return datetime.fromisoformat(text.strip()).timestamp()
+
+
+def parse_metadata(text):
+    """``{key: value}`` from ``key=value`` lines; values that are JSON (numbers, ``true``...) are decoded.
+
+    Raises
+    ------
+    ValueError
+        For a line without ``=``.
+    """
+    metadata = {}
+    for line in (text or "").splitlines():
+        if not line.strip():
+            continue
+        key, equals, value = line.partition("=")
+        if not equals or not key.strip():
+            raise ValueError(f"expected key=value, got {line.strip()!r}")
+        value = value.strip()
+        try:
+            metadata[key.strip()] = json.loads(value)
+        except ValueError:
+            metadata[key.strip()] = value
+    return metadata
+
+
+def run_conditions(since=None, until=None, plan_name=None, scan_id_min=None, scan_id_max=None, metadata=None):
+    """Conditions selecting runs started in ``[since, until]`` (Unix times) with the given plan, scan ids and
+    start-document ``metadata``. Metadata keys are relative to the start document unless they start with
+    ``start.`` or ``stop.``.
+    """
+    conditions = []
+    for op, key, value in (
+        ("ge", "start.time", since),
+        ("le", "start.time", until),
+        ("eq", "start.plan_name", plan_name or None),
+        ("ge", "start.scan_id", scan_id_min),
+        ("le", "start.scan_id", scan_id_max),
+    ):
+        if value is not None:
+            conditions.append((op, key, value))
+    for key, value in (metadata or {}).items():
+        conditions.append(("eq", key if key.startswith(("start.", "stop.")) else f"start.{key}", value))
+    return conditions
+
+
+def tiled_query(condition):
+    """Tiled query object of one condition."""
+    from tiled.queries import Comparison, Eq
+
+    op, key, value = condition
+    return Eq(key, value) if op == "eq" else Comparison(op, key, value)
+
+
+def search_runs(node, conditions, query=tiled_query):
+    """The runs of the Tiled catalog ``node`` matching every condition, as a lazy Tiled search result."""
+    for condition in conditions:
+        node = node.search(query(condition))
+    return node
+
+
+def iter_pages(results, page_size=DEFAULT_PAGE_SIZE, offset=0, stop=None):
+    """Lists of up to ``page_size`` uids of the search ``results``, from the ``offset``-th up to the ``stop``-th.
+
+    Each page is a slice of the keys, which Tiled fetches from the server with one request, so only one page is
+    held at a time and resuming at a large ``offset`` does not read the runs before it.
+    """
+    keys = results.keys()
+    while stop is None or offset < stop:
+        end = offset + page_size if stop is None else min(offset + page_size, stop)
+        page = list(keys[offset:end])
+        if not page:
+            return
+        yield page
+        offset += len(page)
+
+
+def query_key(conditions):
+    """Digest identifying the selection ``conditions``, for resuming a telling of the same runs."""
+    return list_key([json.dumps(condition, sort_keys=True) for condition in conditions])
+
+
+def tell_query(
+    client,
+    results,
+    state,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    max_concurrency=DEFAULT_TELL_CONCURRENCY,
+    page_size=DEFAULT_PAGE_SIZE,
+):
+    """Tell the agent about every run of ``results``, a page at a time.
+
+    ``state`` is a dict with the ``offset`` of the first run not yet sent, the ``[start, stop)`` offsets of the
+    runs to ``retry`` and running counts of runs ``told`` and ``failed`` (still to retry). It is updated after
+    each page, so passing it again resumes where a cancelled telling stopped, re-reading and retrying the failed
+    runs first. Failed runs are kept as merged offset ranges rather than uids, so the state stays small however
+    many fail. Once every chunk of a page fails the agent is taken to be down and the walk stops, leaving the
+    rest for the next attempt. Yields the :class:`~bluesky_adaptive_ui.uids.ChunkResult` list of each page.
+    """
+    retry = state.get("retry", [])
+    state["retry"] = []
+    for i, (start, stop) in enumerate(retry):
+        for page in iter_pages(results, page_size, start, stop):
+            chunks = _tell_page(client, page, start, state, chunk_size, max_concurrency)
+            start += len(page)
+            yield chunks
+            if not any(chunk.ok for chunk in chunks):
+                _record_failures(state, [[start, stop], *retry[i + 1 :]])
+                return
+    for page in iter_pages(results, page_size, state.get("offset", 0)):
+        chunks = _tell_page(client, page, state.get("offset", 0), state, chunk_size, max_concurrency)
+        state["offset"] = state.get("offset", 0) + len(page)
+        yield chunks
+        if not any(chunk.ok for chunk in chunks):
+            return
+
+
+def _tell_page(client, uids, offset, state, chunk_size, max_concurrency):
+    """Tell the agent about the ``uids`` starting at ``offset`` of the results, recording the failed ones."""
+    chunks = list(tell_in_chunks(client, uids, chunk_size, max_concurrency))
+    state["told"] = state.get("told", 0) + sum(len(chunk.uids) for chunk in chunks if chunk.ok)
+    failed = [offset + chunk.index * chunk_size for chunk in chunks if not chunk.ok]
+    _record_failures(state, [[start, min(start + chunk_size, offset + len(uids))] for start in failed])
+    return chunks
+
+
+def _record_failures(state, ranges):
+    merged = []
+    for start, stop in sorted(state["retry"] + [list(r) for r in ranges if r[0] < r[1]]):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+    state["retry"] = merged
+    state["failed"] = sum(stop - start for start, stop in merged)
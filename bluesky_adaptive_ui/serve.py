@@ -0,0 +1,143 @@
+"""Run a dashboard under a production server with several worker processes and threads.
+
+The Dash development server runs in a single process and is not meant for many concurrent operators.
+This module serves the same apps through gunicorn (WSGI) or uvicorn (ASGI, via ``asgiref``)::
+
+    python -m bluesky_adaptive_ui.serve default --workers 4 --threads 8 -- --agent-port 60615
+    python -m bluesky_adaptive_ui.serve clustering --server uvicorn --workers 2 -- --tiled-profile pdf
+
+Options after the app name that this module does not recognise are passed to the app's own parser, so
+``--agent-address``, ``--poll-interval`` and friends work exactly as with ``python app.py``.
+
+Background threads (the switchboard poller, the Kafka consumer) do not survive ``fork``, so they are started
+in each worker after it is created rather than in the parent, even with ``--preload``. Each worker therefore
+polls the agent on its own; size ``--poll-interval`` accordingly.
+
+With polling on, every open browser tab holds a gunicorn thread for its switchboard stream. Each worker keeps
+:data:`STREAM_RESERVED_THREADS` of its ``--threads`` for other requests (half if there are fewer than twice as
+many); tabs beyond the rest poll instead (see :mod:`bluesky_adaptive_ui.push`).
+
+Requires the optional ``server`` extra: ``pip install bluesky-adaptive-ui[server]``.
+"""
+
+import argparse
+import importlib
+import json
+import os
+
+from .push import MAX_STREAMS_ENV
+
+APPS = {
+    "default": "bluesky_adaptive_ui.default_dash_app.app",
+    "clustering": "bluesky_adaptive_ui.clustering_hud_app.app",
+    "multi": "bluesky_adaptive_ui.multi_agent_app.app",
+}
+DEFAULT_BIND = "0.0.0.0:8050"
+DEFAULT_WORKERS = 2
+DEFAULT_THREADS = 32
+STREAM_RESERVED_THREADS = 8
+
+# Read by :func:`asgi_app` in uvicorn workers, which are started by import string and cannot take arguments.
+APP_ENV = "BLUESKY_ADAPTIVE_UI_APP"
+APP_ARGS_ENV = "BLUESKY_ADAPTIVE_UI_APP_ARGS"
+
+
+def load_app(name, app_argv=()):
+    """Import app ``name``, apply its command line options and return ``(module, args)``.
+
+    Background services are not started; call ``module.start_services(args)`` in the serving process.
+    """
+    module = importlib.import_module(APPS[name])
+    args = module.build_parser().parse_args(list(app_argv))
+    module.configure(args)
+    return module, args
+
+
+def asgi_app():
+    """ASGI application factory for uvicorn, configured from :data:`APP_ENV` and :data:`APP_ARGS_ENV`."""
+    from asgiref.wsgi import WsgiToAsgi
+
+    module, args = load_app(os.environ.get(APP_ENV, "default"), json.loads(os.environ.get(APP_ARGS_ENV, "[]")))
+    module.start_services(args)
+    return WsgiToAsgi(module.server)
+
+
+def stream_limit(threads):
+    """Switchboard streams a gunicorn worker with ``threads`` threads may hold open."""
+    return max(threads - STREAM_RESERVED_THREADS, threads // 2)
+
+
+def run_gunicorn(
+    name, app_argv, *, bind=DEFAULT_BIND, workers=DEFAULT_WORKERS, threads=DEFAULT_THREADS, preload=False
+):
+    from gunicorn.app.base import BaseApplication
+
+    # Read when the app registers its routes, in load(); workers inherit it.
+    os.environ.setdefault(MAX_STREAMS_ENV, str(stream_limit(threads)))
+
+    class DashApplication(BaseApplication):
+        def __init__(self):
+            self._loaded = None
+            super().__init__()
+
+        def load_config(self):
+            self.cfg.set("bind", bind)
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            # Server-sent event streams hold a thread each, so use threaded workers even with threads=1.
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("preload_app", preload)
+            self.cfg.set("post_worker_init", lambda worker: self._loaded[0].start_services(self._loaded[1]))
+
+        def load(self):
+            if self._loaded is None:
+                self._loaded = load_app(name, app_argv)
+            return self._loaded[0].server
+
+    DashApplication().run()
+
+
+def run_uvicorn(name, app_argv, *, bind=DEFAULT_BIND, workers=DEFAULT_WORKERS):
+    import uvicorn
+
+    host, _, port = bind.rpartition(":")
+    os.environ[APP_ENV] = name
+    os.environ[APP_ARGS_ENV] = json.dumps(list(app_argv))
+    uvicorn.run(
+        "bluesky_adaptive_ui.serve:asgi_app", factory=True, host=host or "0.0.0.0", port=int(port), workers=workers
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        epilog="Unrecognised options are passed on to the app.",
+    )
+    parser.add_argument("app", choices=sorted(APPS), help="Which dashboard to serve")
+    parser.add_argument("--server", choices=("gunicorn", "uvicorn"), default="gunicorn", help="Server to run")
+    parser.add_argument("--bind", type=str, default=DEFAULT_BIND, help="host:port to listen on")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Worker processes")
+    parser.add_argument(
+        "--threads", type=int, default=DEFAULT_THREADS, help="Threads per gunicorn worker (ignored by uvicorn)"
+    )
+    parser.add_argument(
+        "--preload",
+        action="store_true",
+        help="Import the app once in the parent before forking gunicorn workers (ignored by uvicorn)",
+    )
+    return parser
+
+
+def main(argv=None):
+    args, app_argv = build_parser().parse_known_args(argv)
+    app_argv = [arg for arg in app_argv if arg != "--"]
+    if args.server == "gunicorn":
+        run_gunicorn(
+            args.app, app_argv, bind=args.bind, workers=args.workers, threads=args.threads, preload=args.preload
+        )
+    else:
+        run_uvicorn(args.app, app_argv, bind=args.bind, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""Switchboard state shared by the dashboards: what the page shows about an agent at a glance."""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field, replace
+
+SWITCHBOARD_VARIABLES = ("ask_on_tell", "report_on_tell", "queue_add_position", "Agent Name")
+TRUTHY = ("True", "true", "on")
+DEFAULT_HEADER = "Agent Switchboard: Unregistered Agent Name"
+STALE_MESSAGE = "stale"
+DEFAULT_MAX_AGE = 5.0
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class SwitchboardState:
+    """Snapshot of the switchboard variables and the agent's registered names.
+
+    Attributes
+    ----------
+    variables : dict
+        Values of the variables that were read successfully.
+    names : list or None
+        Registered variable and method names, or None if they could not be read.
+    errors : dict
+        Maps each variable that could not be read to the URL that failed, matching the text the switchboard
+        shows under an indicator.
+    fetched_at : float
+        ``time.monotonic()`` when the snapshot was read from the agent. Not considered in comparisons.
+    stale : bool
+        Whether this is an old snapshot served because a fresh one is not available.
+    """
+
+    variables: dict = field(default_factory=dict)
+    names: list = None
+    errors: dict = field(default_factory=dict)
+    fetched_at: float = field(default_factory=time.monotonic, compare=False)
+    stale: bool = False
+
+    def to_dict(self):
+        """JSON-serializable form, for sending the snapshot to browsers."""
+        return {"variables": self.variables, "names": self.names, "errors": self.errors, "stale": self.stale}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{key: data[key] for key in ("variables", "names", "errors", "stale") if key in data})
+
+    @property
+    def reachable(self):
+        """Whether anything at all could be read from the agent."""
+        return bool(self.variables) or self.names is not None
+
+    def _message(self, variable_name):
+        if variable_name not in self.variables:
+            return self.errors.get(variable_name, "")
+        return STALE_MESSAGE if self.stale else ""
+
+    def bool_indicator(self, variable_name):
+        """``(message, color)`` for an on/off indicator such as ``ask_on_tell``."""
+        if variable_name not in self.variables:
+            return self._message(variable_name), "black"
+        return self._message(variable_name), "green" if str(self.variables[variable_name]) in TRUTHY else "grey"
+
+    def queue_indicator(self, variable_name="queue_add_position"):
+        """``(message, color)`` for the add-to-front indicator."""
+        if variable_name not in self.variables:
+            return self._message(variable_name), "black"
+        return self._message(variable_name), "green" if str(self.variables[variable_name]) == "front" else "grey"
+
+    @property
+    def header(self):
+        if "Agent Name" not in self.variables:
+            return DEFAULT_HEADER
+        header = f"Agent Switchboard: {self.variables['Agent Name']}"
+        return f"{header} ({STALE_MESSAGE})" if self.stale else header
+
+
+async def _no_names():
+    return None
+
+
+async def fetch_switchboard_state(async_client, variables=SWITCHBOARD_VARIABLES, *, timeout=None, with_names=True):
+    """Read the switchboard variables and the names list in one concurrent batch.
+
+    Parameters
+    ----------
+    async_client : AsyncAgentClient
+    variables : sequence of str
+        Variables to read alongside the names list.
+    timeout : float, optional
+        Per-request timeout, defaulting to the client's.
+    with_names : bool
+        Whether to read the names list too; when False the state's ``names`` is None.
+
+    Returns
+    -------
+    SwitchboardState
+    """
+    variables = list(variables)
+    *responses, names_response = await asyncio.gather(
+        *(async_client.get_variable(name, timeout=timeout) for name in variables),
+        async_client.get_names(timeout=timeout) if with_names else _no_names(),
+        return_exceptions=True,
+    )
+    values, errors = {}, {}
+    for name, response in zip(variables, responses):
+        if isinstance(response, Exception) or response.status_code != 200:
+            errors[name] = async_client.client.variable_url(name)
+        else:
+            values[name] = response.json().get(name, "UNKNOWN")
+    names = None
+    if with_names and not isinstance(names_response, Exception) and names_response.status_code == 200:
+        names = names_response.json().get("names", [])
+    return SwitchboardState(variables=values, names=names, errors=errors)
+
+
+class SwitchboardCache:
+    """Stale-while-revalidate cache of the switchboard state.
+
+    A snapshot younger than ``max_age`` is served as is. An older one is served immediately, marked stale,
+    while a single background thread fetches a replacement. When the agent cannot be reached at all, the
+    last known snapshot keeps being served, marked stale, rather than blanking the page.
+
+    Parameters
+    ----------
+    fetch : callable
+        Returns a fresh :class:`SwitchboardState`; called with no arguments.
+    max_age : float
+        Seconds a snapshot is considered fresh.
+    """
+
+    def __init__(self, fetch, max_age=DEFAULT_MAX_AGE):
+        self._fetch = fetch
+        self.max_age = max_age
+        self._state = None
+        self._invalidated = False
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            state = self._state
+            if state is not None and not self._invalidated:
+                if time.monotonic() - state.fetched_at < self.max_age:
+                    return state
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._background_refresh, daemon=True).start()
+                return replace(state, stale=True)
+        return self.refresh()
+
+    def refresh(self):
+        """Fetch synchronously, falling back to the last known snapshot if the agent is unreachable."""
+        try:
+            state = self._fetch()
+        except Exception:
+            state = SwitchboardState()
+        with self._lock:
+            if not state.reachable and self._state is not None:
+                return replace(self._state, stale=True)
+            self._state = state
+            self._invalidated = False
+        return state
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def invalidate(self):
+        """Force the next :meth:`get` to fetch, e.g. after a write to the agent."""
+        with self._lock:
+            self._invalidated = True
+
+
+class SwitchboardPoller:
+    """Poll the switchboard state on a background thread and hold the latest snapshot.
+
+    Readers get the current immutable :class:`SwitchboardState` without contacting the agent, so upstream
+    load is one fetch per ``interval`` however many browser sessions are open. It offers the same
+    :meth:`get` and :meth:`invalidate` as :class:`SwitchboardCache` and can be used in its place.
+
+    Each time a poll returns different content, :attr:`version` is incremented and threads blocked in
+    :meth:`wait_for_change` are woken, which is what drives server-push updates to browsers.
+
+    Parameters
+    ----------
+    fetch : callable
+        Returns a fresh :class:`SwitchboardState`; called with no arguments.
+    interval : float
+        Seconds between polls.
+    """
+
+    def __init__(self, fetch, interval=DEFAULT_POLL_INTERVAL):
+        self._fetch = fetch
+        self.interval = interval
+        self._state = None
+        self.version = 0
+        self._changed = threading.Condition()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def snapshot(self):
+        """The latest snapshot, or None before the first poll completes."""
+        return self._state
+
+    @property
+    def stopping(self):
+        """Whether :meth:`stop` has been called since the last :meth:`start`."""
+        return self._stopping.is_set()
+
+    def get(self):
+        state = self._state
+        return state if state is not None else self.refresh()
+
+    def refresh(self):
+        """Fetch now, keeping the previous snapshot (marked stale) if the agent is unreachable."""
+        try:
+            state = self._fetch()
+        except Exception:
+            state = SwitchboardState()
+        previous = self._state
+        if not state.reachable and previous is not None:
+            state = replace(previous, stale=True)
+        with self._changed:
+            self._state = state
+            if state != previous:
+                self.version += 1
+                self._changed.notify_all()
+        return state
+
+    def current(self):
+        """The latest ``(version, state)`` pair, read consistently."""
+        with self._changed:
+            return self.version, self._state
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until :attr:`version` differs from ``version`` or ``timeout`` expires.
+
+        Returns
+        -------
+        version : int
+        state : SwitchboardState or None
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version or self._stopping.is_set(), timeout)
+            return self.version, self._state
+
+    def invalidate(self):
+        """Poll immediately instead of waiting out the interval, e.g. after a write to the agent."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self.refresh()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="switchboard-poller", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+        with self._changed:
+            self._changed.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,9 @@
+import pytest
+
+from .fake_agent import FakeAgent
+
+
+@pytest.fixture
+def fake_agent():
+    with FakeAgent() as agent:
+        yield agent
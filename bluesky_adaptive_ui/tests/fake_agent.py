@@ -0,0 +1,184 @@
+"""A minimal stand-in for the bluesky-adaptive agent HTTP API, used by tests and benchmarks.
+
+It serves ``GET/POST /api/variable/{name}`` and ``GET /api/variables/names`` from an in-memory dict,
+speaks HTTP/1.1 keep-alive, and can inject fixed per-request and per-connection delays to emulate a slow
+or distant agent.
+"""
+
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+DEFAULT_VARIABLES = {
+    "Agent Name": "FakeAgent",
+    "agent_uid": "fake-agent-uid",
+    "ask_on_tell": True,
+    "report_on_tell": False,
+    "queue_add_position": "back",
+}
+DEFAULT_METHODS = ("generate_report", "add_suggestions_to_queue", "tell_agent_by_uid")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _variable_name(self):
+        prefix = "/api/variable/"
+        if self.path.startswith(prefix):
+            return unquote(self.path[len(prefix) :])
+        return None
+
+    def do_GET(self):
+        agent = self.server.agent
+        agent._record(self.command, self.path)
+        agent._wait()
+        if self.path == "/api/variables/names":
+            return self._send(200, {"names": agent.names()})
+        name = self._variable_name()
+        with agent.lock:
+            if name is None or name not in agent.variables:
+                return self._send(404, {"detail": f"Unknown variable {name}"})
+            return self._send(200, {name: agent.variables[name]})
+
+    def do_POST(self):
+        agent = self.server.agent
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        agent._record(self.command, self.path, payload)
+        agent._wait()
+        name = self._variable_name()
+        if name is None:
+            return self._send(404, {"detail": "Not found"})
+        value = payload.get("value")
+        with agent.lock:
+            if name in agent.methods:
+                agent.calls.append((name, value))
+                return self._send(200, {name: None})
+            if name not in agent.variables:
+                return self._send(404, {"detail": f"Unknown variable {name}"})
+            agent.variables[name] = value
+            return self._send(200, {name: value})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def finish_request(self, request, client_address):
+        with self.agent.lock:
+            self.agent.connections += 1
+        if self.agent.connect_delay:
+            time.sleep(self.agent.connect_delay)
+        super().finish_request(request, client_address)
+
+    def handle_error(self, request, client_address):
+        # Clients that time out on a delayed request drop the connection; that is expected here.
+        pass
+
+
+class FakeAgent:
+    """In-memory agent server running on a background thread.
+
+    Parameters
+    ----------
+    variables : dict, optional
+        Initial variable values. Defaults to a copy of ``DEFAULT_VARIABLES``.
+    methods : iterable of str, optional
+        Names that accept method-call payloads and record them in ``calls``.
+    delay : float
+        Seconds to sleep before handling each request.
+    connect_delay : float
+        Seconds to sleep once per new TCP connection, emulating connection setup across a slow network.
+    host, port : str, int
+        Address to listen on. The default port 0 picks a free one.
+    """
+
+    def __init__(
+        self, variables=None, methods=DEFAULT_METHODS, delay=0.0, connect_delay=0.0, host="127.0.0.1", port=0
+    ):
+        self.variables = dict(DEFAULT_VARIABLES if variables is None else variables)
+        self.methods = set(methods)
+        self.delay = delay
+        self.connect_delay = connect_delay
+        self.lock = threading.Lock()
+        self.requests = []
+        self.calls = []
+        self.connections = 0
+        self._server = _Server((host, port), _Handler)
+        self._server.agent = self
+        self._thread = None
+
+    def _record(self, method, path, payload=None):
+        with self.lock:
+            self.requests.append((method, path, payload))
+
+    def _wait(self):
+        if self.delay:
+            time.sleep(self.delay)
+
+    def names(self):
+        with self.lock:
+            return sorted(self.variables) + sorted(self.methods)
+
+    @property
+    def address(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://{self.address}:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    # Standalone stand-in agent for trying the dashboards locally, e.g. to watch pushed updates:
+    #   python -m bluesky_adaptive_ui.tests.fake_agent --port 60615 --flip ask_on_tell --every 2
+    #   python bluesky_adaptive_ui/default_dash_app/app.py --poll-interval 0.25
+    parser = argparse.ArgumentParser(description="Run a stand-in bluesky-adaptive agent API")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=60615)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to sleep per request")
+    parser.add_argument("--flip", type=str, nargs="*", default=[], help="Boolean variables to toggle")
+    parser.add_argument("--every", type=float, default=2.0, help="Seconds between toggles")
+    args = parser.parse_args()
+
+    with FakeAgent(delay=args.delay, host=args.host, port=args.port) as agent:
+        print(f"Stand-in agent serving at {agent.url}")
+        for tick in itertools.count():
+            time.sleep(args.every)
+            with agent.lock:
+                for name in args.flip:
+                    agent.variables[name] = not agent.variables.get(name, False)
@@ -0,0 +1,28 @@
+"""An in-memory stand-in for a Kafka topic and ``bluesky_kafka.RemoteDispatcher``."""
+
+import queue
+
+
+class InMemoryDispatcher:
+    """Deliver published ``(name, doc)`` pairs to subscribers from whichever thread calls :meth:`start`."""
+
+    def __init__(self, polling_duration=0.01):
+        self.polling_duration = polling_duration
+        self._queue = queue.Queue()
+        self._callbacks = []
+
+    def publish(self, name, doc):
+        self._queue.put((name, doc))
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    def start(self, continue_polling=None):
+        continue_polling = continue_polling or (lambda: True)
+        while continue_polling():
+            try:
+                name, doc = self._queue.get(timeout=self.polling_duration)
+            except queue.Empty:
+                continue
+            for callback in self._callbacks:
+                callback(name, doc)
@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+from ..async_client import AsyncAgentClient, run_sync
+from ..client import AgentClient
+from ..dashboard import AgentDashboard
+from .fake_agent import FakeAgent
+
+NAMES = ["ask_on_tell", "report_on_tell", "queue_add_position", "Agent Name"]
+
+
+def test_get_variables_concurrently():
+    with FakeAgent(delay=0.2) as agent, AgentClient(agent.address, agent.port) as client:
+        aclient = AsyncAgentClient(client, max_concurrency=len(NAMES))
+        start = time.perf_counter()
+        responses = run_sync(aclient.get_variables(NAMES))
+        elapsed = time.perf_counter() - start
+        aclient.close()
+    assert {name: r.json()[name] for name, r in responses.items()} == {n: agent.variables[n] for n in NAMES}
+    assert elapsed < 2 * 0.2
+
+
+def test_concurrency_is_bounded():
+    with FakeAgent(delay=0.1) as agent, AgentClient(agent.address, agent.port) as client:
+        aclient = AsyncAgentClient(client, max_concurrency=2)
+        start = time.perf_counter()
+        asyncio.run(aclient.get_variables(NAMES))
+        elapsed = time.perf_counter() - start
+        aclient.close()
+    assert elapsed >= 2 * 0.1
+
+
+def test_return_exceptions(fake_agent):
+    with AgentClient(fake_agent.address, fake_agent.port) as client:
+        aclient = AsyncAgentClient(client)
+        fake_agent.stop()
+        responses = run_sync(aclient.get_variables(["ask_on_tell"], timeout=0.5, return_exceptions=True))
+        aclient.close()
+    assert isinstance(responses["ask_on_tell"], Exception)
+
+
+def test_replacing_the_dashboard_client_stops_the_old_executor():
+    dashboard = AgentDashboard(AgentClient())
+    previous = dashboard.async_agent_client
+    dashboard.set_agent_client(AgentClient())
+    assert previous._executor._shutdown and not dashboard.async_agent_client._executor._shutdown
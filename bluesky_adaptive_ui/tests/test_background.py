@@ -0,0 +1,113 @@
+import time
+
+import dash
+import pytest
+
+from ..background import background_callback_manager, call_with_progress
+from ..client import AgentClient
+from ..dashboard import _DASHBOARDS, create_app
+from .fake_agent import FakeAgent
+
+pytestmark = pytest.mark.skipif(background_callback_manager() is None, reason="requires dash[diskcache]")
+
+
+def _is_background(entry):
+    """Whether a callback map entry or dependency is a background callback; Dash 2 calls them ``long``."""
+    return bool(entry.get("background", entry.get("long")))
+
+
+def _run_background(client, app, button_id, states=()):
+    """Click ``button_id`` through Dash's HTTP endpoint and poll until the background call returns."""
+    for dependency in client.get("/_dash-dependencies").json:
+        if dependency["inputs"] == [{"id": button_id, "property": "n_clicks"}] and _is_background(dependency):
+            break
+    outputs = [part.rsplit(".", 1) for part in dependency["output"].strip(".").split("...")]
+    body = {
+        "output": dependency["output"],
+        "outputs": [{"id": id_, "property": prop} for id_, prop in outputs],
+        "inputs": [{"id": button_id, "property": "n_clicks", "value": 1}],
+        "changedPropIds": [f"{button_id}.n_clicks"],
+        "state": [{"id": "dashboard-key", "property": "data", "value": app.dashboard.key}, *states],
+    }
+    job = client.post("/_dash-update-component", json=body).json
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        response = client.post(f"/_dash-update-component?cacheKey={job['cacheKey']}&job={job['job']}", json=body)
+        if "response" in response.json:
+            return response.json["response"]
+    raise TimeoutError(f"{button_id} did not finish")
+
+
+def test_copy_keeps_settings_but_not_connections():
+    client = AgentClient("agent", 1234, pool_size=3, timeouts={"generate_report": 120}, read_ttl=0.5)
+    copy = client.copy(timeout=1.0)
+    assert (copy.address, copy.port, copy.pool_size, copy.timeout) == ("agent", 1234, 3, 1.0)
+    assert copy.timeouts == {"generate_report": 120} and copy.reads.ttl == 0.5
+    assert copy.session is not client.session and copy.breaker is not client.breaker
+
+
+def test_progress_is_reported_until_the_call_returns():
+    messages = []
+    with FakeAgent(delay=0.3) as agent, AgentClient.from_url(agent.url) as client:
+        response = call_with_progress(client, messages.append, "generate_report", interval=0.05)
+    assert response.status_code == 200
+    assert messages and all(message.startswith("generate_report running for") for message in messages)
+
+
+def test_slow_calls_run_as_background_callbacks():
+    with FakeAgent() as agent:
+        app = create_app(agent.url, features=["methods"])
+        assert sum(_is_background(entry) for entry in app.callback_map.values()) == 4
+        output = _run_background(app.server.test_client(), app, "trigger-generate-report")
+    assert "Success" in str(output["generate-report-output"]["children"])
+    assert output["trigger-generate-report-done"]["data"] > 0
+    assert [call[0] for call in agent.calls] == ["generate_report"]
+
+
+def test_jobs_only_reach_registered_dashboards():
+    app = create_app(features=())
+    with pytest.raises(dash.exceptions.PreventUpdate):
+        app.dashboard.generate_report_job(lambda *progress: None, 1, "/not-mounted/")
+
+
+def test_without_a_manager_calls_stay_regular_callbacks():
+    app = create_app(features=["methods"], background_callback_manager=None)
+    assert not any(_is_background(entry) for entry in app.callback_map.values())
+
+
+def test_batches_stream_into_the_results_table():
+    with FakeAgent(delay=0.2) as agent:
+        app = create_app(agent.url, features=["methods"])
+        states = [
+            {"id": "method-name-input", "property": "value", "value": "tell_agent_by_uid"},
+            {"id": "batch-calls-input", "property": "value", "value": "\n".join(f'"uid{i}"' for i in range(6))},
+            {"id": "batch-concurrency", "property": "value", "value": 2},
+        ]
+        output = _run_background(app.server.test_client(), app, "batch-call-button", states)
+    assert len(output["batch-results"]["data"]) == 6
+    assert output["batch-summary"]["children"].startswith("6 of 6 calls done, 0 failed")
+
+
+def test_uids_are_told_in_the_background():
+    with FakeAgent() as agent:
+        app = create_app(agent.url, features=["uids"])
+        states = [
+            {"id": "submit-uids-input", "property": "value", "value": "a, b, c"},
+            {"id": "submit-uids-chunk-size", "property": "value", "value": 2},
+            {"id": "submit-uids-concurrency", "property": "value", "value": 2},
+            {"id": "submit-uids-state", "property": "data", "value": None},
+            {"id": "submit-uids-check", "property": "data", "value": None},
+        ]
+        output = _run_background(app.server.test_client(), app, "submit-uids-button", states)
+    assert output["submit-uids-state"]["data"]["done"] == [0, 1]
+    assert len(agent.calls) == 2
+
+
+def test_dashboards_for_different_agents_have_different_keys():
+    apps = [create_app(url, features=(), background_callback_manager=None) for url in ("http://a:1", "http://b:2")]
+    assert apps[0].dashboard.key != apps[1].dashboard.key
+    dashboard = apps[0].dashboard
+    dashboard.set_agent_client(AgentClient("c", 3))
+    assert dashboard.key == "/http://c:3" and dashboard.key_store.data == dashboard.key
+    assert _DASHBOARDS[dashboard.key] is dashboard and "/http://a:1" not in _DASHBOARDS
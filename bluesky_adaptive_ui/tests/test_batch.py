@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+from ..batch import iter_batch, parse_batch, summarize
+from ..client import AgentClient
+from ..dashboard import create_app
+from .fake_agent import FakeAgent
+
+
+class _CountingClient:
+    """Stands in for an AgentClient, recording the most calls in flight at once."""
+
+    def __init__(self, delay=0.02, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.in_flight = self.peak = 0
+        self.lock = threading.Lock()
+
+    def call_method(self, name, args=None, kwargs=None, *, timeout=None):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        if args and args[0] in self.fail:
+            raise ConnectionError("agent went away")
+        return type("Response", (), {"status_code": 200, "text": ""})()
+
+
+def test_parse_batch_forms():
+    text = '\n# comment\n["det1", 10]\n{"pos": 15}\n[["det2"], {"pos": 5}]\n"a1b2c3"\n'
+    assert parse_batch(text) == [(["det1", 10], {}), ([], {"pos": 15}), (["det2"], {"pos": 5}), (["a1b2c3"], {})]
+    assert parse_batch('[\n  "uid1",\n  "uid2"\n]') == [(["uid1"], {}), (["uid2"], {})]
+    with pytest.raises(ValueError, match="line 2"):
+        parse_batch('["ok"]\n[not json')
+
+
+def test_iter_batch_bounds_concurrency_and_reports_failures():
+    client = _CountingClient(fail={"bad"})
+    calls = [([f"uid{i}"], {}) for i in range(20)] + [(["bad"], {})]
+    results = list(iter_batch(client, "tell_agent_by_uid", calls, max_concurrency=3))
+    assert client.peak == 3
+    assert sorted(result.index for result in results) == list(range(21))
+    (failed,) = [result for result in results if not result.ok]
+    assert failed.args == ["bad"] and "ConnectionError" in failed.error
+    assert summarize(results, 21).startswith("21 of 21 calls done, 1 failed")
+
+
+def test_batch_from_the_dashboard():
+    with FakeAgent() as agent:
+        app = create_app(agent.url, features=["methods"], background_callback_manager=None)
+        rows, summary = app.dashboard.call_batch(1, "tell_agent_by_uid", '"uid1"\n"uid2"\n"uid3"', 2)
+    assert summary.startswith("3 of 3 calls done, 0 failed")
+    assert sorted(row["arguments"] for row in rows) == [f'[["uid{i}"], {{}}]' for i in (1, 2, 3)]
+    assert sorted(call[1][0][0] for call in agent.calls) == ["uid1", "uid2", "uid3"]
+
+
+def test_batch_widens_a_small_connection_pool():
+    with FakeAgent(delay=0.05) as agent:
+        app = create_app(client=AgentClient.from_url(agent.url, pool_size=1), features=["methods"])
+        rows, _ = app.dashboard._run_batch(app.dashboard.agent_client, "generate_report", "[]\n" * 4, 4)
+    assert len(rows) == 4 and agent.connections > 1
@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+
+import pytest
+
+from ..cache import CacheBackend, FileCache, InProcessCache, RedisCache, cache_backend_from_url
+
+
+@pytest.fixture(params=["memory", "file", "redis"])
+def make_backend(request, tmp_path):
+    """Factory of backend instances that share storage, like one backend per worker process."""
+    if request.param == "memory":
+        backend = InProcessCache()
+        return lambda: backend
+    if request.param == "file":
+        return lambda: FileCache(tmp_path / "cache")
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    return lambda: RedisCache(fakeredis.FakeRedis(server=server))
+
+
+def test_get_set_add_delete_and_expiry(make_backend):
+    cache = make_backend()
+    assert cache.get("a") is None
+    cache.set("a", {"x": [1, 2]})
+    assert make_backend().get("a") == {"x": [1, 2]}
+    assert not cache.add("a", 0)
+    cache.delete("a")
+    assert cache.add("a", 1, ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.add("a", 2)
+
+
+def test_workers_share_one_fetch(make_backend):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"value": len(calls)}
+
+    results = []
+    workers = [
+        threading.Thread(target=lambda cache=make_backend(): results.append(cache.get_or_fetch("k", fetch, 5)))
+        for _ in range(8)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(calls) == 1
+    assert results == [{"value": 1}] * 8
+
+
+def test_invalidate_during_fetch_is_not_stored(make_backend):
+    cache = make_backend()
+
+    def fetch():
+        cache.invalidate("k")
+        return "old"
+
+    assert cache.get_or_fetch("k", fetch, 5) == "old"
+    assert cache.get("k") is None
+
+
+def test_backend_from_url(tmp_path):
+    assert isinstance(cache_backend_from_url("memory"), InProcessCache)
+    assert cache_backend_from_url(f"file://{tmp_path}").directory == str(tmp_path)
+    assert isinstance(cache_backend_from_url(str(tmp_path)), FileCache)
+
+
+def test_file_lock_being_written_is_held(tmp_path):
+    cache = FileCache(tmp_path)
+    # A lock created by an older version that has not written its value yet.
+    open(cache._path("k"), "wb").close()
+    assert not cache.add("k", 1, ttl=5)
+    os.utime(cache._path("k"), (time.time() - 10, time.time() - 10))
+    assert cache.add("k", 1, ttl=5)
+    assert cache.get("k") == 1
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_incomplete_backend_cannot_be_constructed():
+    class GetOnly(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from ..client import AgentClient
+
+
+def test_variable_round_trip(fake_agent):
+    with AgentClient(fake_agent.address, fake_agent.port) as client:
+        assert client.get_variable("ask_on_tell").json() == {"ask_on_tell": True}
+        assert client.set_variable("ask_on_tell", False).status_code == 200
+        assert client.get_variable("ask_on_tell").json() == {"ask_on_tell": False}
+        assert "generate_report" in client.get_names().json()["names"]
+        client.call_method("tell_agent_by_uid", [["a", "b"]])
+    assert fake_agent.calls == [("tell_agent_by_uid", [[["a", "b"]], {}])]
+
+
+def test_connections_are_reused(fake_agent):
+    with AgentClient(fake_agent.address, fake_agent.port, pool_size=2) as client:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(lambda _: client.get_variable("Agent Name"), range(50)))
+    assert all(r.status_code == 200 for r in responses)
+    assert fake_agent.connections <= 2
+
+
+def test_copy_sharing_reads_invalidates_the_parent(fake_agent):
+    with AgentClient(fake_agent.address, fake_agent.port, read_ttl=60) as client:
+        assert client.get_variable("ask_on_tell").json() == {"ask_on_tell": True}
+        with client.copy(pool_size=4, share_reads=True) as copy:
+            copy.set_variable("ask_on_tell", False)
+        assert copy._session is None
+        assert client.get_variable("ask_on_tell").json() == {"ask_on_tell": False}
@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from ..client import AgentClient
+from .fake_agent import FakeAgent
+
+
+def test_concurrent_reads_share_one_request():
+    with FakeAgent(delay=0.2) as agent, AgentClient(agent.address, agent.port, read_ttl=0) as client:
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            responses = list(executor.map(lambda _: client.get_variable("ask_on_tell"), range(10)))
+    assert all(r.json() == {"ask_on_tell": True} for r in responses)
+    assert len(agent.requests) == 1
+    assert client.read_stats() == {"hits": 0, "misses": 1, "coalesced": 9}
+
+
+def test_cached_reads_are_invalidated_by_writes(fake_agent):
+    with AgentClient(fake_agent.address, fake_agent.port, read_ttl=60) as client:
+        assert client.get_variable("ask_on_tell").json()["ask_on_tell"] is True
+        assert client.get_variable("ask_on_tell").json()["ask_on_tell"] is True
+        client.set_variable("ask_on_tell", False)
+        assert client.get_variable("ask_on_tell").json()["ask_on_tell"] is False
+        assert client.read_stats() == {"hits": 1, "misses": 2, "coalesced": 0}
+
+
+def test_failed_reads_are_not_cached(fake_agent):
+    with AgentClient(fake_agent.address, fake_agent.port, read_ttl=60) as client:
+        assert client.get_variable("missing").status_code == 404
+        fake_agent.variables["missing"] = 1
+        assert client.get_variable("missing").status_code == 200
@@ -0,0 +1,62 @@
+import flask
+import pytest
+
+from ..dashboard import FEATURES, create_app, mount_agents
+from .fake_agent import FakeAgent
+
+
+def _refresh_switchboard(client, prefix="/"):
+    """Run the page-load callback through Dash's HTTP endpoint, as a browser would."""
+    for dependency in client.get(f"{prefix}_dash-dependencies").json:
+        if (
+            dependency["inputs"] == [{"id": "refresh-page", "property": "n_intervals"}]
+            and "@" in dependency["output"]
+        ):
+            break
+    outputs = [part.rsplit(".", 1) for part in dependency["output"].strip(".").split("...")]
+    response = client.post(
+        f"{prefix}_dash-update-component",
+        json={
+            "output": dependency["output"],
+            "outputs": [{"id": id_, "property": prop.split("@")[0]} for id_, prop in outputs],
+            "inputs": [{"id": "refresh-page", "property": "n_intervals", "value": 1}],
+            "changedPropIds": ["refresh-page.n_intervals"],
+            "state": [],
+        },
+    )
+    assert response.status_code == 200
+    return response.json["response"]
+
+
+def test_features_select_layout_and_callbacks():
+    full = create_app(features=FEATURES)
+    bare = create_app(features=())
+    assert "hud-plot" in str(full.layout) and "names-output" in str(full.layout)
+    assert "hud-plot" not in str(bare.layout) and "names-output" not in str(bare.layout)
+    assert len(bare.callback_map) < len(full.callback_map)
+    with pytest.raises(ValueError):
+        create_app(features=["no-such-feature"])
+
+
+def test_many_agents_share_one_server():
+    with FakeAgent(variables={"Agent Name": "first"}) as first, FakeAgent(
+        variables={"Agent Name": "second"}
+    ) as second:
+        server = flask.Flask(__name__)
+        apps = mount_agents(server, {"first": first.url, "second": second.url})
+        client = server.test_client()
+
+        assert (
+            _refresh_switchboard(client, "/first/")["switchboard-header"]["children"] == "Agent Switchboard: first"
+        )
+        assert (
+            _refresh_switchboard(client, "/second/")["switchboard-header"]["children"]
+            == "Agent Switchboard: second"
+        )
+        assert apps["first"].dashboard.agent_client.session is apps["second"].dashboard.agent_client.session
+        assert apps["first"].dashboard.cache_backend is apps["second"].dashboard.cache_backend
+
+        index = client.get("/").get_data(as_text=True)
+        assert 'href="/first/"' in index and 'href="/second/"' in index
+        assert client.get("/second/api/switchboard/stream").status_code == 204
+        assert client.get("/first/api/agent-client/stats").json["misses"] > 0
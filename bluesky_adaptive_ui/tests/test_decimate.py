@@ -0,0 +1,90 @@
+import math
+import random
+
+import pytest
+
+from .. import decimate
+from ..decimate import decimate_figure, density_sample, lttb, zoom_ranges
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = list(range(10_000))
+    y = [math.sin(i / 500) for i in x]
+    y[4321] = 50.0
+    indices = lttb(x, y, 200)
+    assert len(indices) == 200 and indices[0] == 0 and indices[-1] == 9_999
+    assert indices == sorted(indices) and 4321 in indices
+
+
+def test_density_sample_keeps_outliers():
+    rng = random.Random(0)
+    x = [rng.gauss(0, 1) for _ in range(20_000)] + [40.0]
+    y = [rng.gauss(0, 1) for _ in range(20_000)] + [40.0]
+    indices = density_sample(x, y, 1000)
+    assert 900 <= len(indices) <= 1300 and 20_000 in indices
+
+
+def test_decimate_figure_switches_to_webgl_and_reduces_per_point_arrays():
+    n = 50_000
+    figure = {
+        "data": [
+            {
+                "type": "scatter",
+                "mode": "markers",
+                "x": list(range(n)),
+                "y": [i % 97 for i in range(n)],
+                "marker": {"color": [i % 3 for i in range(n)], "size": 4},
+                "text": [str(i) for i in range(n)],
+            },
+            {"type": "scatter", "mode": "lines", "x": list(range(n)), "y": [i % 11 for i in range(n)]},
+            {"type": "scatter", "x": [1, 2], "y": [3, 4]},
+            {"type": "heatmap", "z": [[1, 2], [3, 4]]},
+        ],
+        "layout": {"title": {"text": "kmeans"}},
+    }
+    decimated = decimate_figure(figure, max_points=2000, webgl_threshold=1000)
+    markers, line, small, heatmap = decimated["data"]
+    assert markers["type"] == line["type"] == "scattergl"
+    assert len(markers["x"]) == len(markers["marker"]["color"]) == len(markers["text"]) <= 2500
+    assert markers["marker"]["size"] == 4 and [int(t) for t in markers["text"]] == markers["x"]
+    assert len(line["x"]) == 2000
+    assert small is figure["data"][2] and heatmap is figure["data"][3]
+    assert len(figure["data"][0]["x"]) == n
+
+
+def test_zoom_shows_region_at_full_resolution():
+    n = 50_000
+    figure = {"data": [{"mode": "markers", "x": list(range(n)), "y": list(range(n))}], "layout": {}}
+    zoomed = decimate_figure(
+        figure, 2000, 1000, ranges=zoom_ranges({"xaxis.range[0]": 100, "xaxis.range[1]": 599.5})
+    )
+    assert zoomed["data"][0]["x"] == list(range(100, 600)) and zoomed["data"][0].get("type") != "scattergl"
+    assert zoomed["layout"]["xaxis"] == {"range": [100, 599.5], "autorange": False}
+    assert zoom_ranges({"xaxis.autorange": True}) == {}
+    assert zoom_ranges({"autosize": True}) is None
+
+
+def test_zoom_applies_to_the_traces_of_the_zoomed_subplot():
+    n = 50_000
+    top = {"mode": "markers", "x": list(range(n)), "y": list(range(n))}
+    bottom = {**top, "xaxis": "x2", "yaxis": "y2"}
+    figure = {"data": [top, bottom], "layout": {}}
+    ranges = zoom_ranges({"xaxis2.range[0]": 100, "xaxis2.range[1]": 599.5, "yaxis2.range": [0, 1000]})
+    assert ranges == {"xaxis2": (100, 599.5), "yaxis2": (0, 1000)}
+    zoomed = decimate_figure(figure, 2000, 1000, ranges=ranges)
+    assert zoomed["data"][1]["x"] == list(range(100, 600))
+    assert len(zoomed["data"][0]["x"]) < 2100 and zoomed["data"][0]["x"][-1] > 0.99 * n
+    assert zoomed["layout"] == {
+        "xaxis2": {"range": [100, 599.5], "autorange": False},
+        "yaxis2": {"range": [0, 1000], "autorange": False},
+    }
+
+
+def test_numpy_and_pure_python_sampling_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    rng = random.Random(1)
+    x = sorted(rng.uniform(0, 100) for _ in range(30_000))
+    y = [rng.gauss(0, 1) for _ in x]
+    fast = lttb(x, y, 200), density_sample(x, y, 1000), density_sample(y, x, 1000)
+    monkeypatch.setattr(decimate, "HAVE_NUMPY", False)
+    assert (lttb(x, y, 200), density_sample(x, y, 1000), density_sample(y, x, 1000)) == fast
@@ -0,0 +1,57 @@
+import time
+
+from ..documents import AgentDocumentBuffer, DocumentConsumerThread, summarize_event
+from .fake_broker import InMemoryDispatcher
+
+
+def _publish_run(dispatcher, n_reports):
+    dispatcher.publish("start", {"uid": "run"})
+    dispatcher.publish("descriptor", {"uid": "d-report", "run_start": "run", "name": "report"})
+    dispatcher.publish("descriptor", {"uid": "d-other", "run_start": "run", "name": "other"})
+    for i in range(n_reports):
+        dispatcher.publish("event", {"descriptor": "d-report", "seq_num": i + 1, "time": i, "data": {"x": i}})
+    dispatcher.publish("event", {"descriptor": "d-other", "seq_num": 1, "time": 0, "data": {}})
+
+
+def test_buffer_is_bounded_per_stream():
+    dispatcher = InMemoryDispatcher()
+    buffer = AgentDocumentBuffer(maxlen=5)
+    consumer = DocumentConsumerThread(dispatcher, buffer).start()
+    try:
+        _publish_run(dispatcher, 12)
+        deadline = time.monotonic() + 2
+        while buffer.version < 12:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        consumer.stop()
+    version, events = buffer.snapshot()
+    assert [event["data"]["x"] for event in events["report"]] == [7, 8, 9, 10, 11]
+    assert events["ask"] == [] and "other" not in events
+    assert version == 12
+
+
+def test_event_pages_are_unpacked():
+    buffer = AgentDocumentBuffer()
+    buffer("descriptor", {"uid": "d", "name": "tell"})
+    buffer("event_page", {"descriptor": "d", "seq_num": [1, 2], "time": [0, 1], "data": {"x": [[1, 2], 3]}})
+    _, events = buffer.snapshot()
+    assert [summarize_event(event) for event in events["tell"]] == [
+        {"time": 0, "seq_num": 1, "x": "list[2]"},
+        {"time": 1, "seq_num": 2, "x": "3"},
+    ]
+
+
+def test_runs_of_other_agents_are_dropped():
+    buffer = AgentDocumentBuffer(agent_name="gp")
+    for run, agent in (("run-gp", "gp"), ("run-kmeans", "kmeans")):
+        buffer("start", {"uid": run, "agent_name": agent})
+        buffer("descriptor", {"uid": f"d-{run}", "run_start": run, "name": "tell"})
+    # A new run of another agent does not forget the open run of this one.
+    buffer("start", {"uid": "run-kmeans-2", "agent_name": "kmeans"})
+    for run in ("run-gp", "run-kmeans"):
+        buffer("event", {"descriptor": f"d-{run}", "seq_num": 1, "time": 0, "data": {"run": run}})
+    buffer("stop", {"run_start": "run-gp"})
+    buffer("event", {"descriptor": "d-run-gp", "seq_num": 2, "time": 1, "data": {"run": "run-gp"}})
+    version, events = buffer.snapshot()
+    assert [event["data"]["run"] for event in events["tell"]] == ["run-gp"] and version == 1
@@ -0,0 +1,83 @@
+import contextlib
+import time
+
+import flask
+
+from ..fleet import Fleet, create_fleet_app
+from .fake_agent import FakeAgent
+
+DELAY = 0.05
+
+
+def test_fleet_refresh_time_is_flat_and_unreachable_agents_are_flagged():
+    with contextlib.ExitStack() as stack:
+        agents = [stack.enter_context(FakeAgent(delay=DELAY)) for _ in range(10)]
+        urls = {f"agent{i}": agent.url for i, agent in enumerate(agents)}
+        urls["down"] = "http://127.0.0.1:9"
+        fleet = Fleet(urls, max_concurrency=64, timeout=1.0, read_ttl=0)
+        stack.callback(fleet.close)
+
+        start = time.perf_counter()
+        rows = {row["agent"]: row for row in fleet.rows(fleet.poll())}
+        elapsed = time.perf_counter() - start
+
+        # 40 requests: sequentially that would be 40 * DELAY
+        assert elapsed < 10 * DELAY
+        assert rows["agent0"]["reachable"] == "yes" and rows["agent0"]["ask_on_tell"] == "on"
+        assert rows["agent3"]["Agent Name"] == "FakeAgent" and rows["agent3"]["queue_add_position"] == "back"
+        assert rows["down"]["reachable"] == "no" and rows["down"]["Agent Name"] == ""
+        assert all(len(agent.requests) == 4 for agent in agents)
+
+
+def test_concurrency_is_bounded():
+    with FakeAgent(delay=DELAY) as agent:
+        fleet = Fleet({f"a{i}": agent.url for i in range(4)}, max_concurrency=2, read_ttl=0)
+        start = time.perf_counter()
+        fleet.poll()
+        fleet.close()
+    # 16 requests, two at a time
+    assert time.perf_counter() - start >= 8 * DELAY
+
+
+def test_fleet_app_links_agents():
+    with FakeAgent() as agent:
+        fleet = Fleet({"kmeans": agent.url})
+        app = create_fleet_app(fleet, links={"kmeans": "/kmeans/"}, server=flask.Flask(__name__))
+        assert app.server.test_client().get("/").status_code == 200
+        fleet.close()
+
+
+def test_broadcast_reports_each_agent():
+    with FakeAgent() as first, FakeAgent() as second:
+        fleet = Fleet({"first": first.url, "second": second.url, "down": "http://127.0.0.1:9"}, timeout=1.0)
+        try:
+            results = fleet.set_variable("ask_on_tell", False, agents=["first", "down"])
+            assert [(result.agent, result.ok) for result in results] == [("first", True), ("down", False)]
+            assert results[1].status_code is None and "ConnectionError" in results[1].error
+            assert first.variables["ask_on_tell"] is False and second.variables["ask_on_tell"] is True
+
+            results = fleet.call_method("generate_report", agents=["first", "second"])
+            assert all(result.ok and result.latency > 0 for result in results)
+            assert first.calls[-1][0] == second.calls[-1][0] == "generate_report"
+            assert results[0].to_row()["ok"] == "yes"
+        finally:
+            fleet.close()
+
+
+def test_requests_per_agent_are_capped():
+    with FakeAgent(delay=DELAY) as agent:
+        fleet = Fleet({"only": agent.url}, max_concurrency=8, max_per_agent=1, read_ttl=0)
+        start = time.perf_counter()
+        fleet.poll()
+        fleet.close()
+    assert time.perf_counter() - start >= 4 * DELAY
+
+
+def test_method_calls_use_the_fleet_timeout():
+    with FakeAgent(delay=0.5) as agent:
+        fleet = Fleet({"slow": agent.url}, timeout=0.05)
+        try:
+            (result,) = fleet.call_method("generate_report")
+        finally:
+            fleet.close()
+    assert not result.ok and "Timeout" in result.error
@@ -0,0 +1,206 @@
+import sys
+from types import SimpleNamespace
+
+import dash
+import pytest
+
+from ..cache import InProcessCache
+from ..dashboard import AgentDashboard
+from ..hud import FigureCache, HudRenderers, ReportSeries, agent_type_names, figure_json, report_marker
+
+
+def line_hud(report):
+    return {"data": [{"y": report.data}], "layout": {"title": {"text": "line"}}}
+
+
+class KmeansLikeAgent:
+    @staticmethod
+    def hud_from_report(report, plotly=False):
+        assert plotly
+        return {"data": [{"x": report.data}], "layout": {"title": {"text": "kmeans"}}}
+
+
+def report(agent_class=None, data=(1, 2, 3)):
+    start = {"agent_class": agent_class} if agent_class else {}
+    return SimpleNamespace(metadata={"start": start}, data=list(data))
+
+
+def test_agent_type_names_from_metadata_and_switchboard():
+    names = agent_type_names(report("<class 'my_agents.gp.GPAgent'>"), "GPAgent-3f2a")
+    assert names == ["<class 'my_agents.gp.GPAgent'>", "GPAgent", "GPAgent-3f2a"]
+
+
+def test_renderer_chosen_by_agent_class_or_name_prefix():
+    renderers = HudRenderers(
+        {"GPAgent": line_hud, "KMeans": KmeansLikeAgent}, default=None, entry_point_group=None
+    )
+    assert renderers.match(report("<class 'my_agents.gp.GPAgent'>")) == "GPAgent"
+    assert renderers.match(report(), agent_name="KMeans-3f2a") == "KMeans"
+    assert renderers.render(report(), "KMeans-1")["layout"]["title"]["text"] == "kmeans"
+    with pytest.raises(LookupError):
+        renderers.match(report(), "Unknown")
+    renderers.default = "GPAgent"
+    assert renderers.render(report(), "Unknown")["layout"]["title"]["text"] == "line"
+
+
+def test_renderers_are_imported_on_first_use_and_cached(monkeypatch):
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    renderers = HudRenderers({"Color": "colorsys:rgb_to_hsv"}, entry_point_group=None)
+    assert "colorsys" not in sys.modules
+    renderer = renderers.get("Color")
+    assert "colorsys" in sys.modules and renderers.get("Color") is renderer
+    assert renderer(0.0, 0.0, 1.0) == (2 / 3, 1.0, 1.0)
+
+
+def test_entry_points_are_discovered_once(monkeypatch):
+    calls = []
+
+    def fake_discover(group):
+        calls.append(group)
+        return {"GPAgent": f"{__name__}:line_hud"}
+
+    monkeypatch.setattr("bluesky_adaptive_ui.hud.discover_entry_points", fake_discover)
+    renderers = HudRenderers(default=None)
+    assert renderers.match(report(), "GPAgent-1") == "GPAgent"
+    assert renderers.match(report(), "PassiveKmeansAgent-1") == "PassiveKmeansAgent"
+    assert calls == ["bluesky_adaptive_ui.hud_renderers"]
+    assert '"line"' in figure_json(renderers.render(report(), "GPAgent-1"))
+
+
+class FakeRun(dict):
+    """Agent run whose ``report`` stream has ``n_reports`` entries, shaped like a Tiled node."""
+
+    def __init__(self, n_reports, agent_class="<class 'my_agents.gp.GPAgent'>"):
+        time = SimpleNamespace(shape=(n_reports,))
+        super().__init__(report={"data": {"time": time}})
+        self.metadata = {"start": {"agent_class": agent_class}}
+        self.data = list(range(n_reports))
+
+
+def test_figure_cache_evicts_least_recently_used_by_bytes():
+    cache = FigureCache(max_bytes=100)
+    cache.put("a", 1, "fig-a", 40)
+    cache.put("b", 1, "fig-b", 40)
+    assert cache.get("a", 1) == "fig-a"
+    cache.put("c", 1, "fig-c", 40)
+    assert cache.get("b", 1) is None and cache.get("a", 1) == "fig-a" and cache.nbytes == 80
+    cache.put("a", 2, "fig-a2", 10)
+    assert cache.get("a", 1) is None and cache.get("a", 2) == "fig-a2" and cache.nbytes == 50
+    cache.put("d", 1, "huge", 101)
+    assert cache.get("d", 1) is None and len(cache) == 2
+
+
+def test_hud_figure_rebuilt_only_for_new_reports():
+    builds = []
+
+    def counting_hud(report):
+        builds.append(len(report.data))
+        return line_hud(report)
+
+    dashboard = AgentDashboard(features=("hud",))
+    dashboard.hud_renderers = HudRenderers({"GPAgent": counting_hud}, entry_point_group=None)
+    runs = {"uid-1": FakeRun(3)}
+    dashboard.tiled_node = runs
+    first, _, _ = dashboard.hud_update("uid-1")
+    assert dashboard.hud_update("uid-1")[0] is first and builds == [3]
+    runs["uid-1"] = FakeRun(4)
+    assert dashboard.hud_update("uid-1")[0]["data"][0]["y"] == [0, 1, 2, 3] and builds == [3, 4]
+    assert report_marker({}) is None
+
+
+def test_workers_share_the_view_but_not_the_full_figure():
+    builds = []
+
+    def counting_hud(report):
+        builds.append(len(report.data))
+        return line_hud(report)
+
+    backend = InProcessCache()
+    workers = [AgentDashboard(features=("hud",)) for _ in range(2)]
+    for dashboard in workers:
+        dashboard.hud_renderers = HudRenderers({"GPAgent": counting_hud}, entry_point_group=None)
+        dashboard.tiled_node = {"uid-1": FakeRun(3)}
+        dashboard.set_cache_backend(backend)
+    first, shown, _ = workers[0].hud_update("uid-1")
+    assert workers[1].hud_update("uid-1")[0] == first and builds == [3]
+    assert set(backend.get("hud:uid-1:3")) == {"view", "points"}
+    zoomed = workers[1].zoom_hud({"xaxis.range[0]": 0, "xaxis.range[1]": 1}, {"uid": "uid-1", "reports": shown})
+    assert zoomed["layout"]["xaxis"]["range"] == [0, 1] and builds == [3, 3]
+
+
+class SlicedArray(list):
+    """List with a ``shape`` that records the slices read from it, like a Tiled array client."""
+
+    def __init__(self, values, reads):
+        super().__init__(values)
+        self.shape = (len(values),)
+        self.reads = reads
+
+    def __getitem__(self, index):
+        self.reads.append(index)
+        return list.__getitem__(self, index)
+
+
+class SeriesRun(dict):
+    def __init__(self, n_reports, reads):
+        columns = {"time": list(range(n_reports)), "score": [i * 10 for i in range(n_reports)]}
+        super().__init__(report={"data": {key: SlicedArray(values, reads) for key, values in columns.items()}})
+        self.metadata = {"start": {"agent_class": "SeriesAgent"}}
+
+
+def test_hud_update_sends_only_new_reports():
+    reads = []
+    dashboard = AgentDashboard(features=("hud",))
+    dashboard.hud_renderers = HudRenderers({"SeriesAgent": ReportSeries(["score"])}, entry_point_group=None)
+    dashboard.tiled_node = {"uid-1": SeriesRun(3, reads)}
+
+    figure, shown, points = dashboard.hud_update("uid-1")
+    assert (shown, points) == (3, 3) and figure["data"][0]["y"] == [0, 10, 20]
+    assert dashboard.hud_update("uid-1", 3, points=3) == (dash.no_update, 3, 3)
+
+    dashboard.tiled_node = {"uid-1": SeriesRun(5, reads)}
+    reads.clear()
+    patch, shown, points = dashboard.hud_update("uid-1", 3, points=3)
+    assert (shown, points) == (5, 5) and reads == [slice(3, 5), slice(3, 5)]
+    operations = patch.to_plotly_json()["operations"]
+    assert [(op["location"], op["params"]["value"]) for op in operations] == [
+        (["data", 0, "x"], [3, 4]),
+        (["data", 0, "y"], [30, 40]),
+    ]
+
+
+def test_hud_update_redraws_instead_of_appending_to_a_lightened_figure():
+    dashboard = AgentDashboard(features=("hud",))
+    dashboard.hud_renderers = HudRenderers({"SeriesAgent": ReportSeries(["score"])}, entry_point_group=None)
+    dashboard.hud_webgl_threshold = 4
+    dashboard.tiled_node = {"uid-1": SeriesRun(5, [])}
+    figure, shown, points = dashboard.hud_update("uid-1", 3, points=3)
+    assert figure["data"][0]["type"] == "scattergl" and (shown, points) == (5, None)
+    dashboard.tiled_node = {"uid-1": SeriesRun(6, [])}
+    assert not isinstance(dashboard.hud_update("uid-1", 5, points=points)[0], dash.Patch)
+
+
+def test_hud_update_falls_back_to_full_figure_without_hud_extend():
+    dashboard = AgentDashboard(features=("hud",))
+    dashboard.hud_renderers = HudRenderers({"GPAgent": line_hud}, entry_point_group=None)
+    dashboard.tiled_node = {"uid-1": FakeRun(4)}
+    figure, shown, _ = dashboard.hud_update("uid-1", 2, points=2)
+    assert shown == 4 and figure["data"][0]["y"] == [0, 1, 2, 3]
+
+
+def test_large_hud_is_decimated_and_zoom_refetches_full_resolution():
+    def big_hud(report):
+        n = 20_000
+        return {"data": [{"mode": "markers", "x": list(range(n)), "y": [i % 50 for i in range(n)]}]}
+
+    dashboard = AgentDashboard(features=("hud",))
+    dashboard.hud_renderers = HudRenderers({"GPAgent": big_hud}, entry_point_group=None)
+    dashboard.tiled_node = {"uid-1": FakeRun(3)}
+    view, shown, points = dashboard.hud_update("uid-1")
+    assert view["data"][0]["type"] == "scattergl" and len(view["data"][0]["x"]) < 7000 and points is None
+
+    shown = {"uid": "uid-1", "reports": shown}
+    zoomed = dashboard.zoom_hud({"xaxis.range[0]": 1000, "xaxis.range[1]": 1999}, shown)
+    assert zoomed["data"][0]["x"] == list(range(1000, 2000))
+    assert dashboard.zoom_hud({"xaxis.autorange": True}, shown) is view
+    assert dashboard.zoom_hud({"autosize": True}, shown) is dash.no_update
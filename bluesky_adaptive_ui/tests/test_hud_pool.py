@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+
+import dash
+import pytest
+
+from ..dashboard import AgentDashboard
+from ..hud import HudRenderers
+from ..hud_pool import HudProcessPool, HudSuperseded
+from .test_hud import FakeRun
+
+
+def load_run(uid):
+    """Runs named ``slow-<seconds>`` take that long to open."""
+    if uid.startswith("slow-"):
+        time.sleep(float(uid[len("slow-") :]))
+    return FakeRun(3)
+
+
+def pid_hud(report):
+    return {"data": [{"y": report.data}], "layout": {"title": {"text": str(os.getpid())}}}
+
+
+RENDERERS = {"GPAgent": f"{__name__}:pid_hud"}
+
+
+def test_hud_built_in_worker_process():
+    dashboard = AgentDashboard(features=("hud",))
+    dashboard.hud_renderers = HudRenderers(RENDERERS, entry_point_group=None)
+    dashboard.tiled_node = {"uid-1": FakeRun(3)}
+    pool = dashboard.enable_hud_pool(1, node_loader=load_run)
+    try:
+        view, shown, _ = dashboard.hud_update("uid-1")
+        assert shown == 3 and view["data"][0]["y"] == [0, 1, 2]
+        assert view["layout"]["title"]["text"] != str(os.getpid())
+        zoomed = dashboard.zoom_hud({"xaxis.range[0]": 1, "xaxis.range[1]": 2}, {"uid": "uid-1", "reports": 3})
+        assert zoomed["layout"]["xaxis"] == {"range": [1, 2], "autorange": False}
+        assert dashboard.zoom_hud({"xaxis.autorange": True}, {"uid": "gone", "reports": 3}) is dash.no_update
+    finally:
+        pool.close()
+
+
+def test_newer_request_for_same_agent_supersedes_waiting_one():
+    pool = HudProcessPool(
+        renderers=HudRenderers(RENDERERS, entry_point_group=None), workers=1, node_loader=load_run
+    )
+    results = {}
+
+    def build(name, key, uid):
+        try:
+            results[name] = pool.build(key, uid)
+        except HudSuperseded as err:
+            results[name] = err
+
+    try:
+        pool.build("warm", "uid-0")  # start the worker process
+        threads = {"running": threading.Thread(target=build, args=("running", "agent-a", "slow-1"))}
+        threads["running"].start()
+        while pool._running == 0:
+            time.sleep(0.01)
+        for name, key, uid in [("older", "agent-a", "uid-1"), ("other", "agent-b", "uid-1")]:
+            threads[name] = threading.Thread(target=build, args=(name, key, uid))
+            threads[name].start()
+        time.sleep(0.2)
+        build("newer", "agent-a", "uid-2")
+        for thread in threads.values():
+            thread.join(10)
+    finally:
+        pool.close()
+    assert isinstance(results["older"], HudSuperseded)
+    for name in ("running", "other", "newer"):
+        assert '"y": [0, 1, 2]' in results[name]["view"], name
+
+
+def test_pool_needs_a_source_of_runs():
+    with pytest.raises(ValueError):
+        HudProcessPool()
@@ -0,0 +1,92 @@
+import json
+import time
+
+import flask
+
+from ..async_client import AsyncAgentClient, run_sync
+from ..client import AgentClient
+from ..dashboard import create_app
+from ..push import STREAM_ROUTE, register_switchboard_stream, switchboard_events
+from ..serve import stream_limit
+from ..switchboard import SwitchboardPoller, fetch_switchboard_state
+from .fake_agent import FakeAgent
+
+
+def _data(message):
+    if isinstance(message, bytes):
+        message = message.decode()
+    assert message.startswith("data: ")
+    return json.loads(message[len("data: ") :])
+
+
+def test_changes_are_pushed_promptly():
+    with FakeAgent() as agent, AgentClient(agent.address, agent.port, read_ttl=0) as client:
+        aclient = AsyncAgentClient(client)
+        poller = SwitchboardPoller(lambda: run_sync(fetch_switchboard_state(aclient)), interval=0.05).start()
+        try:
+            events = switchboard_events(poller, keepalive=1.0)
+            assert _data(next(events))["variables"]["ask_on_tell"] is True
+
+            start = time.perf_counter()
+            with agent.lock:
+                agent.variables["ask_on_tell"] = False
+            assert _data(next(events))["variables"]["ask_on_tell"] is False
+            assert time.perf_counter() - start < 0.3
+        finally:
+            poller.stop()
+
+
+def test_stream_route_and_rendering():
+    with FakeAgent() as agent:
+        app = create_app(agent.url)
+        assert app.server.test_client().get(STREAM_ROUTE).status_code == 204
+
+        app.dashboard.enable_polling(0.05)
+        try:
+            response = app.server.test_client().get(STREAM_ROUTE, buffered=False)
+            assert response.status_code == 200
+            data = _data(next(response.response))
+            response.close()
+        finally:
+            app.dashboard.switchboard.stop()
+    outputs = app.dashboard.render_pushed_switchboard(data)
+    assert outputs[1] == "green" and outputs[6] == "Agent Switchboard: FakeAgent"
+
+
+def test_streams_end_when_the_poller_stops():
+    with FakeAgent() as agent:
+        app = create_app(agent.url)
+        app.dashboard.enable_polling(0.05)
+        first = app.dashboard.poller
+        app.dashboard.enable_polling(0.05)
+        assert first.stopping and not app.dashboard.poller.stopping
+
+        events = switchboard_events(app.dashboard.poller, keepalive=0.01)
+        next(events)
+        app.dashboard.poller.stop()
+        start = time.perf_counter()
+        assert list(events) == []
+        assert time.perf_counter() - start < 0.5
+
+
+def test_streams_beyond_the_limit_fall_back_to_snapshots():
+    with FakeAgent() as agent:
+        server = flask.Flask(__name__)
+        client = AgentClient(agent.address, agent.port, read_ttl=0)
+        aclient = AsyncAgentClient(client)
+        poller = SwitchboardPoller(lambda: run_sync(fetch_switchboard_state(aclient)), interval=0.05).start()
+        register_switchboard_stream(server, lambda: poller, keepalive=0.05, max_streams=1)
+        try:
+            first = server.test_client().get(STREAM_ROUTE, buffered=False)
+            assert first.status_code == 200
+            assert server.test_client().get(STREAM_ROUTE).status_code == 503
+            snapshot = server.test_client().get(STREAM_ROUTE + "?snapshot=1")
+            assert snapshot.json["variables"]["ask_on_tell"] is True
+            first.close()
+            second = server.test_client().get(STREAM_ROUTE, buffered=False)
+            assert second.status_code == 200
+            second.close()
+        finally:
+            poller.stop()
+            client.close()
+    assert stream_limit(32) == 24 and stream_limit(8) == 4 and stream_limit(1) == 0
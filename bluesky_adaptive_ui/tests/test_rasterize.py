@@ -0,0 +1,91 @@
+import base64
+import random
+import struct
+import zlib
+
+import pytest
+
+from .. import rasterize
+from ..decimate import decimate_figure
+from ..rasterize import rasterize_trace
+
+
+def clusters(n, seed=0):
+    rng = random.Random(seed)
+    labels = [i % 3 for i in range(n)]
+    x = [label * 10 + rng.gauss(0, 1) for label in labels]
+    y = [rng.gauss(0, 1) for _ in labels]
+    return {"type": "scatter", "mode": "markers", "x": x, "y": y, "marker": {"color": labels}, "name": "kmeans"}
+
+
+def decode_png(uri):
+    png = base64.b64decode(uri.split(",", 1)[1])
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+    width, height = struct.unpack(">II", png[16:24])
+    raw = zlib.decompress(png[png.index(b"IDAT") + 4 : png.index(b"IEND") - 8])
+    stride = width * 4 + 1
+    return width, height, [raw[row * stride + 1 : (row + 1) * stride] for row in range(height)]
+
+
+def test_rasterized_payload_does_not_grow_with_points():
+    _, small = rasterize_trace(clusters(1_000), shape=(60, 40))
+    _, large = rasterize_trace(clusters(100_000), shape=(60, 40))
+    assert decode_png(large["source"])[:2] == (60, 40)
+    # Bounded by the base64 of an uncompressed 60x40 RGBA image, however many points there are.
+    bound = (60 * 40 * 4 + 40) * 4 / 3 + 200
+    assert len(small["source"]) < bound and len(large["source"]) < bound
+
+
+def test_clusters_get_their_own_colors():
+    placeholder, image = rasterize_trace(clusters(30_000), shape=(30, 10))
+    _, _, rows = decode_png(image["source"])
+    middle = rows[5]
+    left, right = middle[2 * 4 : 2 * 4 + 4], middle[27 * 4 : 27 * 4 + 4]
+    assert left[3] > 0 and right[3] > 0 and left[:3] != right[:3]
+    assert placeholder["marker"]["opacity"] == 0 and placeholder["meta"] == {"rasterized": 30_000}
+    assert image["xref"] == "x" and image["sizex"] == placeholder["x"][1] - placeholder["x"][0]
+
+
+def test_figure_rasterizes_above_threshold_and_zoom_rerasterizes():
+    figure = {"data": [clusters(20_000), {"mode": "lines", "x": [0, 1], "y": [0, 1]}], "layout": {}}
+    overview = decimate_figure(figure, raster_threshold=10_000)
+    assert len(overview["layout"]["images"]) == 1 and overview["data"][1] is figure["data"][1]
+
+    zoomed = decimate_figure(figure, x_range=(-3, 3), raster_threshold=5_000)
+    assert zoomed["layout"]["images"][0]["x"] == -3 and zoomed["layout"]["xaxis"]["range"] == [-3, 3]
+
+    detail = decimate_figure(figure, x_range=(-3, 3), y_range=(0, 0.1), raster_threshold=5_000)
+    assert "images" not in detail["layout"] and len(detail["data"][0]["x"]) < 5_000
+
+
+def test_numpy_and_pure_python_rasters_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    trace = clusters(20_000)
+    fast = rasterize_trace(trace, x_range=(-3, 25), shape=(60, 40))
+    monkeypatch.setattr(rasterize, "HAVE_NUMPY", False)
+    assert rasterize_trace(trace, x_range=(-3, 25), shape=(60, 40)) == fast
+
+
+def test_numeric_colors_are_binned_through_the_colorscale():
+    trace = {
+        "x": [0, 1, 2, 3],
+        "y": [0, 0, 0, 0],
+        "marker": {"color": [0.0, 1.0, 2.5, 100.0], "cmin": 0, "cmax": 10},
+    }
+    trace["marker"]["colorscale"] = [[0, "rgb(0, 0, 0)"], [1, "#ffffff"]]
+    codes, colors = rasterize._categories(trace, 4)
+    assert list(codes) == [0, 1, 2, rasterize.MAX_CATEGORIES - 1]
+    assert len(colors) == rasterize.MAX_CATEGORIES and colors[0] == (13, 13, 13) and colors[-1] == (242, 242, 242)
+    _, viridis = rasterize._categories({"marker": {"color": [0, 1], "colorscale": "Viridis"}}, 2)
+    assert viridis[0] != viridis[-1]
+
+
+def test_many_categories_fall_back_to_one_color():
+    few = [f"#{i:06x}" for i in range(rasterize.MAX_CATEGORIES)]
+    many = [f"#{i:06x}" for i in range(10_000)]
+    codes, colors = rasterize._categories({"marker": {"color": few}}, len(few))
+    assert len(colors) == rasterize.MAX_CATEGORIES
+    assert rasterize._categories({"marker": {"color": many}}, len(many)) == (
+        None,
+        [rasterize._rgb(rasterize.PALETTE[0])],
+    )
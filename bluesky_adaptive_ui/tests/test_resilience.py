@@ -0,0 +1,60 @@
+import time
+
+import pytest
+import requests
+
+from ..async_client import AsyncAgentClient, run_sync
+from ..client import AgentClient, CircuitBreaker, CircuitOpenError
+from ..switchboard import SwitchboardCache, fetch_switchboard_state
+from .fake_agent import FakeAgent
+
+
+def test_per_endpoint_timeouts():
+    with FakeAgent(delay=0.3) as agent:
+        client = AgentClient(agent.address, agent.port, timeout=0.05, timeouts={"Agent Name": 2.0})
+        with pytest.raises(requests.Timeout):
+            client.get_variable("ask_on_tell")
+        assert client.get_variable("Agent Name").status_code == 200
+
+
+def test_circuit_breaker_fails_fast_and_recovers():
+    with FakeAgent(delay=0.3) as agent:
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+        client = AgentClient(agent.address, agent.port, timeout=0.05, breaker=breaker)
+        for _ in range(2):
+            with pytest.raises(requests.Timeout):
+                client.get_variable("ask_on_tell")
+        assert breaker.state == CircuitBreaker.OPEN
+
+        start = time.perf_counter()
+        with pytest.raises(CircuitOpenError):
+            client.get_variable("ask_on_tell")
+        assert time.perf_counter() - start < 0.05
+
+        agent.delay = 0
+        time.sleep(0.2)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert client.get_variable("ask_on_tell").status_code == 200
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stale_while_revalidate_against_stalled_agent():
+    with FakeAgent() as agent:
+        client = AgentClient(agent.address, agent.port, timeout=0.1, read_ttl=0)
+        aclient = AsyncAgentClient(client)
+        cache = SwitchboardCache(lambda: run_sync(fetch_switchboard_state(aclient)), max_age=0.05)
+        assert not cache.get().stale
+
+        agent.delay = 1.0
+        time.sleep(0.05)
+        start = time.perf_counter()
+        state = cache.get()
+        assert time.perf_counter() - start < 0.05
+        assert state.stale and state.header == "Agent Switchboard: FakeAgent (stale)"
+        assert state.bool_indicator("ask_on_tell") == ("stale", "green")
+
+        # The background refresh times out; the last known state is still served.
+        time.sleep(0.3)
+        cache.invalidate()
+        state = cache.get()
+        assert state.stale and state.variables["ask_on_tell"] is True
@@ -0,0 +1,156 @@
+import operator
+from datetime import datetime, timezone
+
+import pytest
+
+from ..dashboard import create_app
+from ..runs import iter_pages, parse_metadata, parse_time, query_key, run_conditions, search_runs, tell_query
+from .fake_agent import FakeAgent
+
+COMPARE = {"eq": operator.eq, "ge": operator.ge, "le": operator.le}
+
+
+class _Runs:
+    """Stands in for a Tiled catalog of runs, searched with condition tuples; counts the keys it hands out."""
+
+    def __init__(self, runs):
+        self.runs = runs
+        self.keys_read = 0
+
+    def search(self, condition):
+        op, key, value = condition
+        field = key.split(".", 1)[1]
+        return _Runs(
+            {uid: start for uid, start in self.runs.items() if field in start and COMPARE[op](start[field], value)}
+        )
+
+    def __len__(self):
+        return len(self.runs)
+
+    def keys(self):
+        return _Keys(self)
+
+
+class _Keys:
+    """Stands in for Tiled's keys view, which fetches a slice of the keys with one request."""
+
+    def __init__(self, runs):
+        self.runs = runs
+
+    def __getitem__(self, index):
+        page = list(self.runs.runs)[index]
+        self.runs.keys_read += len(page)
+        return page
+
+
+def _campaign(n):
+    return _Runs(
+        {f"uid{i}": {"scan_id": i, "plan_name": "count" if i % 2 else "scan", "sample": "LaB6"} for i in range(n)}
+    )
+
+
+def test_conditions_from_the_query_panel():
+    since = parse_time("2024-05-01T08:00:00+00:00")
+    assert since == datetime(2024, 5, 1, 8, tzinfo=timezone.utc).timestamp()
+    assert parse_time(" ") is None
+    metadata = parse_metadata("sample = LaB6\ntemperature=300\n\nstop.exit_status=success")
+    assert metadata == {"sample": "LaB6", "temperature": 300, "stop.exit_status": "success"}
+    with pytest.raises(ValueError):
+        parse_metadata("no equals sign")
+    assert run_conditions(since, None, "count", 10, None, metadata) == [
+        ("ge", "start.time", since),
+        ("eq", "start.plan_name", "count"),
+        ("ge", "start.scan_id", 10),
+        ("eq", "start.sample", "LaB6"),
+        ("eq", "start.temperature", 300),
+        ("eq", "stop.exit_status", "success"),
+    ]
+    assert query_key(run_conditions(plan_name="count")) != query_key(run_conditions(plan_name="scan"))
+
+
+def test_search_is_read_a_page_at_a_time():
+    results = search_runs(_campaign(100), run_conditions(plan_name="count", scan_id_min=10), query=tuple)
+    assert len(results) == 45
+    pages = iter_pages(results, 10)
+    assert next(pages) == [f"uid{i}" for i in range(11, 31, 2)]
+    assert results.keys_read == 10
+    results.keys_read = 0
+    assert [len(page) for page in iter_pages(results, 10, offset=40)] == [5]
+    assert results.keys_read == 5
+    assert list(iter_pages(results, 10, offset=3, stop=6)) == [["uid17", "uid19", "uid21"]]
+
+
+def test_telling_a_query_resumes_from_the_last_page():
+    class Client:
+        pool_size = 4
+        told = []
+
+        def call_method(self, name, args=None, kwargs=None, *, timeout=None):
+            self.told.extend(args[0])
+            return type("Response", (), {"status_code": 200, "text": ""})()
+
+    results = _campaign(25)
+    state = {"key": "campaign"}
+    pages = tell_query(Client(), results, state, chunk_size=4, page_size=10)
+    next(pages)
+    pages.close()
+    assert state == {"key": "campaign", "offset": 10, "told": 10, "retry": [], "failed": 0}
+    list(tell_query(Client(), results, state, chunk_size=4, page_size=10))
+    assert sorted(Client.told) == sorted(results.runs) and state["told"] == 25
+
+
+def test_failed_runs_are_retried_on_resume():
+    class Client:
+        pool_size = 4
+        rejected = {"uid4", "uid9"}
+        told = []
+
+        def call_method(self, name, args=None, kwargs=None, *, timeout=None):
+            if self.rejected.isdisjoint(args[0]):
+                self.told.extend(args[0])
+                return type("Response", (), {"status_code": 200, "text": ""})()
+            return type("Response", (), {"status_code": 503, "text": ""})()
+
+    results = _campaign(12)
+    state = {"key": "campaign"}
+    list(tell_query(Client(), results, state, chunk_size=4, page_size=8))
+    assert (state["offset"], state["told"], state["failed"]) == (12, 4, 8)
+    assert state["retry"] == [[4, 12]]
+    Client.rejected = set()
+    list(tell_query(Client(), results, state, chunk_size=4, page_size=8))
+    assert sorted(Client.told) == sorted(results.runs)
+    assert (state["told"], state["failed"], state["retry"]) == (12, 0, [])
+
+
+def test_telling_stops_once_a_whole_page_fails():
+    class Client:
+        pool_size = 4
+        down = True
+        calls = 0
+
+        def call_method(self, name, args=None, kwargs=None, *, timeout=None):
+            Client.calls += 1
+            return type("Response", (), {"status_code": 503 if self.down else 200, "text": ""})()
+
+    results = _campaign(40)
+    state = {"key": "campaign"}
+    list(tell_query(Client(), results, state, chunk_size=4, page_size=8))
+    assert (Client.calls, state["offset"], state["retry"], state["failed"]) == (2, 8, [[0, 8]], 8)
+    list(tell_query(Client(), results, state, chunk_size=4, page_size=8))
+    assert (Client.calls, state["offset"], state["retry"]) == (4, 8, [[0, 8]])
+    Client.down = False
+    list(tell_query(Client(), results, state, chunk_size=4, page_size=8))
+    assert (state["offset"], state["told"], state["retry"], state["failed"]) == (40, 40, [], 0)
+
+
+def test_dashboard_tells_the_agent_about_matching_runs():
+    with FakeAgent() as agent:
+        app = create_app(agent.url, features=["uids"], background_callback_manager=None)
+        app.dashboard.tiled_node = _campaign(30)
+        count = app.dashboard.count_runs(1, None, None, None, None, None, None)
+        summary, value, maximum, state = app.dashboard.tell_query_runs(1, *[None] * 6, 10, 2, None)
+        failed = app.dashboard.count_runs(1, "not a time", None, None, None, None, None)
+    assert str(count.children).startswith("30 runs match, e.g. uid0, uid1, uid2")
+    assert (value, maximum, state["told"]) == (30, 30, 30) and len(agent.calls) == 3
+    assert "30 of 30 matching runs told" in str(summary)
+    assert "Could not search the catalog" in str(failed.children)
@@ -0,0 +1,21 @@
+from ..serve import build_parser, load_app
+from .fake_agent import FakeAgent
+
+
+def test_server_options_and_app_options_are_separated():
+    args, app_argv = build_parser().parse_known_args(
+        ["default", "--workers", "4", "--preload", "--agent-port", "1234", "--poll-interval", "2"]
+    )
+    assert (args.app, args.server, args.workers, args.preload) == ("default", "gunicorn", 4, True)
+    assert app_argv == ["--agent-port", "1234", "--poll-interval", "2"]
+
+
+def test_load_app_configures_without_starting_services():
+    with FakeAgent() as agent:
+        module, args = load_app("default", ["--agent-address", agent.address, "--agent-port", str(agent.port)])
+        assert module.dashboard.agent_client.base_url == agent.url
+        assert args.poll_interval is None and module.dashboard.document_consumer is None
+
+        client = module.server.test_client()
+        assert client.get("/api/agent-client/stats").status_code == 200
+        assert client.get("/").status_code == 200
@@ -0,0 +1,52 @@
+"""Cold-start budget: importing an app must not pull in the HUD's heavy dependencies.
+
+Measured with ``python -X importtime`` in a fresh interpreter. The budget is the time spent on top of importing
+Dash itself, which every app needs; set ``BLUESKY_ADAPTIVE_UI_IMPORT_BUDGET`` (seconds) to tune it for slow CI.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ..warmup import Warmup
+
+IMPORT_BUDGET = float(os.getenv("BLUESKY_ADAPTIVE_UI_IMPORT_BUDGET", "0.5"))
+HEAVY_MODULES = ("tiled", "pdf_agents", "sklearn", "scipy", "pandas")
+
+
+def import_times(module):
+    """``{module name: cumulative seconds}`` from importing ``module`` in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+@pytest.mark.parametrize("app", ["default_dash_app", "clustering_hud_app"])
+def test_app_import_stays_within_budget(app):
+    module = f"bluesky_adaptive_ui.{app}.app"
+    times = import_times(module)
+    heavy = sorted(name for name in times if name.split(".")[0] in HEAVY_MODULES)
+    assert not heavy, f"{module} imports {heavy} at startup"
+    overhead = times[module] - times["dash"]
+    assert overhead < IMPORT_BUDGET, f"{module} takes {overhead:.3f} s to import on top of Dash"
+
+
+def test_warmup_records_failures_without_raising():
+    calls = []
+    warmup = Warmup(["json", "no_such_module_anywhere"], tasks=[lambda: calls.append(1)]).start()
+    assert warmup.wait(10)
+    assert isinstance(warmup.results["json"], float)
+    assert isinstance(warmup.results["no_such_module_anywhere"], ModuleNotFoundError)
+    assert calls == [1] and warmup.done
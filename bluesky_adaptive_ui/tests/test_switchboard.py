@@ -0,0 +1,74 @@
+import time
+
+from ..async_client import AsyncAgentClient, run_sync
+from ..client import AgentClient
+from ..dashboard import AgentDashboard
+from ..switchboard import DEFAULT_HEADER, SWITCHBOARD_VARIABLES, SwitchboardPoller, fetch_switchboard_state
+from .fake_agent import FakeAgent
+
+DELAY = 0.2
+
+
+def test_snapshot_is_one_round_trip():
+    with FakeAgent(delay=DELAY) as agent, AgentClient(agent.address, agent.port) as client:
+        start = time.perf_counter()
+        state = run_sync(fetch_switchboard_state(AsyncAgentClient(client)))
+        elapsed = time.perf_counter() - start
+    assert elapsed < 2 * DELAY
+    assert state.bool_indicator("ask_on_tell") == ("", "green")
+    assert state.bool_indicator("report_on_tell") == ("", "grey")
+    assert state.queue_indicator() == ("", "grey")
+    assert state.header == "Agent Switchboard: FakeAgent"
+    assert "generate_report" in state.names
+
+
+def test_snapshot_reports_unreadable_variables():
+    with FakeAgent(variables={"ask_on_tell": "on"}) as agent, AgentClient(agent.address, agent.port) as client:
+        state = run_sync(fetch_switchboard_state(AsyncAgentClient(client)))
+    assert state.bool_indicator("ask_on_tell") == ("", "green")
+    assert state.bool_indicator("report_on_tell") == (client.variable_url("report_on_tell"), "black")
+    assert state.header == DEFAULT_HEADER
+
+
+def test_page_load_callback_is_one_round_trip():
+    with FakeAgent(delay=DELAY) as agent:
+        dashboard = AgentDashboard(AgentClient(agent.address, agent.port))
+        start = time.perf_counter()
+        outputs = dashboard.refresh_switchboard(1)
+        elapsed = time.perf_counter() - start
+    assert elapsed < 2 * DELAY
+    assert outputs[1] == "green" and outputs[6] == "Agent Switchboard: FakeAgent"
+
+
+def test_poller_load_is_independent_of_readers():
+    with FakeAgent() as agent, AgentClient(agent.address, agent.port, timeout=0.1, read_ttl=0) as client:
+        aclient = AsyncAgentClient(client)
+        poller = SwitchboardPoller(lambda: run_sync(fetch_switchboard_state(aclient)), interval=0.05).start()
+        try:
+            states = [poller.get() for _ in range(1000)]
+            assert states[-1].header == "Agent Switchboard: FakeAgent"
+            assert len(agent.requests) <= 2 * (len(SWITCHBOARD_VARIABLES) + 1)
+
+            agent.variables["ask_on_tell"] = False
+            poller.invalidate()
+            time.sleep(0.03)
+            assert poller.snapshot.bool_indicator("ask_on_tell") == ("", "grey")
+
+            agent.delay = 0.5
+            poller.refresh()
+            assert poller.snapshot.stale and poller.snapshot.variables["ask_on_tell"] is False
+        finally:
+            poller.stop()
+
+
+def test_toggles_read_the_agent_not_the_polled_snapshot():
+    with FakeAgent() as agent:
+        dashboard = AgentDashboard(AgentClient(agent.address, agent.port))
+        dashboard.enable_polling(5)
+        try:
+            first = dashboard.toggle_ask_on_tell(1)
+            second = dashboard.toggle_ask_on_tell(2)
+        finally:
+            dashboard.poller.stop()
+    assert (first, second) == (("", "gray"), ("", "green"))
+    assert agent.variables["ask_on_tell"] is True
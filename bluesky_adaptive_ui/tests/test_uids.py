@@ -0,0 +1,114 @@
+import logging
+
+from ..dashboard import create_app
+from ..uids import LOGGED_CHUNKS, TellState, check_uids, chunked, parse_uids, tell_in_chunks
+from .fake_agent import FakeAgent
+
+
+class _FlakyClient:
+    """Stands in for an AgentClient, failing every chunk that contains one of ``bad``."""
+
+    pool_size = 10
+
+    def __init__(self, bad=()):
+        self.bad = set(bad)
+        self.told = []
+
+    def call_method(self, name, args=None, kwargs=None, *, timeout=None):
+        (uids,) = args
+        self.told.append(list(uids))
+        status = 500 if self.bad.intersection(uids) else 200
+        return type("Response", (), {"status_code": status, "text": "agent error"})()
+
+
+def test_parse_and_chunk():
+    assert parse_uids("a, b\n\nc,\n d ") == ["a", "b", "c", "d"]
+    assert chunked(list("abcde"), 2) == [["a", "b"], ["c", "d"], ["e"]]
+
+
+def test_failed_chunks_are_retried_on_resume():
+    uids = [f"uid{i}" for i in range(10)]
+    client = _FlakyClient(bad={"uid5"})
+    state = TellState.for_uids(uids, 3)
+    results = list(tell_in_chunks(client, uids, 3, 2, state=state))
+    assert [result.index for result in results if not result.ok] == [1]
+    assert state["done"] == [0, 2, 3] and not state.complete
+
+    client.bad.clear()
+    client.told.clear()
+    resumed = TellState.for_uids(uids, 3, previous=dict(state))
+    list(tell_in_chunks(client, uids, 3, 2, state=resumed))
+    assert client.told == [["uid3", "uid4", "uid5"]] and resumed.complete
+    assert TellState.for_uids(uids, 4, previous=dict(resumed))["done"] == []
+
+
+def test_chunk_logging_is_sampled(caplog):
+    uids = [f"uid{i}" for i in range(1000)]
+    with caplog.at_level(logging.INFO, logger="bluesky_adaptive_ui.uids"):
+        list(tell_in_chunks(_FlakyClient(bad={"uid500"}), uids, 10, 4))
+    infos = [record for record in caplog.records if record.levelno == logging.INFO]
+    (warning,) = [record for record in caplog.records if record.levelno == logging.WARNING]
+    assert len(infos) <= LOGGED_CHUNKS + 1
+    assert warning.event == "tell_chunk" and warning.chunk == 50 and warning.status_code == 500
+    assert warning.uid_sample == ["uid500", "uid501", "uid502"] and "uid509" not in warning.getMessage()
+
+
+def test_dashboard_tells_in_chunks():
+    with FakeAgent() as agent:
+        app = create_app(agent.url, features=["uids"], background_callback_manager=None)
+        summary, value, maximum, state = app.dashboard.submit_uids(1, "a\nb\nc\nd\ne", 2, 2)
+    assert (value, maximum) == (3, 3) and state["done"] == [0, 1, 2]
+    assert sorted(uid for _, ((uids,), _) in agent.calls for uid in uids) == ["a", "b", "c", "d", "e"]
+    assert "3 of 3 requests" in str(summary)
+
+
+class _Catalog:
+    """Stands in for a Tiled catalog of runs keyed by uid, recording its searches."""
+
+    def __init__(self, uids):
+        self.uids = set(uids)
+        self.searches = []
+
+    def search(self, chunk):
+        self.searches.append(chunk)
+        return {uid: None for uid in chunk if uid in self.uids}
+
+
+def test_check_uids_searches_once_per_chunk():
+    catalog = _Catalog(f"uid{i}" for i in range(10))
+    pasted = ["uid1", "uid2", "typo", "uid1", "uid3", "uid12", "uid2"]
+    check = check_uids(pasted, catalog, chunk_size=2, query=list)
+    assert check.uids == ["uid1", "uid2", "typo", "uid3", "uid12"]
+    assert check.duplicates == ["uid1", "uid2"] and check.missing == ["typo", "uid12"]
+    assert len(catalog.searches) == 3
+    assert check.describe() == "5 unique uids, 2 duplicates, 2 not in the catalog: typo, uid12"
+    assert not check_uids(pasted).searched
+
+
+def test_checked_uids_are_left_out_when_telling():
+    with FakeAgent() as agent:
+        app = create_app(agent.url, features=["uids"], background_callback_manager=None)
+        uids = ["a", "b", "a", "typo"]
+        check = check_uids(uids, _Catalog("ab"), query=list)
+        summary, *_ = app.dashboard.submit_uids(
+            1, "\n".join(uids), 10, 1, None, {"key": check.key, "missing": ["typo"]}
+        )
+    assert agent.calls == [("tell_agent_by_uid", [[["a", "b"]], {}])]
+    assert "1 repeated uids and 1 not found" in str(summary)
+
+
+def test_unchecked_uids_are_checked_against_the_catalog():
+    class Unreachable:
+        def search(self, query):
+            raise ConnectionError("catalog unreachable")
+
+    with FakeAgent() as agent:
+        app = create_app(agent.url, features=["uids"], background_callback_manager=None)
+        app.dashboard.tiled_node = catalog = _Catalog("ab")
+        check = check_uids(["a", "typo"], catalog, query=list)
+        app.dashboard.submit_uids(1, "a\ntypo", 10, 1, None, {"key": check.key, "missing": check.missing})
+        assert catalog.searches == [["a", "typo"]]
+        app.dashboard.tiled_node = Unreachable()
+        summary, *_ = app.dashboard.submit_uids(1, "a\nb", 10, 1)
+    assert "Could not search the catalog, all uids were sent" in str(summary)
+    assert agent.calls[-1] == ("tell_agent_by_uid", [[["a", "b"]], {}])
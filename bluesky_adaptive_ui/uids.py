@@ -0,0 +1,247 @@
+"""Telling an agent about many runs: ``tell_agent_by_uid`` in chunks, in parallel, resumably.
+
+A single ``tell_agent_by_uid`` POST with thousands of uids times out or keeps the agent busy for minutes.
+:func:`tell_in_chunks` splits the list into chunks of ``chunk_size`` uids, sends up to ``max_concurrency``
+chunks at a time (see :func:`~bluesky_adaptive_ui.batch.iter_batch`) and yields a :class:`ChunkResult` per chunk
+as it completes, so a failed chunk is reported and retried on its own.
+
+:class:`TellState` records which chunks of a list were told. It is a plain dict, kept in the browser between
+attempts: telling the same list with the same chunk size again skips the chunks already told.
+
+Each chunk is logged as one ``tell_chunk`` record, with the chunk's position, size, outcome and latency as
+``extra`` fields and a sample of its uids rather than all of them. Failures are always logged; of the chunks
+that succeed only about :data:`LOGGED_CHUNKS` per submission are, at INFO.
+
+Pasted lists often hold duplicates, typos and runs not yet in the catalog, each of which the agent would fail
+on. :func:`check_uids` drops repeats and looks the rest up in the Tiled catalog, one search per chunk of uids
+rather than one lookup per uid.
+"""
+
+import bisect
+import hashlib
+import logging
+from dataclasses import dataclass
+
+from .batch import iter_batch
+
+logger = logging.getLogger(__name__)
+
+TELL_METHOD = "tell_agent_by_uid"
+DEFAULT_CHUNK_SIZE = 100
+DEFAULT_TELL_CONCURRENCY = 2
+LOGGED_CHUNKS = 10
+UID_SAMPLE = 3
+
+
+def parse_uids(text):
+    """Uids from text with one per line or separated by commas, in order, blanks dropped."""
+    return [item.strip() for line in (text or "").split("\n") for item in line.split(",") if item.strip()]
+
+
+def chunked(items, size):
+    """Consecutive lists of at most ``size`` items."""
+    size = max(1, int(size))
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def list_key(uids, *extra):
+    """Digest identifying the list ``uids`` (and ``extra`` values), for matching state to the list it is of."""
+    digest = hashlib.sha1("\n".join(uids).encode())
+    for value in extra:
+        digest.update(f"/{value}".encode())
+    return digest.hexdigest()
+
+
+def dedupe(uids):
+    """``(unique, duplicates)``: ``uids`` in order without repeats, and every uid that was repeated, once."""
+    seen, duplicates = set(), {}
+    unique = []
+    for uid in uids:
+        if uid in seen:
+            duplicates[uid] = None
+        else:
+            seen.add(uid)
+            unique.append(uid)
+    return unique, list(duplicates)
+
+
+def sample_uids(uids, k=UID_SAMPLE):
+    """Short text naming the first ``k`` of ``uids`` and how many more there are."""
+    text = ", ".join(uids[:k])
+    return f"{text} (+{len(uids) - k} more)" if len(uids) > k else text
+
+
+class TellState(dict):
+    """Which chunks of a uid list have been told, as a JSON-serializable dict.
+
+    ``key`` identifies the list and chunk size, ``done`` holds the indices of the chunks the agent accepted and
+    ``total`` the number of chunks.
+    """
+
+    @staticmethod
+    def key_for(uids, chunk_size):
+        return list_key(uids, chunk_size)
+
+    @classmethod
+    def for_uids(cls, uids, chunk_size, previous=None):
+        """State of telling ``uids`` in chunks of ``chunk_size``, resuming ``previous`` if it is of the same."""
+        key = cls.key_for(uids, chunk_size)
+        done = previous.get("done", []) if previous and previous.get("key") == key else []
+        return cls(key=key, done=sorted(done), total=len(chunked(uids, chunk_size)))
+
+    @property
+    def complete(self):
+        return len(self["done"]) == self["total"]
+
+    def mark_done(self, index):
+        position = bisect.bisect_left(self["done"], index)
+        if self["done"][position : position + 1] != [index]:
+            self["done"].insert(position, index)
+
+
+@dataclass(frozen=True)
+class ChunkResult:
+    """Outcome of telling the agent about one chunk of uids.
+
+    Attributes
+    ----------
+    index : int
+        Position of the chunk in the list.
+    uids : list of str
+    ok : bool
+    status_code : int or None
+    latency : float
+        Seconds the request took.
+    error : str
+    """
+
+    index: int
+    uids: list
+    ok: bool
+    status_code: int = None
+    latency: float = 0.0
+    error: str = ""
+
+    def describe(self):
+        """One line for the failure list shown to operators."""
+        outcome = "ok" if self.ok else (self.error or f"HTTP {self.status_code}")
+        return f"chunk {self.index + 1}: {len(self.uids)} uids ({sample_uids(self.uids)}): {outcome}"
+
+
+def _log_chunk(result, total, log_every):
+    extra = {
+        "event": "tell_chunk",
+        "chunk": result.index,
+        "chunks": total,
+        "size": len(result.uids),
+        "ok": result.ok,
+        "status_code": result.status_code,
+        "latency_ms": round(result.latency * 1e3, 1),
+        "uid_sample": result.uids[:UID_SAMPLE],
+    }
+    if not result.ok:
+        logger.warning("%s failed: %s", result.describe(), result.error or result.status_code, extra=extra)
+    elif result.index % log_every == 0 or result.index == total - 1:
+        logger.info("%s told in %.0f ms", result.describe(), result.latency * 1e3, extra=extra)
+    else:
+        logger.debug("%s told in %.0f ms", result.describe(), result.latency * 1e3, extra=extra)
+
+
+def tell_in_chunks(
+    client,
+    uids,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    max_concurrency=DEFAULT_TELL_CONCURRENCY,
+    *,
+    state=None,
+    timeout=None,
+):
+    """Tell the agent about ``uids``, ``chunk_size`` at a time with up to ``max_concurrency`` chunks in flight.
+
+    Chunks listed as done in ``state``, a :class:`TellState` for the same list and chunk size, are skipped; the
+    others are marked done in it as they succeed. Yields a :class:`ChunkResult` per chunk sent, in order of
+    completion.
+    """
+    chunks = chunked(uids, chunk_size)
+    state = TellState.for_uids(uids, chunk_size) if state is None else state
+    done = set(state["done"])
+    pending = [index for index in range(len(chunks)) if index not in done]
+    log_every = max(1, len(chunks) // LOGGED_CHUNKS)
+    calls = [([chunks[index]], {}) for index in pending]
+    for batch_result in iter_batch(client, TELL_METHOD, calls, max_concurrency, timeout=timeout):
+        index = pending[batch_result.index]
+        result = ChunkResult(
+            index,
+            chunks[index],
+            batch_result.ok,
+            batch_result.status_code,
+            batch_result.latency,
+            batch_result.error,
+        )
+        if result.ok:
+            state.mark_done(index)
+        _log_chunk(result, len(chunks), log_every)
+        yield result
+
+
+def uid_query(uids):
+    """Tiled query matching the runs whose start document has one of ``uids``."""
+    from tiled.queries import In
+
+    return In("start.uid", list(uids))
+
+
+def find_existing(node, uids, chunk_size=DEFAULT_CHUNK_SIZE, query=uid_query):
+    """Those of ``uids`` that are runs in the Tiled catalog ``node``, found with one search per chunk.
+
+    ``query(chunk)`` builds the search; the catalog's keys are taken to be the run uids.
+    """
+    found = set()
+    for chunk in chunked(uids, chunk_size):
+        found.update(node.search(query(chunk)).keys())
+    return found
+
+
+@dataclass(frozen=True)
+class UidCheck:
+    """Result of :func:`check_uids`.
+
+    Attributes
+    ----------
+    uids : list of str
+        The uids without repeats, in order.
+    duplicates : list of str
+        Uids that appeared more than once.
+    missing : list of str
+        Uids not found in the catalog; empty if it was not searched.
+    searched : bool
+        Whether the catalog was searched.
+    """
+
+    uids: list
+    duplicates: list
+    missing: list
+    searched: bool = True
+
+    @property
+    def key(self):
+        return list_key(self.uids)
+
+    def describe(self):
+        text = f"{len(self.uids)} unique uids, {len(self.duplicates)} duplicates"
+        if not self.searched:
+            return text + ", not checked against a catalog"
+        text += f", {len(self.missing)} not in the catalog"
+        return text + (f": {sample_uids(self.missing)}" if self.missing else "")
+
+
+def check_uids(uids, node=None, chunk_size=DEFAULT_CHUNK_SIZE, query=uid_query):
+    """Dedupe ``uids`` and, given a Tiled catalog ``node``, find those missing from it.
+
+    See :func:`find_existing`.
+    """
+    unique, duplicates = dedupe(uids)
+    if node is None:
+        return UidCheck(unique, duplicates, [], searched=False)
+    found = find_existing(node, unique, chunk_size, query)
+    return UidCheck(unique, duplicates, [uid for uid in unique if uid not in found])
@@ -0,0 +1,73 @@
+"""Background warm-up of heavy optional dependencies, so the first page is served with only Dash loaded.
+
+The HUD needs Tiled and the agent's analysis code (e.g. ``pdf_agents`` and scikit-learn), which take seconds
+to import and connect. Importing them at module level delays every start of the app; importing them on the first
+click makes that click slow. Instead they are imported lazily where used, and :class:`Warmup` imports them on a
+daemon thread right after startup, so they are usually ready before anyone asks for a HUD.
+"""
+
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HUD_MODULES = ("tiled.client",)
+
+
+class Warmup:
+    """Import ``modules`` and then run ``tasks`` on a daemon thread.
+
+    Failures are logged and recorded rather than raised: a missing optional dependency should disable the
+    feature that needs it, not the dashboard. Code that needs a module imports it normally; Python's import
+    lock makes it wait for an import the warm-up thread has in progress instead of repeating it.
+
+    Parameters
+    ----------
+    modules : sequence of str
+        Module names to import.
+    tasks : sequence of callable
+        Called with no arguments after the imports, e.g. to open a Tiled connection.
+
+    Attributes
+    ----------
+    results : dict
+        Maps each module name, or task index, to the seconds it took or the exception it raised.
+    """
+
+    def __init__(self, modules=HUD_MODULES, tasks=()):
+        self.modules = tuple(modules)
+        self.tasks = tuple(tasks)
+        self.results = {}
+        self._done = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        try:
+            steps = [(name, lambda name=name: importlib.import_module(name)) for name in self.modules]
+            steps += list(enumerate(self.tasks))
+            for key, step in steps:
+                start = time.perf_counter()
+                try:
+                    step()
+                except Exception as err:
+                    self.results[key] = err
+                    logger.warning("Warm-up of %s failed: %s", key, err)
+                else:
+                    self.results[key] = time.perf_counter() - start
+        finally:
+            self._done.set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Block until the warm-up has finished, returning False if ``timeout`` expired first."""
+        return self._done.wait(timeout)
+
+    @property
+    def done(self):
+        return self._done.is_set()
@@ -63,6 +63,13 @@ setup(
         ]
     },
     install_requires=requirements,
+    extras_require={
+        "kafka": ["bluesky-kafka"],
+        "server": ["gunicorn", "uvicorn", "asgiref"],
+        "redis": ["redis"],
+        "background": ["dash[diskcache]"],
+        "fast": ["numpy"],
+    },
     license="BSD (3-clause)",
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",